@@ -0,0 +1,309 @@
+# Benchmark.py - 离线检测性能基准
+# 不需要游戏窗口，也不依赖 ok：把 assets/images 中的截图按 RESOLUTIONS 缩放后，直接用 cv2/numpy 调用
+# 各检测热点背后的工具类（TemplateGroup、ProbeTable、FishingBarAnalyzer、TextTrigger），
+# 统计 p50/p95/p99 延迟与吞吐量，可在任意平台上运行。
+#
+# 用法:
+#   python -m benchmark.Benchmark                     运行并与 benchmark/baseline.json 对比
+#   python -m benchmark.Benchmark --save-baseline     运行并写入新的基线
+#   python -m benchmark.Benchmark --cases TemplateGroup.detect --resolutions 1920x1080
+#   python -m benchmark.Benchmark --workers 1 2 4 8 16  另外测量多模板并行匹配随线程数的加速曲线
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from src.utils import ChestApproach, FishingControl
+from src.utils.FishingBarAnalyzer import FishingBarAnalyzer
+from src.utils.Layout import Layout
+from src.utils.PixelProbe import ProbeTable, METRIC_MAX, METRIC_SUM
+from src.utils.TemplateGroup import TemplateGroup
+from src.utils.TemplatePack import COCO_JSON, TemplatePack, build_pack
+from src.utils.TextTrigger import TextTrigger
+
+IMAGES_DIR = os.path.join('assets', 'images')
+DEFAULT_BASELINE = os.path.join('benchmark', 'baseline.json')
+DEFAULT_OUTPUT = os.path.join('benchmark', 'latest.json')
+
+# 以下声明与任务中的定义一致（tests/TestMain.py 中校验），基准只依赖 src/utils 中的纯工具模块
+# config['supported_resolution']['resize_to']
+RESOLUTIONS = [(2560, 1440), (1920, 1080), (1600, 900), (1280, 720)]
+# 宝箱模板，与任务共用 ChestApproach 中的定义
+CHEST_NAMES = ChestApproach.CHEST_NAMES
+# MoKuaiJinBiTask.PIXEL_PROBES（含 BaseQRSLTask.PIXEL_PROBES）
+PIXEL_PROBES = {
+    'exit_button_white': ((267, 65), (255, 255, 255), 10, METRIC_MAX),
+    'target_check': ((863, 1028), (236, 236, 236), 9, METRIC_SUM),
+    'main_page': ((22, 63), (237, 166, 62), 29, METRIC_SUM),
+    'boss_bar': ((1216, 157), (161, 209, 47), 0, METRIC_MAX),
+    'boss_marker': ((22, 410), (237, 166, 62), 0, METRIC_MAX),
+    'character_normal': ((1805, 698), (254, 195, 57), 50, METRIC_SUM),
+}
+# FishingTask 的钓鱼条区域和颜色，与任务共用 FishingControl 中的定义
+FISHING_BOXES = FishingControl.LAYOUT_BOXES
+FISHING_COLORS = (FishingControl.COLOR_HOOK, FishingControl.COLOR_TARGET, FishingControl.COLOR_WHITE)
+FISHING_TOLERANCE = FishingControl.COLOR_TOLERANCE
+# MoKuaiJinBiTask.CHEST_PROMPT_TRIGGER 的关键词，与任务共用 ChestApproach 中的定义
+CHEST_PROMPT_KEYWORDS = ChestApproach.CHEST_PROMPT_KEYWORDS
+
+# 一帧交互提示区域和拾取消息区域的典型 OCR 输出，最后一行含关键词
+OCR_LINES = ['F', '交互', '拾取', '获得 源器碎片x3', '金币 x2000', '模块 x1', '打开 高级密码箱']
+
+
+class BenchBox:
+    """检测结果和搜索区域，属性与 ok 的 Box 一致"""
+
+    def __init__(self, x, y, width, height, confidence=1.0, name=None):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.confidence = confidence
+        self.name = name
+
+
+class NoFeatures:
+    """模板包中没有的模板不再向 ok 取特征，基准只测模板包命中的路径"""
+
+    frame = None
+
+    @staticmethod
+    def get_feature_by_name(name):
+        return None
+
+
+class BenchmarkHarness:
+    """各用例共用的检测器，模板包按所测分辨率构建在临时目录中"""
+
+    def __init__(self, resolutions):
+        self._pack_dir = tempfile.TemporaryDirectory()
+        build_pack(resolutions, COCO_JSON, self._pack_dir.name)
+        self.pack = TemplatePack(self._pack_dir.name)
+        self.chest_group = TemplateGroup(CHEST_NAMES, threshold=0.8, pack=self.pack, box_cls=BenchBox)
+        self.probes = ProbeTable(PIXEL_PROBES)
+        self.layout = Layout(boxes=FISHING_BOXES, box_cls=BenchBox)
+        self.bar_analyzer = FishingBarAnalyzer(*FISHING_COLORS, FISHING_TOLERANCE)
+        self.prompt_trigger = TextTrigger(CHEST_PROMPT_KEYWORDS)
+        self.ocr_boxes = [BenchBox(0, i * 40, 200, 32, name=text) for i, text in enumerate(OCR_LINES)]
+        self.workers = 1
+
+    def close(self):
+        # 先释放内存映射，Windows 上才能删除临时目录
+        self.pack = self.chest_group.pack = None
+        self._pack_dir.cleanup()
+
+
+def _tracked_chest_search(harness, frame):
+    """跟踪状态下的一步搜索：只在画面中央宝箱大小三倍的窗口内匹配锁定类型"""
+    height, width = frame.shape[:2]
+    size = int(width * 60 / 1920) * 3
+    window = BenchBox(width // 2 - size // 2, height // 2 - size // 2, size, size)
+    return harness.chest_group.detect(NoFeatures, frame=frame, threshold=0.8, names=['chest1'], box=window)
+
+
+def _fishing_bar(harness, frame):
+    compiled = harness.layout.resolve(frame)
+    return harness.bar_analyzer.analyze(frame, compiled.box('fish_hook'), compiled.box('fish_target'))
+
+
+# (用例名, 被测调用(harness, frame))
+CASES = [
+    ('TemplateGroup.wait_any_chest', lambda h, f: h.chest_group.detect(NoFeatures, frame=f, threshold=0.8,
+                                                                      workers=h.workers)),
+    ('TemplateGroup.find_chests', lambda h, f: h.chest_group.detect(NoFeatures, frame=f, threshold=0.6,
+                                                                   workers=h.workers)),
+    ('TemplateGroup.tracked_window', _tracked_chest_search),
+    ('ProbeTable.evaluate', lambda h, f: h.probes.evaluate(f)),
+    ('FishingBarAnalyzer.analyze', _fishing_bar),
+    ('TextTrigger.match_boxes', lambda h, f: h.prompt_trigger.match_boxes(h.ocr_boxes)),
+]
+
+# 多模板并行匹配用例，按 --workers 给出的线程数分别测量
+SCALING_CASES = [
+    ('TemplateGroup.find_chests', lambda h, f: h.chest_group.detect(NoFeatures, frame=f, threshold=0.6,
+                                                                   workers=h.workers)),
+    ('TemplateGroup.find_chests.all', lambda h, f: h.chest_group.detect(NoFeatures, frame=f, threshold=0.6,
+                                                                       early_exit=False, workers=h.workers)),
+]
+
+# 控制回路的硬性要求: (用例名, 分辨率) -> 最低频率，按 p99 延迟折算
+RATE_REQUIREMENTS = {
+    ('FishingBarAnalyzer.analyze', '2560x1440'): 60,
+}
+
+
+def load_frames(resolutions):
+    """读取全部基准截图，并生成每个目标分辨率下的缩放副本"""
+    names = sorted((f for f in os.listdir(IMAGES_DIR) if f.endswith('.png')), key=lambda f: int(f.split('.')[0]))
+    originals = [cv2.imread(os.path.join(IMAGES_DIR, name)) for name in names]
+    frames = {}
+    for width, height in resolutions:
+        frames[(width, height)] = [
+            img if img.shape[1] == width and img.shape[0] == height
+            else cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+            for img in originals
+        ]
+    return frames
+
+
+def summarize(samples):
+    arr = np.asarray(samples) * 1000
+    total = float(arr.sum()) / 1000
+    return {
+        'calls': len(samples),
+        'p50_ms': round(float(np.percentile(arr, 50)), 3),
+        'p95_ms': round(float(np.percentile(arr, 95)), 3),
+        'p99_ms': round(float(np.percentile(arr, 99)), 3),
+        'throughput_hz': round(len(samples) / total, 1) if total > 0 else None,
+    }
+
+
+def run_case(harness, func, frames, iterations):
+    samples = []
+    for frame in frames:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func(harness, frame)
+            samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def run_scaling(harness, frames, workers_list, iterations):
+    """同一用例在不同线程数下的 p50 延迟与相对单线程的加速比"""
+    scaling = {}
+    for case_name, func in SCALING_CASES:
+        scaling[case_name] = {}
+        for (width, height), res_frames in frames.items():
+            res = f'{width}x{height}'
+            scaling[case_name][res] = {}
+            for workers in workers_list:
+                harness.workers = workers
+                try:
+                    stats = run_case(harness, func, res_frames, iterations)
+                finally:
+                    harness.workers = 1
+                single = scaling[case_name][res].get(1, stats)
+                stats['speedup'] = round(single['p50_ms'] / stats['p50_ms'], 2) if stats['p50_ms'] > 0 else None
+                scaling[case_name][res][workers] = stats
+                print(f"{case_name:<40} {res:>10} {workers:>2} 线程  p50 {stats['p50_ms']:>8.3f} ms  "
+                      f"加速 {stats['speedup']}x")
+    return scaling
+
+
+def compare(results, baseline, tolerance):
+    """与基线比较 p95，返回超出容差的回退项"""
+    regressions = []
+    for case_name, by_res in results.items():
+        for res, stats in by_res.items():
+            old = baseline.get('results', {}).get(case_name, {}).get(res)
+            if not old or not old.get('p95_ms'):
+                continue
+            ratio = stats['p95_ms'] / old['p95_ms']
+            mark = '⚠️ ' if ratio > 1 + tolerance else '  '
+            print(f"{mark}{case_name:<40} {res:>10} p95 {old['p95_ms']:>9.3f} -> {stats['p95_ms']:>9.3f} ms ({ratio:.2f}x)")
+            if ratio > 1 + tolerance:
+                regressions.append((case_name, res, ratio))
+    return regressions
+
+
+def check_rate_requirements(results):
+    failures = []
+    for (case_name, res), min_hz in RATE_REQUIREMENTS.items():
+        stats = results.get(case_name, {}).get(res)
+        if not stats:
+            continue
+        p99_hz = 1000 / stats['p99_ms'] if stats['p99_ms'] > 0 else float('inf')
+        mark = '✅' if p99_hz >= min_hz else '⚠️ '
+        print(f"{mark} {case_name} {res}: p99 折算 {p99_hz:.0f} Hz，要求 >= {min_hz} Hz")
+        if p99_hz < min_hz:
+            failures.append((case_name, res, p99_hz))
+    return failures
+
+
+def parse_resolution(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ok-hotta 离线检测性能基准')
+    parser.add_argument('--iterations', type=int, default=5, help='每张截图每个用例的调用次数')
+    parser.add_argument('--cases', nargs='*', help='只运行指定用例')
+    parser.add_argument('--resolutions', nargs='*', type=parse_resolution,
+                        help='只测试指定分辨率，如 1920x1080，默认 RESOLUTIONS')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果写入基线文件')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='p95 允许的回退比例')
+    parser.add_argument('--workers', nargs='*', type=int,
+                        help='测量多模板并行匹配在这些线程数下的加速曲线，如 1 2 4 8 16')
+    args = parser.parse_args()
+
+    resolutions = args.resolutions or RESOLUTIONS
+    frames = load_frames(resolutions)
+    cases = [c for c in CASES if not args.cases or c[0] in args.cases]
+
+    harness = BenchmarkHarness(resolutions)
+    results = {}
+    try:
+        for case_name, func in cases:
+            results[case_name] = {}
+            for (width, height), res_frames in frames.items():
+                stats = run_case(harness, func, res_frames, args.iterations)
+                results[case_name][f'{width}x{height}'] = stats
+                print(f"{case_name:<40} {width}x{height:<5} p50 {stats['p50_ms']:>8.3f}  p95 {stats['p95_ms']:>8.3f}  "
+                      f"p99 {stats['p99_ms']:>8.3f} ms  {stats['throughput_hz']} Hz")
+        scaling = None
+        if args.workers:
+            # 第一项作为加速比的基准，始终包含单线程
+            workers_list = [1] + [w for w in args.workers if w != 1]
+            scaling = run_scaling(harness, frames, workers_list, args.iterations)
+    finally:
+        harness.close()
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'system': platform.system(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'iterations': args.iterations,
+            'images': len(next(iter(frames.values()))),
+        },
+        'results': results,
+    }
+    if scaling:
+        report['scaling'] = scaling
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if check_rate_requirements(results):
+        raise SystemExit(1)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✅ 基线已写入 {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"⚠️  {len(regressions)} 项 p95 超出基线 {args.tolerance:.0%}")
+            raise SystemExit(1)
+        print("✅ 未发现性能回退")
+    else:
+        print(f"⚠️  基线文件不存在: {args.baseline}，使用 --save-baseline 生成")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,551 @@
+# ChestSim.py - 走向宝箱模拟器
+# 不需要游戏窗口：宝箱标记（从 chest1~chest5 模板裁剪）按角色位置做透视投影绘制到合成画面上，
+# 角色响应任务发出的 a/d（横移）和 w/s（前后）按键移动；走到宝箱旁时画面出现 opened chest 图标，
+# OCR 返回交互提示文字。联合作战和模块金币使用的 ChestApproach.approach_chest / approach_bosschest
+# 在虚拟时钟下由纯 Python 的任务替身驱动，不依赖 ok，统计随机出生位置下的成功率、耗时、按键次数和
+# 相对直线走过去多花的时间，用于比较走位逻辑的改动。
+#
+# 用法:
+#   python -m benchmark.ChestSim                                      默认 approach_chest，30 个宝箱
+#   python -m benchmark.ChestSim --method approach_bosschest --runs 200 --output chest.json
+#   python -m benchmark.ChestSim --steering 比例控制                    比较不同的走位模式
+
+import argparse
+import json
+import math
+import queue
+import tempfile
+
+import cv2
+import numpy as np
+
+from benchmark.FishingSim import SimBox, SimulationTimeout, VirtualClock, parse_resolution, virtual_time
+from src.utils import ChestApproach
+from src.utils.Layout import Layout
+from src.utils.TemplateGroup import TemplateGroup
+from src.utils.TemplatePack import COCO_JSON, TemplatePack, build_pack
+from src.utils.TextTrigger import TextTrigger
+
+REF_HEIGHT = 1080
+
+
+class ChestWorld:
+    """
+    俯视平面上的角色和宝箱，长度单位为米
+    相机在角色身后 cam_back 米、高 cam_height 米处朝 +z 方向，不随按键转动；
+    a/d 横移，w/s 前后移动，速度按 accel_time 的时间常数趋近目标速度。
+    宝箱标记高出地面 marker_height 米，按针孔模型投影，距离只改变位置不改变大小（与游戏内的图标一致）。
+    """
+
+    def __init__(self, chest_pos, chest_name='chest1', speed=4.0, accel_time=0.1, reach=1.5,
+                 cam_back=4.5, cam_height=2.0, marker_height=0.3, focal=0.85, horizon=0.42, near=1.0, seed=0):
+        self.chest = chest_pos
+        self.chest_name = chest_name
+        self.speed = speed
+        self.accel_time = accel_time
+        self.reach = reach
+        self.cam_back = cam_back
+        self.cam_height = cam_height
+        self.marker_height = marker_height
+        self.focal = focal
+        self.horizon = horizon
+        self.near = near
+        self.seed = seed
+        self.t = 0.0
+        self.pos = (0.0, 0.0)
+        self.velocity = (0.0, 0.0)
+        self.keys = set()
+        self.key_events = 0
+        self.path = 0.0
+        self.reached_at = None
+        self._background = None
+
+    def press(self, key):
+        self.keys.add(key)
+        self.key_events += 1
+
+    def release(self, key):
+        self.keys.discard(key)
+
+    def distance(self):
+        return math.hypot(self.chest[0] - self.pos[0], self.chest[1] - self.pos[1])
+
+    def in_reach(self):
+        return self.distance() <= self.reach
+
+    def step(self, dt, max_dt=0.01):
+        while dt > 1e-9:
+            h = min(dt, max_dt)
+            dt -= h
+            self.t += h
+            target = (self.speed * (('d' in self.keys) - ('a' in self.keys)),
+                      self.speed * (('w' in self.keys) - ('s' in self.keys)))
+            k = min(1.0, h / self.accel_time) if self.accel_time > 0 else 1.0
+            vx = self.velocity[0] + (target[0] - self.velocity[0]) * k
+            vz = self.velocity[1] + (target[1] - self.velocity[1]) * k
+            self.velocity = (vx, vz)
+            self.pos = (self.pos[0] + vx * h, self.pos[1] + vz * h)
+            self.path += math.hypot(vx, vz) * h
+            if self.reached_at is None and self.in_reach():
+                self.reached_at = self.t
+
+    def project(self, width, height):
+        """宝箱标记中心在画面上的坐标，在相机近平面之后时返回 None"""
+        depth = self.chest[1] - self.pos[1] + self.cam_back
+        if depth < self.near:
+            return None
+        focal = self.focal * height
+        x = width / 2 + focal * (self.chest[0] - self.pos[0]) / depth
+        y = self.horizon * height + focal * (self.cam_height - self.marker_height) / depth
+        return x, y
+
+    def background(self, width, height):
+        """平滑的随机地面纹理，同一 seed 相同"""
+        if self._background is None or self._background.shape[:2] != (height, width):
+            rng = np.random.default_rng(self.seed)
+            small = rng.integers(50, 150, size=(max(2, height // 24), max(2, width // 24), 3), dtype=np.uint8)
+            self._background = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+        return self._background
+
+    def render(self, width, height, templates, prompt_pos):
+        """按当前状态绘制一帧，templates 为当前分辨率的 {名称: 模板}，prompt_pos 为 opened chest 图标的位置"""
+        frame = self.background(width, height).copy()
+        center = self.project(width, height)
+        if center is not None:
+            _paste(frame, templates[self.chest_name], center[0], center[1], anchor_center=True)
+        if self.in_reach():
+            _paste(frame, templates['opened chest'], *prompt_pos)
+        return frame
+
+
+def load_feature_boxes(coco_json=COCO_JSON):
+    """result.json 中各特征的标注位置，{名称: (x, y, 宽, 高)}，参考分辨率为标注图片的高度"""
+    with open(coco_json, encoding='utf-8') as f:
+        data = json.load(f)
+    categories = {c['id']: c['name'] for c in data['categories']}
+    images = {i['id']: i for i in data['images']}
+    boxes = {}
+    for annotation in data['annotations']:
+        name = categories[annotation['category_id']]
+        if name not in boxes:
+            scale = REF_HEIGHT / images[annotation['image_id']]['height']
+            boxes[name] = tuple(v * scale for v in annotation['bbox'])
+    return boxes
+
+
+def _paste(frame, template, x, y, anchor_center=False):
+    """把模板画到画面上，有掩码时只画掩码内的像素；超出画面的部分不画"""
+    mat = template.mat
+    t_height, t_width = mat.shape[:2]
+    if anchor_center:
+        x, y = x - t_width / 2, y - t_height / 2
+    x, y = int(round(x)), int(round(y))
+    height, width = frame.shape[:2]
+    x1, y1, x2, y2 = max(0, x), max(0, y), min(width, x + t_width), min(height, y + t_height)
+    if x1 >= x2 or y1 >= y2:
+        return
+    src = mat[y1 - y:y2 - y, x1 - x:x2 - x]
+    mask = getattr(template, 'mask', None)
+    if mask is None:
+        frame[y1:y2, x1:x2] = src
+    else:
+        keep = mask[y1 - y:y2 - y, x1 - x:x2 - x] > 0
+        frame[y1:y2, x1:x2][keep] = src[keep]
+
+
+class SimChestTask:
+    """
+    approach_chest / approach_bosschest 所需的任务接口的纯 Python 替身
+    截图按 frame_interval 的间隔更新，按键、等待和日志由模拟器提供；模板匹配和 OCR 各消耗 match_cost / ocr_cost 秒
+    虚拟时间（在检测服务中运行时记入该服务的流水线）。宝箱模板、提示区域和提示关键词取自 ChestApproach，与任务一致，
+    wait_any_chest 的阈值为 chest_threshold（联合作战 0.8，模块金币 0.6），OCR 在角色位于宝箱旁时返回 prompt_text。
+    与 ok 相同，find_feature / find_one 不给 box 时只在特征的标注位置附近查找。
+    """
+
+    def __init__(self, world, clock, templates, pack, resolution=(1920, 1080), frame_interval=1 / 30,
+                 max_time=120, match_cost=0.015, ocr_cost=0.06, prompt_text='太极匣',
+                 steering=ChestApproach.DEFAULT_STEERING, chest_threshold=0.8):
+        self.world = world
+        self.clock = clock
+        self.templates = templates
+        self.pack = pack
+        self.resolution = resolution
+        self.frame_interval = frame_interval
+        self.deadline = clock.now + max_time
+        self.match_cost = match_cost
+        self.ocr_cost = ocr_cost
+        self.prompt_text = prompt_text
+        self.steering = steering
+        self.chest_threshold = chest_threshold
+        self.sim_logs = []
+        self.chest_group = TemplateGroup(ChestApproach.CHEST_NAMES, threshold=0.8, pack=pack, box_cls=SimBox)
+        self.layout = Layout(boxes=ChestApproach.LAYOUT_BOXES, box_cls=SimBox).compile(*resolution)
+        self.prompt_trigger = TextTrigger(ChestApproach.CHEST_PROMPT_KEYWORDS)
+        scale = resolution[1] / REF_HEIGHT
+        self.feature_boxes = {name: (x * scale, y * scale, w * scale, h * scale)
+                              for name, (x, y, w, h) in load_feature_boxes().items()}
+        self._groups = {}
+        self._sim_frame = None
+        self._sim_frame_time = None
+        # 检测服务中的识别耗时记入各自的流水线，不推进任务的时间
+        self._cost_sink = None
+        self.detectors = SimDetectorService(self, on_error=self._on_detector_error)
+        self.ocr_detectors = SimDetectorService(self, on_error=self._on_detector_error)
+
+    # ---- 时间 ----
+    def _advance(self, seconds):
+        if seconds > 0:
+            self.clock.sleep(seconds)
+            self.world.step(seconds)
+        if self.clock.now > self.deadline:
+            raise SimulationTimeout()
+
+    def sleep(self, timeout):
+        self._advance(timeout)
+        return True
+
+    def _charge(self, seconds):
+        if self._cost_sink is None:
+            self._advance(seconds)
+        else:
+            self._cost_sink[0] += seconds
+
+    # ---- 截图 ----
+    @property
+    def frame(self):
+        if self._sim_frame_time is None or self.clock.now - self._sim_frame_time >= self.frame_interval - 1e-9:
+            width, height = self.resolution
+            self._sim_frame = self.world.render(width, height, self.templates, self.feature_boxes['opened chest'][:2])
+            self._sim_frame_time = self.clock.now
+        return self._sim_frame
+
+    def next_frame(self):
+        self._advance(self.frame_interval)
+        return self.frame
+
+    def layout_box(self, name):
+        return self.layout.box(name)
+
+    # ---- 按键 ----
+    def send_key_down(self, key, *args, **kwargs):
+        self.world.press(key)
+
+    def send_key_up(self, key, *args, **kwargs):
+        self.world.release(key)
+
+    def send_key_safe(self, key, down_time=0.1):
+        self.send_key_down(key)
+        self.sleep(down_time)
+        self.send_key_up(key)
+
+    # ---- 日志 ----
+    def log_info(self, message, *args, **kwargs):
+        self.sim_logs.append(message)
+
+    log_debug = log_info
+    log_error = log_info
+
+    def info_set(self, key, value):
+        pass
+
+    def _on_detector_error(self, name, error):
+        self.log_debug(f"后台检测器 {name} 异常: {error}")
+
+    # ---- 识别 ----
+    @staticmethod
+    def get_feature_by_name(name):
+        # 模板包按模拟的分辨率构建，所有模板都在包中
+        return None
+
+    def find_feature(self, feature_name, threshold=0, box=None, frame=None, **kwargs):
+        if box is None:
+            x, y, w, h = self.feature_boxes[feature_name]
+            pad = max(2, round(self.resolution[1] / REF_HEIGHT * 2))
+            box = SimBox(round(x) - pad, round(y) - pad, round(w) + 2 * pad, round(h) + 2 * pad)
+        group = self._groups.get(feature_name)
+        if group is None:
+            group = self._groups[feature_name] = TemplateGroup([feature_name], pack=self.pack, box_cls=SimBox)
+        frame = self.frame if frame is None else frame
+        results = group.detect(self, frame=frame, box=box, threshold=threshold or 0.8)
+        self._charge(self.match_cost)
+        return results
+
+    def find_one(self, feature_name, threshold=0, box=None, frame=None, **kwargs):
+        results = self.find_feature(feature_name, threshold=threshold, box=box, frame=frame)
+        return results[0] if results else None
+
+    def find_chests(self, threshold=0.8, names=None, box=None, frame=None):
+        frame = self.frame if frame is None else frame
+        results = self.chest_group.detect(self, frame=frame, box=box, threshold=threshold, names=names)
+        self._charge(self.match_cost)
+        return results
+
+    def find_any_chest(self, threshold=0.8, box=None):
+        results = self.find_chests(threshold=threshold, box=box)
+        return results[0] if results else None
+
+    def wait_any_chest(self, time_out=30):
+        # 与任务的 wait_until_frame 相同，每帧新画面判断一次
+        start = self.clock.now
+        while True:
+            chest = self.find_any_chest(threshold=self.chest_threshold)
+            if chest or self.clock.now - start >= time_out:
+                return chest
+            self.next_frame()
+
+    def chest_steering(self):
+        return ChestApproach.make_steering(self.steering)
+
+    def detect_chest_prompt(self, frame, box):
+        self._charge(self.ocr_cost)
+        if not self.world.in_reach():
+            return None
+        ocr_results = [SimBox(box.x, box.y, box.width, box.height, confidence=0.95, name=self.prompt_text)]
+        return self.prompt_trigger.match_boxes(ocr_results)[0]
+
+
+class SimDetectorService:
+    """
+    与 DetectorService 接口相同的虚拟时间检测服务，作为任务替身的 detectors / ocr_detectors
+    每个服务是一条独立的流水线：在开始时刻的画面上依次运行检测器，识别耗时之和之后发布结果，随即开始下一帧。
+    模拟器是单线程的，流水线只在任务读取结果时推进；读取间隔内本应完成的多轮检测按耗时跳过，
+    正在进行的那一轮的帧时间为它的开始时刻，画面取读取时刻的画面。
+    """
+
+    def __init__(self, task, interval=0.005, on_error=None):
+        self.task = task
+        self.interval = interval
+        self.on_error = on_error
+        self.frames = 0
+        self.results = queue.Queue()
+        self._detectors = {}
+        self._publish_empty = set()
+        self._latest = {}
+        self._pending = None
+        self._last_frame = None
+        self._running = False
+
+    def register(self, name, detector, publish_empty=False):
+        self._detectors[name] = detector
+        self._latest.pop(name, None)
+        if publish_empty:
+            self._publish_empty.add(name)
+        else:
+            self._publish_empty.discard(name)
+
+    def unregister(self, name):
+        self._detectors.pop(name, None)
+        self._latest.pop(name, None)
+        self._publish_empty.discard(name)
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        self._running = True
+        return self
+
+    def stop(self, timeout=1):
+        self._running = False
+        self._pending = None
+        self._last_frame = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def latest(self, name, max_age=None):
+        self._update()
+        detection = self._latest.get(name)
+        if detection is None or (max_age is not None and self.task.clock.now - detection.frame_time > max_age):
+            return None
+        return detection
+
+    def drain(self):
+        self._update()
+        detections = []
+        while not self.results.empty():
+            detections.append(self.results.get_nowait())
+        return detections
+
+    def wait(self, name, timeout, since=None):
+        deadline = self.task.clock.now + timeout
+        while True:
+            self._update()
+            detection = self._latest.get(name)
+            if detection is not None and (since is None or detection.frame_time > since):
+                return detection
+            now = self.task.clock.now
+            if now >= deadline or not self._running:
+                return None
+            until = self._pending[2] if self._pending is not None else now + self.interval
+            self.task.sleep(max(1e-4, min(deadline, until) - now))
+
+    def _update(self):
+        if not self._running or not self._detectors:
+            return
+        now = self.task.clock.now
+        start = now
+        if self._pending is not None:
+            results, frame_time, done_time, index = self._pending
+            if done_time > now:
+                return
+            from src.utils.DetectorService import Detection
+            for name, result in results.items():
+                if name in self._detectors and (result or name in self._publish_empty):
+                    self._latest[name] = Detection(name, result, frame_time, done_time, index)
+                    self.results.put_nowait(self._latest[name])
+            cost = done_time - frame_time
+            start = done_time + ((now - done_time) // cost * cost if cost > 0 else 0)
+            self._pending = None
+        self._run(start)
+
+    def _run(self, start):
+        frame = self.task.frame
+        if frame is None or frame is self._last_frame:
+            return
+        self._last_frame = frame
+        self.frames += 1
+        self.task._cost_sink = [0.0]
+        results = {}
+        try:
+            for name, detector in list(self._detectors.items()):
+                try:
+                    results[name] = detector(frame)
+                except SimulationTimeout:
+                    raise
+                except Exception as e:
+                    if self.on_error:
+                        self.on_error(name, e)
+            cost = self.task._cost_sink[0]
+        finally:
+            self.task._cost_sink = None
+        self._pending = (results, start, start + cost, self.frames)
+
+
+# 走位方法 -> (ChestApproach 中的函数, 任务 wait_any_chest 的阈值)
+METHODS = {
+    'approach_chest': (ChestApproach.approach_chest, 0.8),  # 联合作战
+    'approach_bosschest': (ChestApproach.approach_bosschest, 0.6),  # 模块金币
+}
+
+
+def load_templates(resolution, output_dir):
+    """把该分辨率的模板包构建到 output_dir 中，返回模板包和 {名称: 模板}"""
+    build_pack([resolution], COCO_JSON, output_dir)
+    pack = TemplatePack(output_dir)
+    return pack, pack.resolution(*resolution)
+
+
+def random_spawn(seed, min_distance=4.0, max_distance=18.0, max_bearing=35):
+    """随机的宝箱位置（相对角色的距离和方位角）和宝箱模板"""
+    rng = np.random.default_rng(seed)
+    distance = float(rng.uniform(min_distance, max_distance))
+    bearing = math.radians(float(rng.uniform(-max_bearing, max_bearing)))
+    names = ChestApproach.CHEST_NAMES
+    name = names[int(rng.integers(len(names)))]
+    return (distance * math.sin(bearing), distance * math.cos(bearing)), name
+
+
+def run_once(method, seed, pack, templates, resolution, frame_interval, max_walk_time,
+             steering=ChestApproach.DEFAULT_STEERING, **world_kwargs):
+    """从一个随机出生位置走向宝箱一次，返回结果字典"""
+    approach, chest_threshold = METHODS[method]
+    chest_pos, chest_name = random_spawn(seed)
+    clock = VirtualClock()
+    world = ChestWorld(chest_pos, chest_name, seed=seed, **world_kwargs)
+    task = SimChestTask(world, clock, templates, pack, resolution=resolution, frame_interval=frame_interval,
+                        max_time=max_walk_time + 60, steering=steering, chest_threshold=chest_threshold)
+    start = clock.now
+    start_distance = world.distance()
+    returned = False
+    timed_out = False
+    with virtual_time(ChestApproach, clock):
+        try:
+            returned = bool(approach(task, max_walk_time=max_walk_time, box_cls=SimBox))
+        except SimulationTimeout:
+            timed_out = True
+    # approach_chest 会捕获异常并返回 False，以虚拟时间是否越过期限为准
+    timed_out = timed_out or clock.now > task.deadline
+    if returned:
+        # 看到提示时在范围内，但按键松开后的惯性把角色带出了范围
+        outcome = 'reached' if world.in_reach() else 'left_reach'
+    else:
+        outcome = 'timeout' if timed_out else 'failed'
+    duration = clock.now - start
+    ideal = max(0.0, start_distance - world.reach) / world.speed
+    return {
+        'seed': seed,
+        'chest': chest_name,
+        'start_distance': round(start_distance, 2),
+        'outcome': outcome,
+        'duration': round(duration, 3),
+        'wasted': round(duration - ideal, 3),
+        'steps': world.key_events,
+        'path': round(world.path, 2),
+        'final_distance': round(world.distance(), 2),
+        'last_log': task.sim_logs[-1] if task.sim_logs and outcome != 'reached' else None,
+    }
+
+
+def summarize(results):
+    reached = [r for r in results if r['outcome'] == 'reached']
+    durations = [r['duration'] for r in reached]
+
+    def percentile(values, q):
+        return round(float(np.percentile(values, q)), 2) if values else None
+
+    return {
+        'runs': len(results),
+        'success_rate': round(len(reached) / len(results), 3) if results else 0.0,
+        'failure_rate': round(1 - len(reached) / len(results), 3) if results else 0.0,
+        'outcomes': {o: sum(r['outcome'] == o for r in results) for o in sorted({r['outcome'] for r in results})},
+        'time_p50': percentile(durations, 50),
+        # 含失败的耗时，失败的走位同样占用时间
+        'time_all_p50': percentile([r['duration'] for r in results], 50),
+        'time_p95': percentile(durations, 95),
+        'wasted_p50': percentile([r['wasted'] for r in reached], 50),
+        'steps_p50': percentile([r['steps'] for r in reached], 50),
+        'steps_mean': round(float(np.mean([r['steps'] for r in results])), 1) if results else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ok-hotta 走向宝箱模拟')
+    parser.add_argument('--method', default='approach_chest', choices=sorted(METHODS), help='被测的走位方法')
+    parser.add_argument('--runs', type=int, default=30, help='模拟的宝箱数，每个宝箱使用不同的 seed')
+    parser.add_argument('--seed', type=int, default=0, help='第一个宝箱的 seed')
+    parser.add_argument('--resolution', type=parse_resolution, default=(1280, 720),
+                        help='模板包按该分辨率临时构建，整帧匹配较慢，默认取支持的最小分辨率')
+    parser.add_argument('--fps', type=float, default=30, help='模拟的截图帧率')
+    parser.add_argument('--max-walk-time', type=float, default=60, help='传给走位方法的最长行走时间（秒）')
+    parser.add_argument('--steering', default=ChestApproach.DEFAULT_STEERING, choices=ChestApproach.STEERING_MODES,
+                        help='走位模式，默认与任务的默认配置相同')
+    parser.add_argument('--speed', type=float, default=4.0, help='角色移动速度（米/秒）')
+    parser.add_argument('--output', help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pack_dir:
+        pack, templates = load_templates(args.resolution, pack_dir)
+        results = [run_once(args.method, seed, pack, templates, args.resolution, 1 / args.fps,
+                            args.max_walk_time, steering=args.steering, speed=args.speed)
+                   for seed in range(args.seed, args.seed + args.runs)]
+        # 先释放内存映射，Windows 上才能删除临时目录
+        pack = templates = None
+    summary = summarize(results)
+    print(f"{args.method}（{args.steering}），{args.resolution[0]}x{args.resolution[1]}，{args.runs} 个宝箱")
+    print(f"成功率 {summary['success_rate']:.1%}，结果 {summary['outcomes']}")
+    print(f"成功耗时 p50 {summary['time_p50']} 秒，p95 {summary['time_p95']} 秒，"
+          f"比直线走过去多 {summary['wasted_p50']} 秒（p50），含失败 p50 {summary['time_all_p50']} 秒")
+    print(f"按键次数 p50 {summary['steps_p50']}，全部平均 {summary['steps_mean']}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': {k: v for k, v in vars(args).items() if k != 'output'},
+                       'summary': summary, 'runs': results}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+# FishingSim.py - 钓鱼小游戏模拟器
+# 不需要游戏窗口：按任务的布局区域绘制鱼钩和目标条（使用任务中的真实颜色），鱼的移动由可复现的模型驱动，
+# 白色游标响应任务发送的 a/d 按键。FishingTask 使用的 FishingControl.control_fishing 在虚拟时钟下
+# 由纯 Python 的任务替身驱动，不依赖 ok，统计成功率、上钩到收杆的时间和控制回路频率，用于比较控制逻辑的改动。
+#
+# 用法:
+#   python -m benchmark.FishingSim                          默认 50 条鱼
+#   python -m benchmark.FishingSim --runs 200 --model erratic --resolution 2560x1440 --output fishing.json
+
+import argparse
+import json
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from src.utils import FishingControl
+from src.utils.FishingBarAnalyzer import FishingBarAnalyzer
+from src.utils.Layout import Layout
+
+
+class VirtualClock:
+    """虚拟时钟，只有 sleep 才推进时间；提供 time() 以替换任务模块中的 time"""
+
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+
+class SimulationTimeout(Exception):
+    pass
+
+
+class FishModel:
+    """
+    鱼的移动模型：目标区间中心在随机生成的路点之间匀速移动，同一 seed 得到同一条鱼
+    位置以目标条宽度的比例表示（0~1）。
+    """
+
+    PRESETS = {
+        'calm': {'speed': 0.15, 'hold': (0.8, 2.0), 'width': 0.22},
+        'normal': {'speed': 0.3, 'hold': (0.4, 1.5), 'width': 0.18},
+        'erratic': {'speed': 1.0, 'hold': (0.1, 0.5), 'width': 0.12},
+    }
+
+    def __init__(self, seed=0, speed=0.3, hold=(0.4, 1.5), width=0.18, duration=300):
+        rng = np.random.default_rng(seed)
+        self.width = width
+        half = width / 2
+        self.times = [0.0]
+        self.centers = [0.5]
+        t = 0.0
+        while t < duration:
+            target = float(rng.uniform(half, 1 - half))
+            t += abs(target - self.centers[-1]) / speed
+            self.times.append(t)
+            self.centers.append(target)
+            t += float(rng.uniform(*hold))
+            self.times.append(t)
+            self.centers.append(target)
+
+    @classmethod
+    def preset(cls, name, seed=0):
+        return cls(seed=seed, **cls.PRESETS[name])
+
+    def center(self, t):
+        return float(np.interp(t, self.times, self.centers))
+
+
+class ScriptedFish(FishModel):
+    """按给定路点 [(时间, 中心)] 移动的鱼，用于构造特定场景"""
+
+    def __init__(self, waypoints, width=0.18):
+        self.width = width
+        self.times = [t for t, _ in waypoints]
+        self.centers = [c for _, c in waypoints]
+
+
+class FishingWorld:
+    """
+    钓鱼小游戏状态
+    游标按住 d 向右、按住 a 向左匀速移动；游标在目标区间内时鱼的体力下降，否则张力上升。
+    体力耗尽时鱼钩黄色消失（上钩成功），张力满时鱼逃走，钓鱼条整体消失。
+    """
+
+    def __init__(self, fish, cursor_speed=0.8, stamina_time=8.0, escape_time=4.0, tension_recover=0.5):
+        self.fish = fish
+        self.cursor_speed = cursor_speed
+        self.stamina_drain = 1 / stamina_time
+        self.tension_rate = 1 / escape_time
+        self.tension_recover = tension_recover
+        self.t = 0.0
+        self.cursor = 0.5
+        self.stamina = 1.0
+        self.tension = 0.0
+        self.keys = set()
+        self.outcome = None
+        self.caught_at = None
+        self.key_events = 0
+
+    def press(self, key):
+        self.keys.add(key)
+        self.key_events += 1
+
+    def release(self, key):
+        self.keys.discard(key)
+
+    def on_target(self):
+        center = self.fish.center(self.t)
+        return abs(self.cursor - center) <= self.fish.width / 2
+
+    def step(self, dt, max_dt=0.01):
+        """以不超过 max_dt 的步长推进 dt 秒"""
+        while dt > 1e-9:
+            h = min(dt, max_dt)
+            dt -= h
+            self.t += h
+            if self.outcome is not None:
+                continue
+            direction = ('d' in self.keys) - ('a' in self.keys)
+            self.cursor = min(1.0, max(0.0, self.cursor + direction * self.cursor_speed * h))
+            if self.on_target():
+                self.stamina -= self.stamina_drain * h
+                self.tension = max(0.0, self.tension - self.tension_recover * h)
+            else:
+                self.tension += self.tension_rate * h
+            if self.stamina <= 0:
+                self.outcome, self.caught_at = 'caught', self.t
+            elif self.tension >= 1:
+                self.outcome = 'escaped'
+
+    def render(self, hook_box, target_box, width, height, colors):
+        """按当前状态绘制一帧，colors 为 (鱼钩, 目标, 白色游标)"""
+        hook_color, target_color, white_color = colors
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        if self.outcome == 'escaped':
+            return frame
+        if self.outcome is None:
+            # 鱼钩区域自下而上按剩余体力填充
+            filled = max(1, int(round(hook_box.height * self.stamina)))
+            frame[hook_box.y + hook_box.height - filled:hook_box.y + hook_box.height,
+                  hook_box.x:hook_box.x + hook_box.width] = hook_color
+        bar = frame[target_box.y:target_box.y + target_box.height, target_box.x:target_box.x + target_box.width]
+        bar_width = target_box.width
+        center = self.fish.center(self.t)
+        left = int(round((center - self.fish.width / 2) * (bar_width - 1)))
+        right = int(round((center + self.fish.width / 2) * (bar_width - 1)))
+        bar[:, max(0, left):min(bar_width, right + 1)] = target_color
+        cursor_x = int(round(self.cursor * (bar_width - 1)))
+        cursor_width = max(2, bar_width // 150)
+        bar[:, cursor_x:min(bar_width, cursor_x + cursor_width)] = white_color
+        return frame
+
+
+class SimBox:
+    """布局区域和检测结果，属性与 ok 的 Box 一致"""
+
+    def __init__(self, x, y, width, height, confidence=1.0, name=None):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.confidence = confidence
+        self.name = name
+
+    def center(self):
+        return round(self.x + self.width / 2), round(self.y + self.height / 2)
+
+
+class SimFishingTask:
+    """
+    control_fishing 所需的任务接口的纯 Python 替身
+    截图、按键、等待和日志由模拟器提供，钓鱼条区域和颜色取自 FishingControl，与 FishingTask 一致。
+    每次取帧前推进 frame_interval 秒（截图间隔），sleep 推进相应的虚拟时间。
+    """
+
+    COLORS = (FishingControl.COLOR_HOOK, FishingControl.COLOR_TARGET, FishingControl.COLOR_WHITE)
+
+    def __init__(self, world, clock, resolution=(1920, 1080), frame_interval=1 / 60, max_time=120):
+        self.world = world
+        self.clock = clock
+        self.resolution = resolution
+        self.frame_interval = frame_interval
+        self.deadline = clock.now + max_time
+        self.sim_logs = []
+        layout = Layout(boxes=FishingControl.LAYOUT_BOXES, box_cls=SimBox).compile(*resolution)
+        self.hook_box = layout.box('fish_hook')
+        self.target_box = layout.box('fish_target')
+        self._sim_frame = None
+        self._sim_frame_time = None
+
+    # ---- 时间 ----
+    def _advance(self, seconds):
+        if seconds > 0:
+            self.clock.sleep(seconds)
+            self.world.step(seconds)
+        if self.clock.now > self.deadline:
+            raise SimulationTimeout()
+
+    def sleep(self, timeout):
+        self._advance(timeout)
+        return True
+
+    # ---- 截图 ----
+    @property
+    def frame(self):
+        if self._sim_frame_time != self.clock.now:
+            width, height = self.resolution
+            self._sim_frame = self.world.render(self.hook_box, self.target_box, width, height, self.COLORS)
+            self._sim_frame_time = self.clock.now
+        return self._sim_frame
+
+    def next_frame(self):
+        self._advance(self.frame_interval)
+        return self.frame
+
+    # ---- 按键 ----
+    def send_key_down(self, key, *args, **kwargs):
+        self.world.press(key)
+
+    def send_key_up(self, key, *args, **kwargs):
+        self.world.release(key)
+
+    # ---- 日志 ----
+    def log_info(self, message, *args, **kwargs):
+        self.sim_logs.append(message)
+
+    log_debug = log_info
+    log_error = log_info
+
+
+class TimedAnalyzer:
+    """记录每次钓鱼条分析的实际耗时"""
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.times = []
+
+    def analyze(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.analyzer.analyze(*args, **kwargs)
+        finally:
+            self.times.append(time.perf_counter() - start)
+
+
+@contextmanager
+def virtual_time(module, clock):
+    """把模块中的 time 换成虚拟时钟"""
+    original = module.time
+    module.time = clock
+    try:
+        yield
+    finally:
+        module.time = original
+
+
+def run_once(fish, resolution, frame_interval, max_time):
+    """模拟一次遛鱼，返回结果字典"""
+    clock = VirtualClock()
+    world = FishingWorld(fish)
+    task = SimFishingTask(world, clock, resolution=resolution, frame_interval=frame_interval, max_time=max_time)
+    analyzer = TimedAnalyzer(FishingBarAnalyzer(*SimFishingTask.COLORS, FishingControl.COLOR_TOLERANCE))
+    start = clock.now
+    returned = False
+    with virtual_time(FishingControl, clock):
+        try:
+            returned = bool(FishingControl.control_fishing(task, analyzer, task.hook_box, task.target_box))
+        except SimulationTimeout:
+            pass
+    duration = clock.now - start
+    analyze_times = analyzer.times
+    return {
+        'outcome': world.outcome or 'timeout',
+        'returned': returned,
+        'catch_time': world.caught_at,
+        'duration': duration,
+        'iterations': len(analyze_times),
+        'loop_hz': len(analyze_times) / duration if duration > 0 else 0.0,
+        'analyze_ms': float(np.mean(analyze_times) * 1000) if analyze_times else 0.0,
+        'key_events': world.key_events,
+    }
+
+
+def summarize(results):
+    caught = [r for r in results if r['outcome'] == 'caught']
+    catch_times = [r['catch_time'] for r in caught]
+    return {
+        'runs': len(results),
+        'success_rate': round(len(caught) / len(results), 3) if results else 0.0,
+        'escaped': sum(r['outcome'] == 'escaped' for r in results),
+        'timeout': sum(r['outcome'] == 'timeout' for r in results),
+        'catch_time_p50': round(float(np.percentile(catch_times, 50)), 2) if catch_times else None,
+        'catch_time_p95': round(float(np.percentile(catch_times, 95)), 2) if catch_times else None,
+        'loop_hz': round(float(np.mean([r['loop_hz'] for r in results])), 1) if results else 0.0,
+        'analyze_ms': round(float(np.mean([r['analyze_ms'] for r in results])), 3) if results else 0.0,
+        'key_events': round(float(np.mean([r['key_events'] for r in results])), 1) if results else 0.0,
+    }
+
+
+def parse_resolution(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ok-hotta 钓鱼小游戏模拟')
+    parser.add_argument('--runs', type=int, default=50, help='模拟的鱼数，每条鱼使用不同的 seed')
+    parser.add_argument('--seed', type=int, default=0, help='第一条鱼的 seed')
+    parser.add_argument('--model', default='normal', choices=sorted(FishModel.PRESETS), help='鱼的移动模型')
+    parser.add_argument('--resolution', type=parse_resolution, default=(1920, 1080))
+    parser.add_argument('--fps', type=float, default=60, help='模拟的截图帧率')
+    parser.add_argument('--max-time', type=float, default=120, help='单条鱼的最长模拟时间（秒）')
+    parser.add_argument('--output', help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    results = [run_once(FishModel.preset(args.model, seed), args.resolution, 1 / args.fps, args.max_time)
+               for seed in range(args.seed, args.seed + args.runs)]
+    summary = summarize(results)
+    print(f"模型 {args.model}，{args.resolution[0]}x{args.resolution[1]}，{args.runs} 条鱼")
+    print(f"成功率 {summary['success_rate']:.1%}（逃走 {summary['escaped']}，超时 {summary['timeout']}）")
+    print(f"上钩到收杆 p50 {summary['catch_time_p50']} 秒，p95 {summary['catch_time_p95']} 秒")
+    print(f"控制回路 {summary['loop_hz']} Hz（虚拟时间），单次分析 {summary['analyze_ms']} ms，"
+          f"平均按键 {summary['key_events']} 次")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': {k: v for k, v in vars(args).items() if k != 'output'},
+                       'summary': summary, 'runs': results}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
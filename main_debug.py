@@ -1,8 +1,15 @@
+from src.utils import StartupProfile
+
+startup_profile = StartupProfile.begin()
+
 import ok
+from ok import Logger
 from src.config import config
 
 if __name__ == '__main__':
     config = config
     config['debug'] = True
-    ok = ok.OK(config)
+    with StartupProfile.stage('ok.OK(config)'):
+        ok = ok.OK(config)
+    Logger.get_logger(__name__).info(startup_profile.finish())
     ok.start()
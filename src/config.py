@@ -1,7 +1,9 @@
 import os
-import numpy as np
 from ok import ConfigOption
 
+from src.utils.FramePipeline import FramePipeline, gray_view, half_view
+from src.utils.FrameRingBuffer import FrameRingBuffer
+
 version = "dev"
 
 # 游戏按键配置（包含源器键和技能键）
@@ -10,26 +12,42 @@ key_config_option = ConfigOption('游戏按键配置', {
     '技能键': 'e',      # 新增：普通技能键，用于自动技能触发器
 }, description='游戏技能按键')
 
+# 性能设置
+performance_config_option = ConfigOption('性能设置', {
+    '模板匹配线程数': 1,   # 1 为串行，0 为自动（CPU 核数，最多 4）
+    '记录调用耗时': False,  # 任务结束时把各调用的耗时直方图写入 logs/perf
+    '记录循环数据': True,   # 各循环的结果和阶段耗时写入 logs/run_metrics.sqlite3
+}, description='多个模板同时匹配时使用的线程数，以及调用耗时和循环数据记录')
+
 def make_bottom_right_black(frame):
+    """原地涂黑右下角水印区域，不再为每帧分配新数组"""
     try:
         height, width = frame.shape[:2]
-        black_width = int(0.13 * width)
-        black_height = int(0.025 * height)
-        start_x = width - black_width
-        start_y = height - black_height
-        black_rect = np.zeros((black_height, black_width, frame.shape[2]), dtype=frame.dtype)
-        frame[start_y:height, start_x:width] = black_rect
+        frame[height - int(0.025 * height):, width - int(0.13 * width):] = 0
         return frame
     except Exception as e:
         print(f"Error processing frame: {e}")
         return frame
 
+
+# 最近 10 秒画面（每秒 5 帧，480 宽 JPEG），任务异常或卡住时写入 logs/postmortem
+frame_ring = FrameRingBuffer(seconds=10, fps=5, width=480)
+
+# 截图预处理：原地处理阶段 + 按需计算、每帧最多一次的派生画面（任务中为 frame_gray / frame_half）
+frame_pipeline = FramePipeline(
+    stages=[make_bottom_right_black, frame_ring],
+    views={
+        'gray': gray_view,
+        'half': half_view,
+    },
+)
+
 config = {
     'debug': False,
     'use_gui': True,
     'config_folder': 'configs',
-    'global_configs': [key_config_option],  # 只保留一个游戏按键配置
-    'screenshot_processor': make_bottom_right_black,
+    'global_configs': [key_config_option, performance_config_option],
+    'screenshot_processor': frame_pipeline,
     'gui_icon': 'icons/icon.png',
     'wait_until_before_delay': 0,
     'wait_until_check_delay': 0,
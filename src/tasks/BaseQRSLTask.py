@@ -1,20 +1,324 @@
+import sqlite3
+import threading
 import time
-from ok import BaseTask, Box
+from contextlib import contextmanager, nullcontext
+from ok import BaseTask
 from ok import TaskDisabledException
+from src.config import config, frame_pipeline, frame_ring, performance_config_option
+from src.utils import ChestApproach
+from src.utils.DetectorService import DetectorService
+from src.utils.FrameCache import FrameResultCache, make_key
+from src.utils.Layout import Layout
+from src.utils.LatencyHistogram import LatencyRecorder, task_phase
+from src.utils import MatchPool
+from src.utils.OcrCache import OcrCache
+from src.utils import OcrRuntime
+from src.utils.PixelProbe import ProbeTable, METRIC_MAX, METRIC_SUM
+from src.utils import RunMetrics
+from src.utils import ScreenState
+from src.utils.SceneSettle import SceneSettle
+from src.utils import StartupProfile
+from src.utils import TemplatePack
+from src.utils.TemplateGroup import TemplateGroup
 
 class BaseQRSLTask(BaseTask):
     """QRSL游戏专用基础任务类"""
 
-    CHEST_NAMES = ['chest1', 'chest2', 'chest3', 'chest4', 'chest5']
+    CHEST_NAMES = ChestApproach.CHEST_NAMES
     ENTER_TEAM_COORDS = (1900, 320)
     AUTO_COMBAT_COORDS = (1160, 930)
     EXIT_CHECK_COORDS = (267, 65)
     MAIN_PAGE_COORDS = (22, 63)
     TARGET_CHECK_COORDS = (863, 1028)
     REF_RESOLUTION = (1920, 1080)
+    # 界面布局：名称 -> 参考坐标 (x, y) / 参考区域 (x1, y1, x2, y2)，子类可扩展
+    LAYOUT_POINTS = {
+        'enter_team': ENTER_TEAM_COORDS,
+        'auto_combat': AUTO_COMBAT_COORDS,
+        'exit_button': EXIT_CHECK_COORDS,
+    }
+    LAYOUT_BOXES = {}
+    # ok 在第一次识别时才创建 OCR 引擎；声明需要 OCR 的任务在开始时提前初始化并预热，
+    # 未声明的任务调用 OCR 时记录错误
+    REQUIRES_OCR = False
+    # OCR 预热使用的布局区域名，与任务实际识别的区域一致
+    OCR_WARMUP_BOXES = []
+    # OCR 内容缓存：缩略图逐像素灰度差容差与最大条数
+    OCR_CACHE_TOLERANCE = 8
+    OCR_CACHE_SIZE = 64
+    # 一个循环超过该时长（秒）视为卡住，写出最近画面
+    STALL_TIMEOUT = 600
+    # 画面帧差持续低于阈值多久视为场景已稳定（秒）
+    SCENE_SETTLE_TIME = 0.5
+    # 循环失败后重试前至少等待的时长（秒），界面未响应时不立即重试
+    RETRY_MIN_WAIT = 2
+    # 走向宝箱的方式（任务配置「走位模式」），见 ChestApproach
+    STEERING_PROPORTIONAL = ChestApproach.STEERING_PROPORTIONAL
+    STEERING_FIXED = ChestApproach.STEERING_FIXED
+    STEERING_MODES = ChestApproach.STEERING_MODES
+    DEFAULT_STEERING = ChestApproach.DEFAULT_STEERING
+    # 开启「记录调用耗时」后计时的方法
+    PERF_METHODS = ['find_feature', 'find_one', 'find_chests', 'find_parallel', 'wait_feature', 'ocr',
+                    'click', 'send_key', 'send_key_down', 'send_key_up', 'sleep', 'next_frame']
     TARGET_COLOR_BGR = (237, 166, 62)
     TARGET_CHECK_COLOR = (236, 236, 236)
 
+    # 像素探针：名称 -> (参考坐标, 期望 BGR, 容差, 判定方式)，子类可扩展
+    # 原 _color_similar 判定为差值和严格小于容差，这里统一为 <=，故容差减 1
+    PIXEL_PROBES = {
+        'exit_button_white': (EXIT_CHECK_COORDS, (255, 255, 255), 10, METRIC_MAX),
+        'target_check': (TARGET_CHECK_COORDS, TARGET_CHECK_COLOR, 9, METRIC_SUM),
+        'main_page': (MAIN_PAGE_COORDS, TARGET_COLOR_BGR, 29, METRIC_SUM),
+    }
+
+    def __init__(self, *args, **kwargs):
+        with StartupProfile.stage(f'{type(self).__name__}.__init__'):
+            super().__init__(*args, **kwargs)
+            resize_to = [tuple(r) for r in config['supported_resolution']['resize_to']]
+            # 模板包在第一次匹配宝箱时才加载
+            self.chest_group = TemplateGroup(self.CHEST_NAMES, threshold=0.8,
+                                             pack=lambda: TemplatePack.default_pack(resize_to))
+            self.detection_cache = FrameResultCache()
+            self.ocr_cache = OcrCache(max_size=self.OCR_CACHE_SIZE, tolerance=self.OCR_CACHE_TOLERANCE)
+            self.probe_table = ProbeTable(self.PIXEL_PROBES, self.REF_RESOLUTION)
+            self.layout = Layout(self.LAYOUT_POINTS, self.LAYOUT_BOXES, self.REF_RESOLUTION)
+            self.last_wait_stats = None
+            self._ocr_warned = False
+            self._ocr_warmup = None
+            self.ocr_latency = None
+            self.detectors = DetectorService(lambda: self.frame, on_error=self._on_detector_error)
+            self.perf = None
+            self.run_metrics = None
+            self._cycle_started = None
+            self._stall_dumped = False
+            self.run = self._run_with_records(self.run)
+
+    def _run_with_records(self, run):
+        """
+        按性能设置记录任务运行：「记录调用耗时」开启时为 PERF_METHODS 计时，结束时写出直方图；
+        「记录循环数据」开启时把各循环的结果和阶段耗时写入 RunMetrics 数据库
+        """
+        def wrapper(*args, **kwargs):
+            options = self.get_global_config(performance_config_option)
+            self.perf = None
+            self.run_metrics = None
+            if options.get('记录循环数据', True):
+                try:
+                    self.run_metrics = RunMetrics.RunMetrics().start_run(type(self).__name__)
+                except sqlite3.Error as e:
+                    self.log_error(f"循环数据库打开失败: {e}")
+            if options.get('记录调用耗时', False):
+                self.perf = LatencyRecorder(type(self).__name__)
+                self.perf.instrument(self, self.PERF_METHODS)
+            status = 'error'
+            self._cycle_started = None
+            stop_watchdog = threading.Event()
+            threading.Thread(target=self._watch_stall, args=(stop_watchdog,), name='stall-watchdog',
+                             daemon=True).start()
+            try:
+                result = run(*args, **kwargs)
+                status = 'finished'
+                return result
+            except TaskDisabledException:
+                status = 'stopped'
+                raise
+            except Exception:
+                self.dump_frames('error')
+                raise
+            finally:
+                stop_watchdog.set()
+                if self.perf is not None:
+                    self.perf.uninstrument(self)
+                    try:
+                        self.log_info(f"调用耗时直方图已写入 {self.perf.dump()}")
+                    except OSError as e:
+                        self.log_error(f"调用耗时直方图写入失败: {e}")
+                if self.run_metrics is not None:
+                    try:
+                        self.run_metrics.finish(status)
+                        self.log_info(f"本次运行统计:\n{self.run_metrics.metrics.report(run_id=self.run_metrics.run_id)}")
+                    except sqlite3.Error as e:
+                        self.log_error(f"循环数据写入失败: {e}")
+                    self.run_metrics.metrics.close()
+        return wrapper
+
+    @property
+    def phase_tracking(self):
+        return self.perf is not None or self.run_metrics is not None
+
+    @contextmanager
+    def phase(self, name):
+        """标记任务阶段，调用耗时和循环数据按阶段分别统计；两者都未开启时不做任何事"""
+        perf, run_metrics = self.perf, self.run_metrics
+        with perf.phase(name) if perf is not None else nullcontext(), \
+                run_metrics.phase(name) if run_metrics is not None else nullcontext():
+            yield
+
+    def dump_frames(self, reason):
+        """在后台把最近画面及其检测结果写入 logs/postmortem"""
+        def done(folder, result):
+            if isinstance(result, Exception):
+                self.log_error(f"最近画面写出失败: {result}")
+            else:
+                self.log_info(f"最近 {result} 帧画面已写入 {folder}")
+        frame_ring.dump_async(f'{type(self).__name__}_{reason}', on_done=done)
+
+    def _watch_stall(self, stop):
+        while not stop.wait(5):
+            started = self._cycle_started
+            if started is not None and not self._stall_dumped and time.time() - started > self.STALL_TIMEOUT:
+                self._stall_dumped = True
+                self.log_error(f"本次循环已持续 {time.time() - started:.0f} 秒，保存最近画面")
+                self.dump_frames('stall')
+
+    def begin_cycle(self):
+        """开始一个新循环，上一个循环在此结束"""
+        self._cycle_started = time.time()
+        self._stall_dumped = False
+        if self.run_metrics is not None:
+            self.run_metrics.begin_cycle()
+
+    def cycle_succeeded(self):
+        if self.run_metrics is not None:
+            self.run_metrics.mark(RunMetrics.SUCCESS)
+
+    def cycle_failed(self, failure):
+        """标记当前循环失败，failure 为失败路径名，用于统计各路径损失的时间"""
+        if self.run_metrics is not None:
+            self.run_metrics.mark(RunMetrics.FAILED, failure)
+
+    def prepare_ocr(self):
+        """
+        声明 REQUIRES_OCR 的任务在开始时调用
+        在后台线程初始化 OCR 引擎，并按 OCR_WARMUP_BOXES 中的区域和 target_height=540 预先识别，
+        首次与第二次识别的耗时记录在 ocr_latency 中。任务中的 OCR 调用会等待预热完成。
+        """
+        if not self.REQUIRES_OCR:
+            return
+        if self._ocr_warmup is not None:
+            return
+        layout = self.layout.resolve(self.frame)
+        boxes = [layout.box(name) for name in self.OCR_WARMUP_BOXES]
+        self._ocr_warmup = threading.Thread(target=self._warmup_ocr, args=(boxes, layout.width, layout.height),
+                                            name='ocr-warmup', daemon=True)
+        self._ocr_warmup.start()
+
+    def _warmup_ocr(self, boxes, width, height):
+        try:
+            self.ocr_latency = OcrRuntime.warmup(self.executor.ocr_lib, super().ocr, boxes, width, height)
+            warm = ', '.join(f"{name} {self.ocr_latency['cold_ms'][name]:.0f}->{ms:.0f}ms"
+                             for name, ms in self.ocr_latency['warm_ms'].items())
+            self.log_info(f"OCR 预热完成: 初始化 {self.ocr_latency['init_ms']:.0f}ms，首次->再次 {warm}")
+            self.info_set('OCR初始化耗时', f"{self.ocr_latency['init_ms']:.0f}ms")
+        except Exception as e:
+            self.log_error(f"OCR 预热失败: {e}")
+
+    def _wait_ocr_warmup(self):
+        warmup = self._ocr_warmup
+        if warmup is not None and warmup.is_alive() and warmup is not threading.current_thread():
+            warmup.join(timeout=60)
+
+    def _cached_detection(self, name, func, args, kwargs):
+        """
+        同一帧上相同参数的检测只执行一次，列表结果返回副本以免调用方修改缓存
+        实际执行的检测结果同时记入最近画面缓冲，随画面一起写出；指定 frame 参数的调用（后台检测）不缓存
+        """
+        frame = kwargs.get('frame')
+        if frame is None:
+            frame = self.frame
+        key = make_key(name, args, kwargs)
+
+        def compute():
+            result = func(*args, **kwargs)
+            frame_ring.annotate(frame, key or name, result)
+            return result
+
+        result = self.detection_cache.get(frame, key, compute)
+        return list(result) if isinstance(result, list) else result
+
+    def find_feature(self, *args, **kwargs):
+        return self._cached_detection('find_feature', super().find_feature, args, kwargs)
+
+    def find_one(self, *args, **kwargs):
+        return self._cached_detection('find_one', super().find_one, args, kwargs)
+
+    def match_workers(self):
+        """全局性能设置中的模板匹配线程数，默认串行，0 为自动"""
+        return self.get_global_config(performance_config_option).get('模板匹配线程数', 1)
+
+    def find_parallel(self, names, threshold=0, box=None, find_all=False):
+        """
+        在同一帧上同时匹配多个互不相关的模板，返回 {名称: 结果}，顺序与 names 一致
+        find_all 为 True 时结果为 find_feature 的列表，否则为 find_one 的 Box 或 None。
+        结果写入按帧缓存，之后在同一帧上以相同参数调用 find_one / find_feature 直接命中。
+        """
+        frame = self.frame
+        method = 'find_feature' if find_all else 'find_one'
+        find = super().find_feature if find_all else super().find_one
+        kwargs = {'threshold': threshold}
+        if box is not None:
+            kwargs['box'] = box
+
+        def job(name):
+            return lambda: self.detection_cache.get(frame, make_key(method, (name,), kwargs),
+                                                    lambda: find(name, frame=frame, **kwargs))
+
+        results = MatchPool.run_parallel([job(name) for name in names], self.match_workers())
+        return {name: list(result) if isinstance(result, list) else result
+                for name, result in zip(names, results)}
+
+    def ocr(self, *args, **kwargs):
+        return self._cached_detection('ocr', self._content_cached_ocr, args, kwargs)
+
+    def _content_cached_ocr(self, *args, **kwargs):
+        """指定 box 的识别按区域内容缓存，区域画面未变化时不再执行 OCR"""
+        if not self.REQUIRES_OCR and not self._ocr_warned:
+            self._ocr_warned = True
+            self.log_error(f"{type(self).__name__} 未声明 REQUIRES_OCR，OCR 引擎将在此时初始化")
+        self._wait_ocr_warmup()
+        ocr = super().ocr
+        box = kwargs.get('box')
+        if box is None:
+            return ocr(*args, **kwargs)
+        frame = kwargs.get('frame')
+        if frame is None:
+            frame = self.frame
+        # 按区域内容缓存，与识别的是哪一帧无关
+        key = make_key('ocr', args, {k: v for k, v in kwargs.items() if k != 'frame'})
+        result = self.ocr_cache.get(frame, box, key, lambda: ocr(*args, **kwargs))
+        self.info_set('OCR缓存命中率', f"{self.ocr_cache.stats()['hit_rate']:.0%}")
+        return result
+
+    def probe_pixels(self):
+        """一次取值得到当前帧上全部像素探针的结果，帧为空时返回空字典"""
+        frame = self.frame
+        return self.detection_cache.get(frame, ('probe_pixels',), lambda: self.probe_table.evaluate(frame))
+
+    def screen_state(self):
+        """按画面指纹判断当前所在界面，无法判断时返回 unknown"""
+        frame = self.frame
+        state, _ = self.detection_cache.get(
+            frame, ('screen_state',), lambda: ScreenState.default_classifier().classify(frame))
+        return state
+
+    @property
+    def frame_gray(self):
+        """当前帧的灰度图，每帧只计算一次，缓冲区在之后的帧中复用"""
+        return frame_pipeline.view(self.frame, 'gray')
+
+    @property
+    def frame_half(self):
+        """当前帧的半分辨率图，每帧只计算一次，缓冲区在之后的帧中复用"""
+        return frame_pipeline.view(self.frame, 'half')
+
+    def layout_point(self, name):
+        """当前分辨率下的布局点坐标"""
+        return self.layout.resolve(self.frame).point(name)
+
+    def layout_box(self, name):
+        """当前分辨率下的布局区域"""
+        return self.layout.resolve(self.frame).box(name)
+
     def _get_scaled_coordinates(self, ref_x, ref_y):
         frame = self.frame
         if frame is None:
@@ -55,58 +359,81 @@ class BaseQRSLTask(BaseTask):
             self.send_key_up(alt_key)
         return self._execute_atomic_operation(operation)
 
-    def _is_white_color(self, pixel_bgr, tolerance=10):
-        return all(245 <= color <= 255 for color in pixel_bgr)
-
-    def _color_similar(self, color1, color2, tolerance=30):
-        return sum(abs(int(color1[i]) - int(color2[i])) for i in range(3)) < tolerance
-
     def check_exit_button_color(self):
-        frame = self.frame
-        if frame is None:
-            return False
-        check_x, check_y = self._get_scaled_coordinates(*self.EXIT_CHECK_COORDS)
-        height, width = frame.shape[:2]
-        if check_y >= height or check_x >= width:
-            return False
-        pixel_color = frame[check_y, check_x]
-        return self._is_white_color(pixel_color)
+        return self.probe_pixels().get('exit_button_white', False)
 
     def check_target_color(self):
+        return self.probe_pixels().get('target_check', False)
+
+    def check_main_page_color(self):
+        return self.probe_pixels().get('main_page', False)
+
+    def wait_until_frame(self, predicate, timeout, name='wait'):
+        """
+        每到达一帧新画面执行一次 predicate，返回其第一个真值，超时返回最后一次的结果
+        先检查当前帧，之后由 next_frame 等待新截图，同一帧对象不会重复判断。
+        本次等待消耗的帧数和时间记录在 last_wait_stats 中。
+        """
+        start_time = time.time()
+        frames = 0
+        result = None
+        last_frame = None
         frame = self.frame
-        if frame is None:
-            return False
-        target_x, target_y = self._get_scaled_coordinates(*self.TARGET_CHECK_COORDS)
-        height, width = frame.shape[:2]
-        if target_y >= height or target_x >= width:
-            return False
-        pixel_color = frame[target_y, target_x]
-        return self._color_similar(pixel_color, self.TARGET_CHECK_COLOR, tolerance=10)
+        while True:
+            if frame is not None and frame is not last_frame:
+                last_frame = frame
+                frames += 1
+                result = predicate()
+                if result:
+                    break
+            elif frame is not None:
+                # 截图尚未更新，让出 CPU 而不是重复判断同一帧
+                self.sleep(0.005)
+            if time.time() - start_time >= timeout:
+                break
+            frame = self.next_frame()
+        elapsed = time.time() - start_time
+        self.last_wait_stats = {'name': name, 'frames': frames, 'elapsed': elapsed, 'success': bool(result)}
+        self.log_debug(f"{name}: {'成功' if result else '超时'}，检查 {frames} 帧，耗时 {elapsed:.2f} 秒")
+        return result
+
+    def wait_scene_settle(self, timeout, expect_change=False):
+        """
+        等待画面稳定且不在加载中，代替操作后的固定等待，timeout 为原来的等待时长
+        expect_change 为 True 时先等到画面发生变化（切换场景、打开界面等），再等稳定。
+        返回是否在超时前稳定，超时的情况与原来的固定等待相同。
+        """
+        settle = SceneSettle(self.SCENE_SETTLE_TIME, expect_change=expect_change)
+        return bool(self.wait_until_frame(lambda: settle.update(self.frame_half, time.time()), timeout,
+                                          name='wait_scene_settle'))
+
+    def retry_backoff(self, timeout=5):
+        """
+        循环失败后、重试前的等待，timeout 为原来的固定等待时长
+        失败时通常没有触发界面变化，先等待 RETRY_MIN_WAIT 秒，之后画面稳定即继续，总时长不超过 timeout
+        """
+        start = time.time()
+        self.sleep(self.RETRY_MIN_WAIT)
+        return self.wait_scene_settle(max(0, timeout - (time.time() - start)))
 
     def wait_for_exit_button_white(self, timeout=60):
         self.log_info(f"等待进入副本，超时{timeout}秒...")
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            if self.check_exit_button_color():
-                self.log_info("成功进入副本")
-                return True
-            self.sleep(0.5)
+        if self.wait_until_frame(self.check_exit_button_color, timeout, name='wait_for_exit_button_white'):
+            self.log_info("成功进入副本")
+            return True
         self.log_error("等待进入副本超时")
         return False
 
     def wait_for_target_color(self, timeout):
         self.log_info(f"等待目标颜色出现，超时{timeout}秒...")
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            if self.check_target_color():
-                self.log_info("检测到目标颜色")
-                return True
-            self.sleep(0.5)
+        if self.wait_until_frame(self.check_target_color, timeout, name='wait_for_target_color'):
+            self.log_info("检测到目标颜色")
+            return True
         self.log_error("等待目标颜色超时")
         return False
 
     def enter_team(self, alt_down_delay=0.8, click_delay=1, alt_key='alt'):
-        target_x, target_y = self._get_scaled_coordinates(*self.ENTER_TEAM_COORDS)
+        target_x, target_y = self.layout_point('enter_team')
         for attempt in range(10):
             success = self._click_with_alt(target_x, target_y, alt_down_delay, click_delay, alt_key)
             if not success:
@@ -122,10 +449,11 @@ class BaseQRSLTask(BaseTask):
         return False, None
 
     def start_auto_combat(self, alt_down_delay=0.8, click_delay=1.5, alt_key='alt'):
-        target_x, target_y = self._get_scaled_coordinates(*self.AUTO_COMBAT_COORDS)
+        target_x, target_y = self.layout_point('auto_combat')
         success = self._click_with_alt(target_x, target_y, alt_down_delay, click_delay, alt_key)
         return success
 
+    @task_phase('enter_dungeon')
     def enter_dungeon(self):
         self.log_info("开始进入副本流程...")
         success, attend_box = self.enter_team(alt_down_delay=0.8, click_delay=1)
@@ -141,171 +469,90 @@ class BaseQRSLTask(BaseTask):
         self._click_box_safe(enter_box, after_sleep=0.5)         # 替换
         return self.wait_for_exit_button_white(timeout=60)
 
+    @task_phase('exit_dungeon')
     def exit_dungeon(self):
-        frame = self.frame
-        if frame is None:
-            return False
-        check_x, check_y = self._get_scaled_coordinates(*self.EXIT_CHECK_COORDS)
-        pixel_color = frame[check_y, check_x]
-        if not self._is_white_color(pixel_color):
+        if not self.check_exit_button_color():
             return False
+        check_x, check_y = self.layout_point('exit_button')
         if not self._click_with_alt(check_x, check_y, alt_down_delay=0.8, click_delay=1.5):
             return False
         confirm_box = self.wait_feature('confirm', time_out=10, threshold=0.7)
         if confirm_box:
             confirm_center = confirm_box.center()
             if self._click_with_alt(confirm_center[0], confirm_center[1], alt_down_delay=0.8, click_delay=1.5):
-                self.sleep(10)
+                self.wait_scene_settle(10, expect_change=True)
                 return True
         return False
 
+    @task_phase('main_page')
     def is_main_page(self):
         max_attempts = 30
         attempts = 0
         while attempts < max_attempts:
             attempts += 1
-            frame = self.frame
-            if frame is None:
+            if self.frame is None:
                 self.sleep(1)
                 continue
-            height, width = frame.shape[:2]
-            current_x, current_y = self._get_scaled_coordinates(*self.MAIN_PAGE_COORDS)
-            pixel_color = frame[current_y, current_x]
-            if self._color_similar(pixel_color, self.TARGET_COLOR_BGR):
+            probes = self.probe_pixels()
+            if probes['main_page']:
                 self.sleep(2)
                 return True
-            back_box = self.find_one('back', threshold=0.75)
-            if back_box:
-                self._click_box_safe(back_box, after_sleep=2)
-                self.next_frame()
+            self.log_debug(f"is_main_page: 第{attempts}次未在主页")
+            button_names = ['back', 'cancel']
+            clicked = False
+            buttons = self.find_parallel(button_names, threshold=0.75)
+            for name in button_names:
+                button_box = buttons[name]
+                if button_box:
+                    self._click_box_safe(button_box, after_sleep=2)
+                    self.next_frame()
+                    clicked = True
+                    break
+            if clicked:
                 continue
-            cancel_box = self.find_one('cancel', threshold=0.75)
-            if cancel_box:
-                self._click_box_safe(cancel_box, after_sleep=2)
-                self.next_frame()
-                continue
-            check_x, check_y = self._get_scaled_coordinates(*self.EXIT_CHECK_COORDS)
-            pixel_color = frame[check_y, check_x]
-            if self._is_white_color(pixel_color):
+            if probes['exit_button_white']:
                 self.exit_dungeon()
-                self.sleep(10)
+                self.wait_scene_settle(10)
                 self.next_frame()
                 continue
             self.back(after_sleep=2)
             self.next_frame()
         return False
 
+    def find_chests(self, threshold=0.8, names=None, box=None, frame=None):
+        """在当前帧（或给定帧）上一次性匹配全部宝箱模板，返回按置信度排序的结果"""
+        kwargs = {'threshold': threshold, 'names': names, 'box': box}
+        if frame is not None:
+            kwargs['frame'] = frame
+        return self._cached_detection(
+            'find_chests',
+            lambda **kwargs: self.chest_group.detect(self, workers=self.match_workers(), **kwargs),
+            (), kwargs)
+
+    def detect_chest(self, frame, threshold=0.8):
+        """在给定帧上匹配宝箱，供后台检测服务使用，不经过按帧缓存"""
+        return self.chest_group.detect_one(self, frame=frame, threshold=threshold, workers=self.match_workers())
+
+    def _on_detector_error(self, name, error):
+        if not isinstance(error, TaskDisabledException):
+            self.log_debug(f"后台检测器 {name} 异常: {error}")
+
+    def find_any_chest(self, threshold=0.8, box=None):
+        results = self.find_chests(threshold=threshold, box=box)
+        return results[0] if results else None
+
+    @task_phase('wait_chest')
     def wait_any_chest(self, time_out=30):
-        start_time = time.time()
-        while time.time() - start_time < time_out:
-            frame = self.frame
-            if frame is None:
-                self.sleep(0.5)
-                continue
-            height, width = frame.shape[:2]
-            full_box = Box(0, 0, width, height)
-            for name in self.CHEST_NAMES:
-                result = self.find_feature(name, box=full_box, threshold=0.8)
-                if result:
-                    return result[0]
-            self.sleep(1)
-        return None
+        return self.wait_until_frame(lambda: self.find_any_chest(threshold=0.8), time_out, name='wait_any_chest')
 
+    @task_phase('approach_chest')
     def approach_chest(self, max_walk_time=60):
-        target_chest = self.wait_any_chest(time_out=30)
-        if target_chest is None:
-            return False
-        start_time = time.time()
-        chest_disappear_count = 0
-        last_key_press_time = 0
-        key_press_interval = 0.15
-        locked_chest_type = None
-        try:
-            while time.time() - start_time < max_walk_time:
-                current_time = time.time()
-                if self.find_one('opened chest', threshold=0.7):
-                    self.sleep(0.5)
-                    return True
-                if current_time - last_key_press_time < key_press_interval:
-                    self.sleep(0.05)
-                    continue
-                frame = self.frame
-                if frame is None:
-                    continue
-                height, width = frame.shape[:2]
-                full_box = Box(0, 0, width, height)
-                screen_center_x = width // 2
-                current_chest = None
-                if locked_chest_type:
-                    results = self.find_feature(locked_chest_type, box=full_box, threshold=0.8)
-                    if results:
-                        current_chest = results[0] if len(results) == 1 else self._get_closest_box(results, target_chest)
-                if current_chest is None:
-                    for name in self.CHEST_NAMES:
-                        results = self.find_feature(name, box=full_box, threshold=0.6)
-                        if results:
-                            locked_chest_type = name
-                            current_chest = results[0] if len(results) == 1 else self._get_closest_box(results, target_chest)
-                            break
-                if current_chest is None:
-                    chest_disappear_count += 1
-                    if chest_disappear_count >= 5:
-                        current_chest = self._reacquire_chest()
-                        if current_chest is None:
-                            return False
-                else:
-                    chest_disappear_count = 0
-                target_chest = current_chest
-                chest_x, chest_y = target_chest.center()
-                if not self._adjust_position(chest_x, chest_y, screen_center_x, width, height):
-                    last_key_press_time = current_time
-        except Exception as e:
-            self.log_error(f"接近宝箱异常: {e}")
-            return False
-        return bool(self.find_one('opened chest', threshold=0.7))
-
-    def _get_closest_box(self, boxes, target_box):
-        last_center = target_box.center()
-        distances = [abs(r.center()[0] - last_center[0]) + abs(r.center()[1] - last_center[1]) for r in boxes]
-        closest_idx = distances.index(min(distances))
-        return boxes[closest_idx]
+        """逐步走向宝箱，直到出现 opened chest 图标，见 ChestApproach.approach_chest"""
+        return ChestApproach.approach_chest(self, max_walk_time)
 
-    def _reacquire_chest(self):
-        for _ in range(10):
-            frame = self.frame
-            if frame is None:
-                continue
-            height, width = frame.shape[:2]
-            full_box = Box(0, 0, width, height)
-            for name in self.CHEST_NAMES:
-                results = self.find_feature(name, box=full_box, threshold=0.6)
-                if results:
-                    return results[0]
-            self.sleep(0.5)
-        return None
-
-    def _adjust_position(self, chest_x, chest_y, screen_center_x, width, height):
-        center_tolerance = int(width * 0.05)
-        center_min = screen_center_x - center_tolerance
-        center_max = screen_center_x + center_tolerance
-        vertical_threshold = int(height * (800 / 1080))
-        left_boundary = int(width * (450 / 1920))
-        right_boundary = int(width * (1470 / 1920))
-        if chest_x < center_min or chest_x > center_max:
-            horizontal_error = chest_x - screen_center_x
-            if chest_x < left_boundary or chest_x > right_boundary:
-                key = 'a' if horizontal_error < 0 else 'd'
-                down_time = 1.0
-            else:
-                key = 'a' if horizontal_error < 0 else 'd'
-                down_time = 0.1
-            self._send_key_safe(key, down_time)
-            return False
-        if chest_y < vertical_threshold:
-            self._send_key_safe('w', 1.0)
-        else:
-            self._send_key_safe('s', 1.0)
-        return True
+    def chest_steering(self):
+        """按任务配置的「走位模式」为一次走向宝箱创建比例控制器，固定步长模式返回 None"""
+        return ChestApproach.make_steering(self.config.get('走位模式', self.DEFAULT_STEERING))
 
     def _send_key_safe(self, key, down_time=0.1):
         try:
@@ -322,21 +569,8 @@ class BaseQRSLTask(BaseTask):
 
     def wait_for_main_page_color(self, timeout=60):
         self.log_info(f"等待主页颜色出现，超时{timeout}秒...")
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            frame = self.frame
-            if frame is None:
-                self.sleep(0.5)
-                continue
-            x, y = self._get_scaled_coordinates(*self.MAIN_PAGE_COORDS)
-            height, width = frame.shape[:2]
-            if y >= height or x >= width:
-                self.sleep(0.5)
-                continue
-            pixel_color = frame[y, x]
-            if self._color_similar(pixel_color, self.TARGET_COLOR_BGR, tolerance=30):
-                self.log_info("检测到主页颜色")
-                return True
-            self.sleep(0.5)
+        if self.wait_until_frame(self.check_main_page_color, timeout, name='wait_for_main_page_color'):
+            self.log_info("检测到主页颜色")
+            return True
         self.log_error("等待主页颜色超时")
         return False
\ No newline at end of file
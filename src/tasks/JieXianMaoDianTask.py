@@ -1,9 +1,10 @@
 # src/tasks/JieXianMaoDianTask.py
 
 import time
-from ok import TaskDisabledException, Box
+from ok import TaskDisabledException
 from qfluentwidgets import FluentIcon
 from src.tasks.BaseQRSLTask import BaseQRSLTask
+from src.utils.TextTrigger import TextTrigger
 
 class JieXianMaoDianTask(BaseQRSLTask):
     """
@@ -14,6 +15,24 @@ class JieXianMaoDianTask(BaseQRSLTask):
     支持设置排除文字，当检测到的文本包含排除词时忽略。
     """
 
+    REQUIRES_OCR = True
+    OCR_WARMUP_BOXES = ['detect', 'msg_check']
+
+    # 原始脚本的默认坐标（1080p 分辨率）
+    LAYOUT_POINTS = {
+        **BaseQRSLTask.LAYOUT_POINTS,
+        'player_avatar': (265, 869),     # 1.玩家头像
+        'apply_team': (316, 772),        # 2.申请入队
+        'teleport': (1530, 297),         # 3.传送
+        'confirm_teleport': (1242, 579),  # 4.确认传送
+    }
+    CLICK_SEQUENCE = ['player_avatar', 'apply_team', 'teleport', 'confirm_teleport']
+    LAYOUT_BOXES = {
+        **BaseQRSLTask.LAYOUT_BOXES,
+        'detect': (360, 879, 513, 916),  # 主检测区域
+        'msg_check': (760, 900, 920, 940),  # 新消息检测区域
+    }
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.name = "解限锚点"
@@ -39,32 +58,23 @@ class JieXianMaoDianTask(BaseQRSLTask):
             '模式选择': {'type': 'drop_down', 'options': ['半自动']},
         }
 
-        # 原始脚本的默认坐标（1080p 分辨率）
-        self.DEFAULT_CLICK_POSITIONS = [
-            (265, 869),   # 1.玩家头像
-            (316, 772),   # 2.申请入队
-            (1530, 297),  # 3.传送
-            (1242, 579)   # 4.确认传送
-        ]
-        self.DEFAULT_DETECT_REGION = (360, 879, 513, 916)  # 主检测区域
-        self.MSG_CHECK_REGION = (760, 900, 920, 940)       # 新消息检测区域
-
     def run(self):
         try:
             self.log_info("===== 解限锚点任务启动 =====", notify=True)
+            self.prepare_ocr()
 
             # 1. 读取并验证配置
             target_raw = self.config.get('检测文字', '').strip()
             if not target_raw:
                 self.log_error("未设置检测文字，任务终止")
                 return
-            keywords = [kw.strip() for kw in target_raw.split(',') if kw.strip()]
+            exclude_raw = self.config.get('排除文字', '').strip()
+            trigger = TextTrigger.from_config(target_raw, exclude_raw)
+            keywords = trigger.include
             if not keywords:
                 self.log_error("检测文字格式错误，请用英文逗号分隔多个关键词")
                 return
-
-            exclude_raw = self.config.get('排除文字', '').strip()
-            exclude_words = [w.strip() for w in exclude_raw.split(',') if w.strip()] if exclude_raw else []
+            exclude_words = trigger.exclude
 
             mode = self.config.get('模式选择', '半自动')
             self.log_info(f"当前模式: {mode}")
@@ -74,37 +84,15 @@ class JieXianMaoDianTask(BaseQRSLTask):
 
             # 2. 获取缩放后的坐标
             self.next_frame()
-            click_points = []
-            for x, y in self.DEFAULT_CLICK_POSITIONS:
-                scaled_x, scaled_y = self._get_scaled_coordinates(x, y)
-                click_points.append((scaled_x, scaled_y))
-
-            # 主检测区域缩放
-            x1, y1, x2, y2 = self.DEFAULT_DETECT_REGION
-            x1_scaled, y1_scaled = self._get_scaled_coordinates(x1, y1)
-            x2_scaled, y2_scaled = self._get_scaled_coordinates(x2, y2)
-            if x1_scaled > x2_scaled:
-                x1_scaled, x2_scaled = x2_scaled, x1_scaled
-            if y1_scaled > y2_scaled:
-                y1_scaled, y2_scaled = y2_scaled, y1_scaled
-            detect_box = Box(x1_scaled, y1_scaled,
-                             width=x2_scaled - x1_scaled,
-                             height=y2_scaled - y1_scaled)
-
-            # 新消息检测区域缩放
-            mx1, my1, mx2, my2 = self.MSG_CHECK_REGION
-            mx1_scaled, my1_scaled = self._get_scaled_coordinates(mx1, my1)
-            mx2_scaled, my2_scaled = self._get_scaled_coordinates(mx2, my2)
-            if mx1_scaled > mx2_scaled:
-                mx1_scaled, mx2_scaled = mx2_scaled, mx1_scaled
-            if my1_scaled > my2_scaled:
-                my1_scaled, my2_scaled = my2_scaled, my1_scaled
-            msg_box = Box(mx1_scaled, my1_scaled,
-                          width=mx2_scaled - mx1_scaled,
-                          height=my2_scaled - my1_scaled)
-
-            self.log_info(f"主检测区域: ({x1_scaled},{y1_scaled})-({x2_scaled},{y2_scaled})")
-            self.log_info(f"新消息区域: ({mx1_scaled},{my1_scaled})-({mx2_scaled},{my2_scaled})")
+            layout = self.layout.resolve(self.frame)
+            click_points = [layout.point(name) for name in self.CLICK_SEQUENCE]
+            detect_box = layout.box('detect')
+            msg_box = layout.box('msg_check')
+
+            self.log_info(f"主检测区域: ({detect_box.x},{detect_box.y})-"
+                          f"({detect_box.x + detect_box.width},{detect_box.y + detect_box.height})")
+            self.log_info(f"新消息区域: ({msg_box.x},{msg_box.y})-"
+                          f"({msg_box.x + msg_box.width},{msg_box.y + msg_box.height})")
             self.log_info(f"点击坐标: {click_points}")
             if exclude_words:
                 self.log_info(f"排除文字: {exclude_words}")
@@ -134,26 +122,24 @@ class JieXianMaoDianTask(BaseQRSLTask):
 
                 # 3.2 主文字检测（带排除逻辑）
                 ocr_results = self.ocr(box=detect_box, target_height=540)
-                if ocr_results:
-                    for box in ocr_results:
-                        text = box.name
-                        # 检查排除词
-                        if exclude_words and any(ex in text for ex in exclude_words):
-                            self.log_debug(f"忽略包含排除词的文本: {text}")
-                            continue
-                        for kw in keywords:
-                            if kw in text:
-                                matched_text = kw
-                                self.log_info(f"✅ 检测到目标文字: {text} (关键词: {kw})")
-                                break
-                        if matched_text:
-                            break
+                for box in ocr_results or []:
+                    # 一次扫描得到包含词和排除词的全部命中
+                    includes, excludes = trigger.scan(box.name)
+                    if excludes:
+                        self.log_debug(f"忽略包含排除词的文本: {box.name}")
+                        continue
+                    if includes:
+                        matched_text = includes[0]
+                        self.log_info(f"✅ 检测到目标文字: {box.name} (关键词: {matched_text})")
+                        break
                 if matched_text:
                     break
 
                 self.log_debug(f"未检测到 {keywords}，继续...")
                 self.sleep(0.5)
 
+            self.log_debug(f"OCR缓存统计: {self.ocr_cache.stats()}")
+
             # 4. 执行完整点击序列（四步）
             self.log_info("开始执行点击序列")
             try:
@@ -194,6 +180,7 @@ class JieXianMaoDianTask(BaseQRSLTask):
 
         except TaskDisabledException:
             self.log_info("解限锚点任务被用户手动停止")
+            raise
         except Exception as e:
             self.log_error(f"解限锚点任务异常: {e}", notify=True)
             self.screenshot("jiexian_error")
@@ -1,5 +1,5 @@
 import time
-from ok import Box, TaskDisabledException
+from ok import TaskDisabledException
 from qfluentwidgets import FluentIcon
 from src.tasks.BaseQRSLTask import BaseQRSLTask
 
@@ -21,6 +21,7 @@ class LianHeZuoZhanTask(BaseQRSLTask):
             '宝箱等待超时': 180,
             '启用前进': False,      # 开关在前
             '前进时间': 7,          # 时间在后
+            '走位模式': self.DEFAULT_STEERING,
         })
 
         self.config_description = {
@@ -28,7 +29,9 @@ class LianHeZuoZhanTask(BaseQRSLTask):
             '宝箱等待超时': '等待宝箱的超时时间（秒）',
             '启用前进': '是否执行前进步骤（若关闭则跳过前进，直接开启自动战斗）',
             '前进时间': '按W键前进的时间（秒）',
+            '走位模式': '走向宝箱的方式：默认固定步长，逐步按键；比例控制按偏差计算按键时长，可同时横移和前进',
         }
+        self.config_type['走位模式'] = {'type': "drop_down", 'options': self.STEERING_MODES}
 
     def run(self):
         """联合作战自动化流程"""
@@ -48,12 +51,14 @@ class LianHeZuoZhanTask(BaseQRSLTask):
             while loop_count < max_loops:
                 loop_count += 1
                 self.log_info(f"--- 第 {loop_count}/{max_loops} 次循环开始 ---")
+                self.begin_cycle()
 
                 # 确保游戏在主页面
                 self.log_info("检测是否在游戏主页面...")
                 if not self.is_main_page():
                     self.log_error("无法进入游戏主页面，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('main_page')
+                    self.retry_backoff(5)
                     continue
 
                 self.log_info("确认在主页面")
@@ -62,7 +67,8 @@ class LianHeZuoZhanTask(BaseQRSLTask):
                 self.log_info("尝试进入副本...")
                 if not self.enter_dungeon():
                     self.log_error("进入副本失败，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('enter_dungeon')
+                    self.retry_backoff(5)
                     continue
 
                 self.log_info("成功进入副本")
@@ -74,58 +80,57 @@ class LianHeZuoZhanTask(BaseQRSLTask):
                 else:
                     self.log_info("前进功能已禁用，跳过前进步骤")
 
-                # 开启自动战斗
-                self.log_info("开启自动战斗...")
-                self.start_auto_combat()
-                self.sleep(2)
-
-                # 等待宝箱出现
-                self.log_info(f"等待宝箱出现（超时{chest_timeout}秒）...")
-                start_time = time.time()
-                found_opened_chest = False
-                found_unopened_chest = False
-                chest_box = None
-
-                while time.time() - start_time < chest_timeout:
-                    frame = self.frame
-                    if frame is None:
-                        self.sleep(0.5)
-                        continue
-                    height, width = frame.shape[:2]
-                    full_box = Box(0, 0, width, height)
-
-                    opened_box = self.find_one('opened chest', threshold=0.7)
-                    if opened_box:
-                        self.log_info("检测到已打开的宝箱")
-                        found_opened_chest = True
-                        break
-
-                    for name in ['chest1', 'chest2', 'chest3', 'chest4', 'chest5']:
-                        result = self.find_feature(name, box=full_box, threshold=0.8)
-                        if result:
-                            chest_box = result[0]
-                            self.log_info(f"检测到未打开的宝箱: {name}")
-                            found_unopened_chest = True
+                with self.phase('combat'):
+                    # 开启自动战斗
+                    self.log_info("开启自动战斗...")
+                    self.start_auto_combat()
+                    self.sleep(2)
+
+                    # 等待宝箱出现
+                    self.log_info(f"等待宝箱出现（超时{chest_timeout}秒）...")
+                    start_time = time.time()
+                    found_opened_chest = False
+                    found_unopened_chest = False
+                    chest_box = None
+
+                    while time.time() - start_time < chest_timeout:
+                        if self.frame is None:
+                            self.sleep(0.5)
+                            continue
+
+                        opened_box = self.find_one('opened chest', threshold=0.7)
+                        if opened_box:
+                            self.log_info("检测到已打开的宝箱")
+                            found_opened_chest = True
                             break
 
-                    if found_opened_chest or found_unopened_chest:
-                        break
+                        chest_box = self.find_any_chest(threshold=0.8)
+                        if chest_box:
+                            self.log_info(f"检测到未打开的宝箱: {chest_box.name}")
+                            found_unopened_chest = True
+
+                        if found_opened_chest or found_unopened_chest:
+                            break
 
-                    self.sleep(0.5)
+                        self.sleep(0.5)
 
                 # 根据宝箱状态执行操作
                 if found_opened_chest:
                     self.log_info("检测到已打开的宝箱，直接退出副本...")
+                    self.cycle_succeeded()
                 elif found_unopened_chest and chest_box:
                     self.log_info("检测到未打开的宝箱，尝试接近并打开...")
                     remaining_time = chest_timeout - (time.time() - start_time)
                     success = self.approach_chest(max_walk_time=remaining_time)
                     if success:
                         self.log_info("成功打开宝箱")
+                        self.cycle_succeeded()
                     else:
                         self.log_error("打开宝箱失败")
+                        self.cycle_failed('approach_chest')
                 else:
                     self.log_error(f"{chest_timeout}秒内未找到任何宝箱，退出副本重试")
+                    self.cycle_failed('no_chest')
 
                 # 退出副本
                 self.log_info("退出副本...")
@@ -139,6 +144,7 @@ class LianHeZuoZhanTask(BaseQRSLTask):
         except TaskDisabledException:
             # 用户手动停止，仅记录信息，不视为错误
             self.log_info("联合作战任务被用户手动停止")
+            raise
         except Exception as e:
             self.log_error(f"任务执行过程中出现异常: {e}", exception=e, notify=True)
             self.screenshot("lianhezuozhan_error")
@@ -1,14 +1,65 @@
 import time
-import threading
-from ok import Box, TaskDisabledException
+from ok import TaskDisabledException
 from qfluentwidgets import FluentIcon
 from src.tasks.BaseQRSLTask import BaseQRSLTask
 from src.config import key_config_option
+from src.utils import ChestApproach
+from src.utils.DetectorService import DetectorService
+from src.utils.LatencyHistogram import task_phase
+from src.utils.PixelProbe import METRIC_MAX, METRIC_SUM
+from src.utils.TextTrigger import TextTrigger
 
 
 class MoKuaiJinBiTask(BaseQRSLTask):
     """模块金币·世界BOSS自动化任务"""
 
+    REQUIRES_OCR = True
+    # 战斗阶段最长可等待 900 秒
+    STALL_TIMEOUT = 1200
+    OCR_WARMUP_BOXES = ['chest_prompt']
+
+    # 走到宝箱旁时出现的交互提示文字
+    CHEST_PROMPT_TRIGGER = TextTrigger(ChestApproach.CHEST_PROMPT_KEYWORDS)
+    # 交互提示需按帧时间连续出现的时长（秒）
+    PROMPT_STABLE_TIME = ChestApproach.PROMPT_STABLE_TIME
+    # 走向宝箱时宝箱按帧时间连续多久未被找到视为丢失（秒）
+    CHEST_LOST_TIME = ChestApproach.CHEST_LOST_TIME
+
+    LAYOUT_POINTS = {
+        **BaseQRSLTask.LAYOUT_POINTS,
+        'world_boss_entry': (350, 940),
+        'huanxie': (1340, 920),
+        'claim_reward': (1255, 575),
+    }
+    LAYOUT_BOXES = {
+        **BaseQRSLTask.LAYOUT_BOXES,
+        **ChestApproach.LAYOUT_BOXES,
+    }
+
+    # 搜索宝箱的移动序列：(按键..., 按下时长, 之后等待)
+    CROSS_SEARCH_MOVES = [
+        ('w', 5.0, 0.5),
+        ('s', 10.0, 0.5),
+        ('w', 5.0, 0.5),
+        ('a', 5.0, 0.5),
+        ('d', 10.0, 0.5),
+    ]
+    MI_SEARCH_MOVES = CROSS_SEARCH_MOVES + [
+        ('a', 5.0, 0.5),
+        ('a', 'w', 5.0, 0.5),
+        ('s', 'd', 10.0, 0.5),
+        ('a', 'w', 5.0, 0.5),
+        ('w', 'd', 5.0, 0.5),
+        ('a', 's', 10.0, 0.5),
+    ]
+
+    PIXEL_PROBES = {
+        **BaseQRSLTask.PIXEL_PROBES,
+        'boss_bar': ((1216, 157), (161, 209, 47), 0, METRIC_MAX),
+        'boss_marker': ((22, 410), (237, 166, 62), 0, METRIC_MAX),
+        'character_normal': ((1805, 698), (254, 195, 57), 50, METRIC_SUM),
+    }
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.name = "模块金币"
@@ -22,6 +73,7 @@ class MoKuaiJinBiTask(BaseQRSLTask):
             '等待超时': 900,
             '循环次数': 10000,
             '搜索模式': '十字搜索',
+            '走位模式': self.DEFAULT_STEERING,
             '提示信息': (
                 "建议修改自动战斗索敌范围，文件在C:\\Users\\你的用户名\\AppData（文件夹上方查看，点击隐藏的项目）"
                 "\\Local\\Hotta\\Saved\\Config\\WindowsNoEditor，找到GameUserSettings.ini文件，"
@@ -33,9 +85,11 @@ class MoKuaiJinBiTask(BaseQRSLTask):
             '等待超时': '神临BOSS后未检测到BOSS的等待时间',
             '循环次数': '任务执行的最大循环次数',
             '搜索模式': '选择宝箱搜索方式',
+            '走位模式': '走向宝箱的方式：默认固定步长，逐步按键；比例控制按偏差计算按键时长，可同时横移和前进',
             '提示信息': '索敌范围',
         }
         self.config_type['搜索模式'] = {'type': "drop_down", 'options': ['十字搜索', '米字搜索']}
+        self.config_type['走位模式'] = {'type': "drop_down", 'options': self.STEERING_MODES}
         self.config_type['BOSS选择'] = {
             'type': "drop_down",
             'options': ['罗贝拉格/朱厌', '阿波菲斯', '幻蝎']  # 添加了“幻蝎”选项
@@ -47,6 +101,8 @@ class MoKuaiJinBiTask(BaseQRSLTask):
             # 幻蝎无需图片，直接点击坐标
         }
         self.last_shenlin_time = 0
+        # 走向宝箱时 OCR 与宝箱定位（self.detectors）各用一个后台线程，互不等待
+        self.ocr_detectors = DetectorService(lambda: self.frame, on_error=self._on_detector_error)
 
     def _get_source_key(self):
         try:
@@ -56,11 +112,12 @@ class MoKuaiJinBiTask(BaseQRSLTask):
             self.log_debug("读取全局源器键失败，使用默认值 'x'")
             return 'x'
 
+    @task_phase('enter_boss')
     def _open_map_and_enter_boss(self):
         self.log_info("按M打开地图")
         self.send_key('m')
-        self.sleep(2)
-        click_x, click_y = self._get_scaled_coordinates(350, 940)
+        self.wait_scene_settle(2, expect_change=True)
+        click_x, click_y = self.layout_point('world_boss_entry')
         self.log_info(f"点击世界BOSS入口，缩放后坐标: ({click_x}, {click_y})")
         self._click_safe(click_x, click_y, after_sleep=2)  # 替换
         return True
@@ -70,7 +127,7 @@ class MoKuaiJinBiTask(BaseQRSLTask):
 
         # 处理“幻蝎”：点击固定坐标
         if boss_choice == '幻蝎':
-            x, y = self._get_scaled_coordinates(1340, 920)  # 原始分辨率下的坐标
+            x, y = self.layout_point('huanxie')
             self.log_info(f"幻蝎: 点击固定坐标 ({x}, {y})")
             self._click_safe(x, y, after_sleep=1)  # 点击后等待1秒
             return True
@@ -112,314 +169,108 @@ class MoKuaiJinBiTask(BaseQRSLTask):
         return True
 
     def wait_for_main_page_color(self, timeout):
-        start = time.time()
-        while time.time() - start < timeout:
-            if self.check_main_page_color():
-                return True
-            self.sleep(0.5)
-        return False
-
-    def check_main_page_color(self):
-        frame = self.frame
-        if frame is None:
-            return False
-        x, y = self._get_scaled_coordinates(*self.MAIN_PAGE_COORDS)
-        if y >= frame.shape[0] or x >= frame.shape[1]:
-            return False
-        pixel = frame[y, x]
-        return self._color_similar(pixel, self.TARGET_COLOR_BGR, tolerance=30)
+        return bool(self.wait_until_frame(self.check_main_page_color, timeout, name='wait_for_main_page_color'))
 
+    @task_phase('combat')
     def _phase_a_combat_monitoring(self, timeout):
         self.log_info(f"进入战斗监测阶段，超时{timeout}秒")
         start_time = time.time()
-        chest_found = None
+        # 战斗中只监测首领刷新，不做整帧宝箱扫描，宝箱在战斗结束后查找
         while time.time() - start_time < timeout:
             if self._is_boss_spawned():
                 self.log_info("检测到首领刷新！")
                 return 'boss_found', None
-            chest = self.wait_any_chest(time_out=0)
-            if chest:
-                self.log_info(f"战斗过程中发现宝箱: {chest.name}")
-                chest_found = chest
-                return 'chest_found', chest_found
             self.sleep(2)
         self.log_info("战斗阶段超时")
         return 'timeout', None
 
     def _is_boss_spawned(self):
-        frame = self.frame
-        if frame is None:
-            return False
-        x1, y1 = self._get_scaled_coordinates(1216, 157)
-        x2, y2 = self._get_scaled_coordinates(22, 410)
-        h, w = frame.shape[:2]
-        if y1 >= h or x1 >= w or y2 >= h or x2 >= w:
-            return False
-        pixel1 = frame[y1, x1]
-        pixel2 = frame[y2, x2]
-        color1_match = (pixel1[0] == 161 and pixel1[1] == 209 and pixel1[2] == 47)
-        color2_match = (pixel2[0] == 237 and pixel2[1] == 166 and pixel2[2] == 62)
-        return color1_match and color2_match
+        probes = self.probe_pixels()
+        return probes.get('boss_bar', False) and probes.get('boss_marker', False)
 
+    @task_phase('wait_boss_ui')
     def _phase_b_wait_boss_ui_disappear(self, timeout=600):
         self.log_info(f"等待首领提示消失，超时{timeout}秒（单次判定，双点检测）...")
         start = time.time()
         while time.time() - start < timeout:
-            frame = self.frame
-            if frame is None:
+            if self.frame is None:
                 self.sleep(0.5)
                 continue
-            x1, y1 = self._get_scaled_coordinates(1216, 157)
-            x2, y2 = self._get_scaled_coordinates(22, 410)
-            h, w = frame.shape[:2]
-            if y1 < h and x1 < w and y2 < h and x2 < w:
-                pixel1 = frame[y1, x1]
-                pixel2 = frame[y2, x2]
-
-                # 判断每个点是否仍然符合“首领存在”的颜色
-                spawned1 = (pixel1[0] == 161 and pixel1[1] == 209 and pixel1[2] == 47)
-                spawned2 = (pixel2[0] == 237 and pixel2[1] == 166 and pixel2[2] == 62)
-
-                if not (spawned1 or spawned2):
-                    # 两个点均不匹配存在色，说明首领提示已消失
-                    self.log_info("检测到两个点均不匹配存在色，首领提示已消失")
-                    return True
-                else:
-                    self.log_debug("至少一个点仍匹配存在色，继续等待")
-            else:
-                # 坐标越界时继续循环
-                pass
+            # 判断每个点是否仍然符合“首领存在”的颜色
+            probes = self.probe_pixels()
+            if not (probes['boss_bar'] or probes['boss_marker']):
+                # 两个点均不匹配存在色，说明首领提示已消失
+                self.log_info("检测到两个点均不匹配存在色，首领提示已消失")
+                return True
+            self.log_debug("至少一个点仍匹配存在色，继续等待")
             self.sleep(2)
 
         self.log_error(f"等待首领提示消失超时（{timeout}秒）")
         return False
 
+    @task_phase('wait_chest')
     def wait_any_chest(self, time_out=30):
         self.log_debug(f"等待任意宝箱出现，超时{time_out}秒，阈值0.6")
-        start = time.time()
-        while time.time() - start < time_out:
-            frame = self.frame
-            if frame is not None:
-                h, w = frame.shape[:2]
-                full_box = Box(0, 0, w, h)
-                for name in self.CHEST_NAMES:
-                    results = self.find_feature(name, box=full_box, threshold=0.6)
-                    if results:
-                        self.log_debug(f"找到宝箱: {name}")
-                        return results[0]
-            self.sleep(0.5)
-        return None
-
-    def _reacquire_chest(self):
-        for _ in range(10):
-            frame = self.frame
-            if frame is not None:
-                h, w = frame.shape[:2]
-                full_box = Box(0, 0, w, h)
-                for name in self.CHEST_NAMES:
-                    results = self.find_feature(name, box=full_box, threshold=0.6)
-                    if results:
-                        return results[0]
-            self.sleep(0.5)
-        return None
-
-    def _cross_search(self):
-        self.log_info("启动十字搜索，宝箱阈值0.6")
-        found_event = threading.Event()
-        stop_event = threading.Event()
-        chest_box = [None]
-
-        def searcher():
-            while not stop_event.is_set() and not found_event.is_set():
-                try:
-                    frame = self.frame
-                    if frame is not None:
-                        h, w = frame.shape[:2]
-                        full_box = Box(0, 0, w, h)
-                        for name in self.CHEST_NAMES:
-                            results = self.find_feature(name, box=full_box, threshold=0.6)
-                            if results:
-                                chest_box[0] = results[0]
-                                self.log_info(f"十字搜索找到宝箱: {name}")
-                                found_event.set()
-                                break
-                    for _ in range(3):
-                        if stop_event.is_set():
-                            break
-                        self.sleep(0.033)
-                except TaskDisabledException:
-                    self.log_debug("十字搜索被用户停止")
-                    stop_event.set()
-                    break
-
-        def mover():
-            moves = [
-                ('w', 5.0, 0.5),
-                ('s', 10.0, 0.5),
-                ('w', 5.0, 0.5),
-                ('a', 5.0, 0.5),
-                ('d', 10.0, 0.5),
-            ]
-            for key, down_time, after_sleep in moves:
-                if stop_event.is_set() or found_event.is_set():
-                    break
-                self.log_debug(f"十字移动: 按{key} {down_time}秒")
-                try:
-                    self.send_key_down(key)
-                    press_start = time.time()
-                    while time.time() - press_start < down_time:
-                        if stop_event.is_set() or found_event.is_set():
-                            break
-                        self.sleep(0.05)
-                finally:
-                    self.send_key_up(key)
-                if after_sleep > 0:
-                    self._sleep_with_events(after_sleep, stop_event, found_event)
-            # 移动序列结束，主动停止搜索线程
-            stop_event.set()
-            if not found_event.is_set():
-                self.log_debug("十字移动序列执行完毕，未找到宝箱")
-
-        t1 = threading.Thread(target=searcher, daemon=True)
-        t2 = threading.Thread(target=mover, daemon=True)
-        t1.start()
-        t2.start()
-
+        chest = self.wait_until_frame(lambda: self.find_any_chest(threshold=0.6), time_out, name='wait_any_chest')
+        if chest:
+            self.log_debug(f"找到宝箱: {chest.name}")
+        return chest
+
+    def _pattern_search(self, label, moves):
+        """
+        按移动序列走位，同时由后台检测服务在每帧新画面上匹配宝箱
+        移动在任务线程执行，发现宝箱后立即松开按键并返回宝箱，序列走完仍未发现返回 None
+        """
+        self.log_info(f"启动{label}，宝箱阈值0.6")
+        self.detectors.register('search_chest', lambda frame: self.detect_chest(frame, threshold=0.6))
         try:
-            # 等待移动线程结束（它会设置 stop_event）
-            t2.join()
-            # 等待搜索线程结束
-            t1.join()
-        except TaskDisabledException:
-            self.log_info("十字搜索被用户手动停止")
-            stop_event.set()
-            t1.join(timeout=1)
-            t2.join(timeout=1)
-            raise
-
-        if found_event.is_set():
-            self.log_info("十字搜索成功找到宝箱")
-            return chest_box[0]
-        self.log_info("十字移动序列结束，未找到宝箱")
-        return None
-
-    def _mi_search(self):
-        self.log_info(f"启动米字搜索，宝箱阈值0.6，执行完整移动序列")
-        found_event = threading.Event()
-        stop_event = threading.Event()
-        chest_box = [None]
-
-        def searcher():
-            while not stop_event.is_set() and not found_event.is_set():
-                try:
-                    frame = self.frame
-                    if frame is not None:
-                        h, w = frame.shape[:2]
-                        full_box = Box(0, 0, w, h)
-                        for name in self.CHEST_NAMES:
-                            results = self.find_feature(name, box=full_box, threshold=0.6)
-                            if results:
-                                chest_box[0] = results[0]
-                                self.log_info(f"米字搜索找到宝箱: {name}")
-                                found_event.set()
-                                break
-                    for _ in range(3):
-                        if stop_event.is_set():
-                            break
-                        self.sleep(0.033)
-                except TaskDisabledException:
-                    self.log_debug("米字搜索被用户停止")
-                    stop_event.set()
-                    break
-
-        def mover():
-            moves = [
-                ('w', 5.0, 0.5),
-                ('s', 10.0, 0.5),
-                ('w', 5.0, 0.5),
-                ('a', 5.0, 0.5),
-                ('d', 10.0, 0.5),
-                ('a', 5.0, 0.5),
-                ('a', 'w', 5.0, 0.5),
-                ('s', 'd', 10.0, 0.5),
-                ('a', 'w', 5.0, 0.5),
-                ('w', 'd', 5.0, 0.5),
-                ('a', 's', 10.0, 0.5),
-            ]
-            for move in moves:
-                if stop_event.is_set() or found_event.is_set():
-                    break
-                if len(move) == 3:
-                    key, down_time, after_sleep = move
-                    self.log_debug(f"米字移动: 按{key} {down_time}秒")
+            with self.detectors:
+                for move in moves:
+                    if self.detectors.latest('search_chest'):
+                        break
+                    keys, down_time, after_sleep = move[:-2], move[-2], move[-1]
+                    self.log_debug(f"{label}移动: 按{'+'.join(keys)} {down_time}秒")
                     try:
-                        self.send_key_down(key)
-                        press_start = time.time()
-                        while time.time() - press_start < down_time:
-                            if stop_event.is_set() or found_event.is_set():
-                                break
-                            self.sleep(0.05)
+                        for key in keys:
+                            self.send_key_down(key)
+                        self._sleep_until_found(down_time, 0.05)
                     finally:
-                        self.send_key_up(key)
+                        for key in keys:
+                            self.send_key_up(key)
                     if after_sleep > 0:
-                        self._sleep_with_events(after_sleep, stop_event, found_event)
-                elif len(move) == 4:
-                    key1, key2, down_time, after_sleep = move
-                    self.log_debug(f"米字移动: 同时按{key1}+{key2} {down_time}秒")
-                    try:
-                        self.send_key_down(key1)
-                        self.send_key_down(key2)
-                        press_start = time.time()
-                        while time.time() - press_start < down_time:
-                            if stop_event.is_set() or found_event.is_set():
-                                break
-                            self.sleep(0.05)
-                    finally:
-                        self.send_key_up(key1)
-                        self.send_key_up(key2)
-                    if after_sleep > 0:
-                        self._sleep_with_events(after_sleep, stop_event, found_event)
-            # 移动序列执行完毕，无论是否找到宝箱都停止搜索线程
-            stop_event.set()
-            if not found_event.is_set():
-                self.log_debug("米字移动序列执行完毕，未找到宝箱")
-
-        t1 = threading.Thread(target=searcher, daemon=True)
-        t2 = threading.Thread(target=mover, daemon=True)
-        t1.start()
-        t2.start()
-        try:
-            # 等待移动线程结束（它会自动设置 stop_event）
-            t2.join()
-            # 等待搜索线程结束
-            t1.join()
+                        self._sleep_until_found(after_sleep, 0.2)
+            detection = self.detectors.latest('search_chest')
         except TaskDisabledException:
-            self.log_info("米字搜索被用户手动停止")
-            stop_event.set()
-            t1.join(timeout=1)
-            t2.join(timeout=1)
+            self.log_info(f"{label}被用户手动停止")
             raise
-        if found_event.is_set():
-            self.log_info("米字搜索成功找到宝箱")
-            return chest_box[0]
-        self.log_info("米字移动序列结束，未找到宝箱")
+        finally:
+            self.detectors.unregister('search_chest')
+        if detection:
+            self.log_info(f"{label}找到宝箱: {detection.result.name}")
+            return detection.result
+        self.log_info(f"{label}移动序列结束，未找到宝箱")
         return None
 
+    def _sleep_until_found(self, seconds, interval):
+        end_time = time.time() + seconds
+        while time.time() < end_time:
+            if self.detectors.latest('search_chest'):
+                return
+            self.sleep(min(interval, max(0.0, end_time - time.time())))
+
+    def _cross_search(self):
+        return self._pattern_search('十字搜索', self.CROSS_SEARCH_MOVES)
+
+    def _mi_search(self):
+        return self._pattern_search('米字搜索', self.MI_SEARCH_MOVES)
+
+    @task_phase('search_chest')
     def cross_search(self):
         mode = self.config.get('搜索模式', '十字搜索')
         if mode == '十字搜索':
             return self._cross_search()
         return self._mi_search()
 
-    def _sleep_with_events(self, seconds, stop_event, found_event):
-        interval = 0.2
-        elapsed = 0
-        while elapsed < seconds:
-            if stop_event.is_set() or found_event.is_set():
-                break
-            self.sleep(min(interval, seconds - elapsed))
-            elapsed += interval
-
     def _recover_character_state(self):
         self.log_info("角色状态异常，尝试按S键恢复，超时150秒")
         start_time = time.time()
@@ -435,125 +286,35 @@ class MoKuaiJinBiTask(BaseQRSLTask):
         return False
 
     def _is_character_state_normal(self):
-        frame = self.frame
-        if frame is None:
-            return False
-        x, y = self._get_scaled_coordinates(1805, 698)
-        h, w = frame.shape[:2]
-        if y >= h or x >= w:
-            return False
-        pixel = frame[y, x]
-        target_bgr = (254, 195, 57)
-        diff_sum = abs(int(pixel[0]) - target_bgr[0]) + \
-                   abs(int(pixel[1]) - target_bgr[1]) + \
-                   abs(int(pixel[2]) - target_bgr[2])
-        return diff_sum <= 50
+        return self.probe_pixels().get('character_normal', False)
 
+    @task_phase('approach_chest')
     def approach_bosschest(self, max_walk_time=60, target_chest=None):
-        locked_chest_type = None
-        if target_chest is not None:
-            self.log_debug(f"approach_bosschest: 使用已有宝箱 {target_chest.name}")
-            locked_chest_type = target_chest.name
-        else:
-            target_chest = self.wait_any_chest(time_out=30)
-            if target_chest is None:
-                self.log_error("approach_bosschest: 30秒内未发现任何宝箱")
-                return False
-
-        start_time = time.time()
-        chest_disappear_count = 0
-        last_key_press_time = 0
-        key_press_interval = 0.15
-
-        x1, y1 = self._get_scaled_coordinates(1110, 520)
-        x2, y2 = self._get_scaled_coordinates(1280, 575)
-        ocr_box = Box(x1, y1, width=x2 - x1, height=y2 - y1)
-
-        ocr_confirm_start = None
-        STABLE_TIME = 0.3
-
+        """
+        走向宝箱，直到交互提示文字按帧时间连续出现 PROMPT_STABLE_TIME 秒
+        OCR 确认和宝箱定位由两个后台检测服务分别在各自的线程中处理最新画面，见 ChestApproach.approach_bosschest
+        """
         try:
-            while time.time() - start_time < max_walk_time:
-                current_time = time.time()
-
-                target_detected = False
-                try:
-                    ocr_results = self.ocr(box=ocr_box, target_height=540)
-                    if ocr_results:
-                        texts = [box.name for box in ocr_results]
-                        self.log_debug(f"OCR识别到: {texts}")
-                        for box in ocr_results:
-                            text = box.name.strip()
-                            if ('太极匣' in text) or ('高级密码箱' in text):
-                                target_detected = True
-                                break
-                except Exception as e:
-                    self.log_debug(f"OCR检测异常: {e}")
-
-                if target_detected:
-                    if ocr_confirm_start is None:
-                        ocr_confirm_start = current_time
-                        self.log_debug("首次检测到目标文字，开始计时")
-                    elif current_time - ocr_confirm_start >= STABLE_TIME:
-                        self.log_info(f"目标文字稳定出现{STABLE_TIME}秒，接近成功")
-                        return True
-                else:
-                    if ocr_confirm_start is not None:
-                        self.log_debug("目标文字消失，重置计时")
-                        ocr_confirm_start = None
-
-                if current_time - last_key_press_time < key_press_interval:
-                    self.sleep(0.05)
-                    continue
-
-                frame = self.frame
-                if frame is None:
-                    continue
-                height, width = frame.shape[:2]
-                full_box = Box(0, 0, width, height)
-                screen_center_x = width // 2
-
-                current_chest = None
-                if locked_chest_type:
-                    results = self.find_feature(locked_chest_type, box=full_box, threshold=0.6)
-                    if results:
-                        current_chest = results[0] if len(results) == 1 else self._get_closest_box(results,
-                                                                                                   target_chest)
-
-                if current_chest is None:
-                    for name in self.CHEST_NAMES:
-                        results = self.find_feature(name, box=full_box, threshold=0.6)
-                        if results:
-                            locked_chest_type = name
-                            current_chest = results[0] if len(results) == 1 else self._get_closest_box(results,
-                                                                                                       target_chest)
-                            break
-
-                if current_chest is None:
-                    chest_disappear_count += 1
-                    if chest_disappear_count >= 5:
-                        current_chest = self._reacquire_chest()
-                        if current_chest is None:
-                            self.log_error("approach_bosschest: 无法重新获取宝箱")
-                            return False
-                else:
-                    chest_disappear_count = 0
-
-                if current_chest is not None:
-                    target_chest = current_chest
-                    chest_x, chest_y = target_chest.center()
-                    if not self._adjust_position(chest_x, chest_y, screen_center_x, width, height):
-                        last_key_press_time = current_time
-                else:
-                    self.sleep(0.1)
-
-            self.log_error(f"approach_bosschest: 超时{max_walk_time}秒未检测到目标文字")
-            return False
-
+            return ChestApproach.approach_bosschest(self, max_walk_time, target_chest, self.PROMPT_STABLE_TIME,
+                                                    self.CHEST_LOST_TIME)
         except TaskDisabledException:
             self.log_info("approach_bosschest 被用户手动停止")
             raise
 
+    def detect_chest_prompt(self, frame, box):
+        """在给定帧上识别交互提示，返回触发的文本框，没有时返回 None，供后台检测服务使用"""
+        try:
+            ocr_results = self.ocr(box=box, target_height=540, frame=frame)
+        except TaskDisabledException:
+            raise
+        except Exception as e:
+            self.log_debug(f"OCR检测异常: {e}")
+            return None
+        if ocr_results:
+            self.log_debug(f"OCR识别到: {[result.name for result in ocr_results]}")
+        return self.CHEST_PROMPT_TRIGGER.match_boxes(ocr_results)[0]
+
+    @task_phase('chest_pickup')
     def _phase_chest_pickup(self, chest_box=None):
         self.log_info("进入宝箱拾取阶段")
 
@@ -571,20 +332,11 @@ class MoKuaiJinBiTask(BaseQRSLTask):
                 self.log_debug("无法获取画面，继续重试")
                 continue
 
-            x1, y1 = self._get_scaled_coordinates(1110, 520)
-            x2, y2 = self._get_scaled_coordinates(1280, 575)
-            ocr_box = Box(x1, y1, width=x2 - x1, height=y2 - y1)
+            ocr_box = self.layout_box('chest_prompt')
 
             try:
                 ocr_results = self.ocr(box=ocr_box, target_height=540)
-                text_found = False
-                if ocr_results:
-                    for box in ocr_results:
-                        text = box.name.strip()
-                        if ('太极匣' in text) or ('高级密码箱' in text):
-                            text_found = True
-                            break
-                if text_found:
+                if self.CHEST_PROMPT_TRIGGER.match_boxes(ocr_results)[0] is not None:
                     self.log_info("目标文字仍存在，继续拾取流程")
                     break  # 文字存在，跳出重试循环
                 else:
@@ -618,8 +370,8 @@ class MoKuaiJinBiTask(BaseQRSLTask):
             self.send_key_safe('f', down_time=0.05)
             frame = self.frame
             if frame is not None:
-                for name in ['openchest1', 'openchest2']:
-                    boxes = self.find_feature(name, threshold=0.6)
+                found = self.find_parallel(['openchest1', 'openchest2'], threshold=0.6, find_all=True)
+                for name, boxes in found.items():
                     if boxes:
                         box = boxes[0]
                         self.log_info(f"检测到 {name} 图片，立即点击")
@@ -632,8 +384,9 @@ class MoKuaiJinBiTask(BaseQRSLTask):
         self.log_error("拾取超时：10秒内未出现openchest图片")
         return False
 
+    @task_phase('claim_reward')
     def _claim_reward(self):
-        x, y = self._get_scaled_coordinates(1255, 575)
+        x, y = self.layout_point('claim_reward')
         self.log_info(f"点击奖励坐标 ({x}, {y})")
         self._click_safe(x, y, after_sleep=7)  # 替换
         return True
@@ -641,6 +394,7 @@ class MoKuaiJinBiTask(BaseQRSLTask):
     def run(self):
         try:
             self.log_info("===== 模块金币任务启动 =====", notify=True)
+            self.prepare_ocr()
             wait_timeout = self.config.get('等待超时', 900)
             max_loops = self.config.get('循环次数', 10000)
             loop_count = 0
@@ -648,6 +402,7 @@ class MoKuaiJinBiTask(BaseQRSLTask):
             while loop_count < max_loops:
                 loop_count += 1
                 self.log_info(f"--- 第 {loop_count}/{max_loops} 次循环开始 ---")
+                self.begin_cycle()
                 loop_start_time = time.time()
 
                 if loop_count > 1 and self.last_shenlin_time != 0:
@@ -659,30 +414,36 @@ class MoKuaiJinBiTask(BaseQRSLTask):
 
                 if not self.is_main_page():
                     self.log_error("无法进入游戏主页面，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('main_page')
+                    self.retry_backoff(5)
                     continue
 
                 if not self._open_map_and_enter_boss():
                     self.log_error("进入世界BOSS界面失败")
-                    self.sleep(5)
+                    self.cycle_failed('enter_boss')
+                    self.retry_backoff(5)
                     continue
 
                 if not self._select_boss_by_config():
                     self.log_error("BOSS选择图片等待超时，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('select_boss')
+                    self.retry_backoff(5)
                     continue
 
                 if not self._wait_and_click_feature('gotoboss', timeout=30, after_sleep=0):
-                    self.sleep(5)
+                    self.cycle_failed('gotoboss')
+                    self.retry_backoff(5)
                     continue
 
                 if not self._wait_and_click_feature('shenlin', timeout=30, after_sleep=8):
-                    self.sleep(5)
+                    self.cycle_failed('shenlin')
+                    self.retry_backoff(5)
                     continue
 
                 if not self._wait_main_page_and_activate():
                     self.log_error("启动战斗流程失败")
-                    self.sleep(5)
+                    self.cycle_failed('activate')
+                    self.retry_backoff(5)
                     continue
 
                 self.last_shenlin_time = time.time()
@@ -692,13 +453,15 @@ class MoKuaiJinBiTask(BaseQRSLTask):
                     self.log_info("首领已刷新，进入阶段B")
                     if not self._phase_b_wait_boss_ui_disappear():
                         self.log_error("首领提示未消失，跳过本次循环")
-                        self.sleep(5)
+                        self.cycle_failed('boss_ui')
+                        self.retry_backoff(5)
                         continue
                 elif phase_a_result == 'chest_found' and chest_found:
                     self.log_info("战斗阶段已找到宝箱，直接进入宝箱拾取")
                 elif phase_a_result == 'timeout':
                     self.log_error("战斗阶段超时，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('combat')
+                    self.retry_backoff(5)
                     continue
                 else:
                     break
@@ -710,17 +473,22 @@ class MoKuaiJinBiTask(BaseQRSLTask):
                     chest = self.cross_search()
                 if not chest:
                     self.log_error("无法找到宝箱，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('no_chest')
+                    self.retry_backoff(5)
                     continue
 
                 if not self._phase_chest_pickup(chest):
                     self.log_error("宝箱拾取失败，跳过奖励领取")
-                    self.sleep(5)
+                    self.cycle_failed('chest_pickup')
+                    self.retry_backoff(5)
                     continue
 
-                if not self._claim_reward():
+                if self._claim_reward():
+                    self.cycle_succeeded()
+                else:
                     self.log_error("奖励领取失败")
-                    self.sleep(5)
+                    self.cycle_failed('claim_reward')
+                    self.retry_backoff(5)
 
                 elapsed = time.time() - loop_start_time
                 self.log_info(f"本次循环总耗时 {elapsed:.1f}秒")
@@ -729,6 +497,7 @@ class MoKuaiJinBiTask(BaseQRSLTask):
 
         except TaskDisabledException:
             self.log_info("模块金币任务被用户手动停止")
+            raise
         except Exception as e:
             self.log_error(f"模块金币任务异常: {e}", notify=True)
             self.screenshot("mokuai_jinbi_error")
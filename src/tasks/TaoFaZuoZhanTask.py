@@ -2,6 +2,7 @@ import time
 from qfluentwidgets import FluentIcon
 from ok import TaskDisabledException
 from src.tasks.BaseQRSLTask import BaseQRSLTask
+from src.utils.LatencyHistogram import task_phase
 
 
 class TaoFaZuoZhanTask(BaseQRSLTask):
@@ -22,6 +23,7 @@ class TaoFaZuoZhanTask(BaseQRSLTask):
         })
         self.config_type["选择副本"] = {'type': "drop_down", 'options': ['中层控制室']}
 
+    @task_phase('enter_dungeon')
     def enter_taofa_dungeon(self):
         self.log_info("开始进入讨伐作战副本...")
         if not self.is_main_page():
@@ -33,10 +35,11 @@ class TaoFaZuoZhanTask(BaseQRSLTask):
             return False
         self.log_info("点击'参加'按钮...")
         self._click_box_safe(attend_box, after_sleep=1.5)          # 替换
-        self.log_info("等待5秒...")
-        self.sleep(5)
+        self.log_info("等待场景加载（最多5秒）...")
+        self.wait_scene_settle(5, expect_change=True)
         return self.wait_for_exit_button_white(timeout=30)
 
+    @task_phase('combat')
     def execute_combat_sequence(self):
         self.log_info("开始执行战斗序列...")
         self.start_auto_combat()
@@ -57,15 +60,16 @@ class TaoFaZuoZhanTask(BaseQRSLTask):
         self.sleep(0.5)
         self.log_info("战斗序列执行完成")
 
+    @task_phase('exit_dungeon')
     def exit_taofa_dungeon(self):
         self.log_info("开始退出副本...")
         self.sleep(4)
-        check_x, check_y = self._get_scaled_coordinates(267, 65)
+        check_x, check_y = self.layout_point('exit_button')
         self._click_safe(check_x, check_y, after_sleep=1)           # 替换
         self._click_safe(check_x, check_y, after_sleep=1)           # 替换
         success = self._click_with_alt(check_x, check_y, alt_down_delay=0.8, click_delay=1.5)
         if success:
-            self.sleep(10)
+            self.wait_scene_settle(10, expect_change=True)
             return True
         return False
 
@@ -79,13 +83,16 @@ class TaoFaZuoZhanTask(BaseQRSLTask):
             while loop_count < max_loops:
                 loop_count += 1
                 self.log_info(f"--- 第 {loop_count}/{max_loops} 次循环开始 ---")
+                self.begin_cycle()
                 if not self.enter_taofa_dungeon():
                     self.log_error("进入副本失败，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('enter_dungeon')
+                    self.retry_backoff(5)
                     continue
                 self.execute_combat_sequence()
                 if not self.wait_for_target_color(combat_timeout):
                     self.log_error(f"{combat_timeout}秒内未检测到目标颜色，退出副本")
+                    self.cycle_failed('combat')
                     if not self.exit_taofa_dungeon():
                         self.log_error("退出副本失败")
                     continue
@@ -93,12 +100,15 @@ class TaoFaZuoZhanTask(BaseQRSLTask):
                     self.log_error("退出副本失败")
                 if not self.wait_for_main_page_color(timeout=60):
                     self.log_error("等待主页颜色超时，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('main_page')
+                    self.retry_backoff(5)
                     continue
+                self.cycle_succeeded()
                 self.log_info(f"第 {loop_count} 次循环完成")
             self.log_info(f"===== 讨伐作战任务结束，共完成 {loop_count} 次循环 =====", notify=True)
         except TaskDisabledException:
             self.log_info("讨伐作战任务被用户手动停止")
+            raise
         except Exception as e:
             self.log_error(f"任务执行过程中出现异常: {e}", exception=e, notify=True)
             self.screenshot("taofazuozhan_error")
@@ -42,8 +42,9 @@ class ZhongFengTuPoTask(BaseQRSLTask):
     def _wait_for_any_feature(self, feature_names, timeout, after_sleep=0):
         start = time.time()
         while time.time() - start < timeout:
+            found = self.find_parallel(feature_names, threshold=0.7)
             for name in feature_names:
-                box = self.find_one(name, threshold=0.7)
+                box = found[name]
                 if box:
                     self.log_info(f"检测到特征 [{name}]")
                     if after_sleep > 0:
@@ -62,10 +63,12 @@ class ZhongFengTuPoTask(BaseQRSLTask):
             while loop_count < max_loops:
                 loop_count += 1
                 self.log_info(f"--- 第 {loop_count}/{max_loops} 次循环开始 ---")
+                self.begin_cycle()
 
                 if not self.is_main_page():
                     self.log_error("无法进入游戏主页面，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('main_page')
+                    self.retry_backoff(5)
                     continue
 
                 self.log_info("按ESC键打开菜单")
@@ -74,23 +77,27 @@ class ZhongFengTuPoTask(BaseQRSLTask):
 
                 if not self._wait_and_click_feature('gonghui', timeout=5, after_sleep=0):
                     self.log_error("未找到工会图标，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('gonghui')
+                    self.retry_backoff(5)
                     continue
 
                 if not self._wait_and_click_feature('huodong', timeout=10, after_sleep=0):
                     self.log_error("未找到活动图标，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('huodong')
+                    self.retry_backoff(5)
                     continue
 
                 if not self._wait_and_click_feature('zhongfengtupo', timeout=10, after_sleep=0):
                     self.log_error("未找到众峰突破图标，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('zhongfengtupo')
+                    self.retry_backoff(5)
                     continue
 
                 box, name = self._wait_for_any_feature(['back', 'jinruzhandou'], timeout=10)
                 if name is None:
                     self.log_error("既未出现返回按钮也未出现进入战斗按钮，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('jinruzhandou')
+                    self.retry_backoff(5)
                     continue
 
                 if name == 'jinruzhandou':
@@ -104,22 +111,26 @@ class ZhongFengTuPoTask(BaseQRSLTask):
                 if level == '当前关卡':
                     if not self._wait_and_click_feature('enterchallenge', timeout=10, after_sleep=0):
                         self.log_error("未找到进入挑战按钮，跳过本次循环")
-                        self.sleep(5)
+                        self.cycle_failed('enterchallenge')
+                        self.retry_backoff(5)
                         continue
                 else:
                     self.log_info(f"关卡 [{level}] 尚未实现，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('level')
+                    self.retry_backoff(5)
                     continue
 
                 if not self._wait_and_click_feature('sure', timeout=5, after_sleep=10):
                     self.log_error("未找到确认按钮，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('sure')
+                    self.retry_backoff(5)
                     continue
 
                 self.log_info("等待退出按钮变白...")
                 if not self.wait_for_exit_button_white(timeout=60):
                     self.log_error("等待退出按钮变白超时，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('combat')
+                    self.retry_backoff(5)
                     continue
 
                 self.log_info("退出副本")
@@ -127,15 +138,18 @@ class ZhongFengTuPoTask(BaseQRSLTask):
 
                 if not self.wait_for_main_page_color(timeout=60):
                     self.log_error("等待主页颜色超时，跳过本次循环")
-                    self.sleep(5)
+                    self.cycle_failed('exit_main_page')
+                    self.retry_backoff(5)
                     continue
 
+                self.cycle_succeeded()
                 self.log_info(f"第 {loop_count} 次循环完成")
 
             self.log_info(f"===== 众峰突破任务结束，共完成 {loop_count} 次循环 =====", notify=True)
 
         except TaskDisabledException:
             self.log_info("众峰突破任务被用户手动停止")
+            raise
         except Exception as e:
             self.log_error(f"众峰突破任务异常: {e}", notify=True)
             self.screenshot("zhongfengtupo_error")
@@ -0,0 +1,280 @@
+import time
+
+from src.utils.ChestSteering import ChestSteering
+from src.utils.ChestTracker import ChestTracker
+
+CHEST_NAMES = ['chest1', 'chest2', 'chest3', 'chest4', 'chest5']
+# 走向宝箱的方式（任务配置「走位模式」）：默认固定步长，即 adjust_position；比例控制见 ChestSteering，需手动选择
+STEERING_PROPORTIONAL = '比例控制'
+STEERING_FIXED = '固定步长'
+STEERING_MODES = [STEERING_FIXED, STEERING_PROPORTIONAL]
+DEFAULT_STEERING = STEERING_FIXED
+# 走到宝箱旁时出现的交互提示文字，及其所在区域（1920x1080 参考分辨率下的 x1, y1, x2, y2）
+CHEST_PROMPT_KEYWORDS = ['太极匣', '高级密码箱']
+LAYOUT_BOXES = {
+    'chest_prompt': (1110, 520, 1280, 575),
+}
+# 交互提示需按帧时间连续出现的时长（秒）
+PROMPT_STABLE_TIME = 0.3
+# 走向宝箱时宝箱按帧时间连续多久未被找到视为丢失（秒）
+CHEST_LOST_TIME = 5.0
+
+
+def make_steering(mode):
+    """按走位模式为一次走向宝箱创建比例控制器，固定步长模式返回 None"""
+    if mode == STEERING_PROPORTIONAL:
+        return ChestSteering()
+    return None
+
+
+def approach_chest(task, max_walk_time=60, box_cls=None):
+    """
+    逐步走向宝箱，直到出现 opened chest 图标
+    task 需提供 frame、sleep、send_key_down、send_key_up、send_key_safe、find_one、find_chests、
+    find_any_chest、wait_any_chest、chest_steering、info_set 和 log_error，走向宝箱模拟器用纯 Python 的替身驱动。
+    :param box_cls: 搜索窗口的 Box 类，默认为 ok 的 Box
+    """
+    target_chest = task.wait_any_chest(time_out=30)
+    if target_chest is None:
+        return False
+    start_time = time.time()
+    chest_disappear_count = 0
+    last_key_press_time = 0
+    key_press_interval = 0.15
+    locked_chest_type = None
+    tracker = ChestTracker(box_cls=box_cls)
+    tracker.reset(target_chest, start_time)
+    steering = task.chest_steering()
+    try:
+        while time.time() - start_time < max_walk_time:
+            current_time = time.time()
+            if task.find_one('opened chest', threshold=0.7):
+                task.sleep(0.5)
+                return True
+            if current_time - last_key_press_time < key_press_interval:
+                task.sleep(0.05)
+                continue
+            frame = task.frame
+            if frame is None:
+                continue
+            height, width = frame.shape[:2]
+            screen_center_x = width // 2
+            current_chest, locked_chest_type = track_chest(task, tracker, locked_chest_type, 0.8, target_chest)
+            if current_chest is None:
+                chest_disappear_count += 1
+                if steering is not None:
+                    steering.lost()
+                if chest_disappear_count >= 5:
+                    current_chest = reacquire_chest(task)
+                    if current_chest is None:
+                        return False
+                    tracker.reset(current_chest, time.time())
+            else:
+                chest_disappear_count = 0
+            if current_chest is None:
+                # 偶尔丢失一帧时沿用上一次的位置会走错方向，等下一帧重新匹配
+                task.sleep(0.1)
+                continue
+            target_chest = current_chest
+            if not move_toward_chest(task, steering, target_chest, screen_center_x, width, height):
+                last_key_press_time = current_time
+    except Exception as e:
+        task.log_error(f"接近宝箱异常: {e}")
+        return False
+    return bool(task.find_one('opened chest', threshold=0.7))
+
+
+def approach_bosschest(task, max_walk_time=60, target_chest=None, prompt_stable_time=PROMPT_STABLE_TIME,
+                       chest_lost_time=CHEST_LOST_TIME, box_cls=None):
+    """
+    走向宝箱，直到交互提示文字按帧时间连续出现 prompt_stable_time 秒
+    OCR 确认和宝箱定位由两个后台检测服务（task.ocr_detectors / task.detectors）分别在各自的线程中处理最新画面，
+    走位循环不等待 OCR，循环频率只受模板匹配限制；每一步走位只使用上一次按键松开之后截取的画面上的定位结果。
+    task 除 approach_chest 所需的接口外，还需提供 layout_box、log_info、log_debug 和 detect_chest_prompt。
+    """
+    locked_chest_type = None
+    if target_chest is not None:
+        task.log_debug(f"approach_bosschest: 使用已有宝箱 {target_chest.name}")
+        locked_chest_type = target_chest.name
+    else:
+        target_chest = task.wait_any_chest(time_out=30)
+        if target_chest is None:
+            task.log_error("approach_bosschest: 30秒内未发现任何宝箱")
+            return False
+
+    start_time = time.time()
+    tracker = ChestTracker(box_cls=box_cls)
+    tracker.reset(target_chest, start_time)
+    steering = task.chest_steering()
+    ocr_box = task.layout_box('chest_prompt')
+
+    def locate(frame):
+        # 只在检测线程中调用，跟踪状态不与走位循环共享
+        nonlocal locked_chest_type, target_chest
+        chest, locked_chest_type = track_chest(task, tracker, locked_chest_type, 0.6, target_chest, frame=frame)
+        if chest is not None:
+            target_chest = chest
+        return chest
+
+    task.detectors.register('approach_chest', locate, publish_empty=True)
+    task.ocr_detectors.register('chest_prompt', lambda frame: task.detect_chest_prompt(frame, ocr_box),
+                                publish_empty=True)
+    task.ocr_detectors.drain()
+    # 提示连续出现的起始帧时间、最近一次定位的帧时间、最近一次找到宝箱的帧时间、最近一次按键松开的时间
+    prompt_since = None
+    chest_time = 0
+    last_seen = start_time
+    moved_at = 0
+
+    try:
+        with task.detectors, task.ocr_detectors:
+            while time.time() - start_time < max_walk_time:
+                # 按顺序处理每一帧的 OCR 结果，中间任意一帧没有提示都重新计时
+                for prompt in task.ocr_detectors.drain():
+                    if prompt.name != 'chest_prompt':
+                        continue
+                    if prompt.result is not None:
+                        if prompt_since is None:
+                            prompt_since = prompt.frame_time
+                            task.log_debug("首次检测到目标文字，开始计时")
+                        elif prompt.frame_time - prompt_since >= prompt_stable_time:
+                            task.log_info(f"目标文字稳定出现{prompt_stable_time}秒，接近成功")
+                            return True
+                    elif prompt_since is not None:
+                        task.log_debug("目标文字消失，重置计时")
+                        prompt_since = None
+
+                chest = task.detectors.wait('approach_chest', timeout=0.1, since=max(chest_time, moved_at))
+                if chest is None:
+                    continue
+                chest_time = chest.frame_time
+                if chest.result is None:
+                    if steering is not None:
+                        steering.lost()
+                    if chest_time - last_seen >= chest_lost_time:
+                        task.log_error("approach_bosschest: 无法重新获取宝箱")
+                        return False
+                    continue
+                last_seen = chest_time
+                if prompt_since is not None:
+                    # 已出现提示，停下等待确认，避免走出拾取范围
+                    continue
+
+                frame = task.frame
+                if frame is None:
+                    continue
+                height, width = frame.shape[:2]
+                move_toward_chest(task, steering, chest.result, width // 2, width, height)
+                moved_at = time.time()
+
+        task.log_error(f"approach_bosschest: 超时{max_walk_time}秒未检测到目标文字")
+        return False
+    finally:
+        task.detectors.unregister('approach_chest')
+        task.ocr_detectors.unregister('chest_prompt')
+
+
+def closest_box(boxes, target_box):
+    last_center = target_box.center()
+    distances = [abs(r.center()[0] - last_center[0]) + abs(r.center()[1] - last_center[1]) for r in boxes]
+    closest_idx = distances.index(min(distances))
+    return boxes[closest_idx]
+
+
+def track_chest(task, tracker, locked_chest_type, locked_threshold, target_chest, frame=None):
+    """
+    在跟踪器给出的窗口内查找宝箱，返回 (宝箱, 锁定类型)
+    先匹配已锁定的类型，找不到再在同一窗口内重新锁定；跟踪器连续丢失后窗口为 None，即整帧搜索。
+    frame 为空时使用当前帧。
+    """
+    if frame is None:
+        frame = task.frame
+    height, width = frame.shape[:2]
+    now = time.time()
+    window = tracker.search_window(width, height, now)
+    task.info_set('宝箱搜索区域', tracker.describe(width, height))
+    current_chest = None
+    if locked_chest_type:
+        results = task.find_chests(threshold=locked_threshold, names=[locked_chest_type], box=window, frame=frame)
+        current_chest = tracker.closest(results, now)
+    if current_chest is None:
+        current_chest, chest_type = lock_chest(task, threshold=0.6, target_chest=target_chest, box=window,
+                                               frame=frame)
+        if chest_type:
+            locked_chest_type = chest_type
+    if current_chest is None:
+        tracker.miss()
+    else:
+        tracker.update(current_chest, now)
+    return current_chest, locked_chest_type
+
+
+def lock_chest(task, threshold, target_chest, box=None, frame=None):
+    """匹配全部宝箱模板，锁定得分最高的类型，并在该类型的多个结果中取离上次位置最近的"""
+    results = task.find_chests(threshold=threshold, box=box, frame=frame)
+    if not results:
+        return None, None
+    chest_type = results[0].name
+    same_type = [r for r in results if r.name == chest_type]
+    chest = same_type[0] if len(same_type) == 1 else closest_box(same_type, target_chest)
+    return chest, chest_type
+
+
+def reacquire_chest(task):
+    for _ in range(10):
+        chest = task.find_any_chest(threshold=0.6)
+        if chest:
+            return chest
+        task.sleep(0.5)
+    return None
+
+
+def move_toward_chest(task, steering, chest, screen_center_x, width, height):
+    """向宝箱移动一步，返回值与 adjust_position 相同"""
+    if steering is None:
+        chest_x, chest_y = chest.center()
+        return adjust_position(task, chest_x, chest_y, screen_center_x, width, height)
+    hold_keys(task, steering.steer(chest, width, height))
+    return False
+
+
+def adjust_position(task, chest_x, chest_y, screen_center_x, width, height):
+    center_tolerance = int(width * 0.05)
+    center_min = screen_center_x - center_tolerance
+    center_max = screen_center_x + center_tolerance
+    vertical_threshold = int(height * (800 / 1080))
+    left_boundary = int(width * (450 / 1920))
+    right_boundary = int(width * (1470 / 1920))
+    if chest_x < center_min or chest_x > center_max:
+        horizontal_error = chest_x - screen_center_x
+        if chest_x < left_boundary or chest_x > right_boundary:
+            key = 'a' if horizontal_error < 0 else 'd'
+            down_time = 1.0
+        else:
+            key = 'a' if horizontal_error < 0 else 'd'
+            down_time = 0.1
+        task.send_key_safe(key, down_time)
+        return False
+    if chest_y < vertical_threshold:
+        task.send_key_safe('w', 1.0)
+    else:
+        task.send_key_safe('s', 1.0)
+    return True
+
+
+def hold_keys(task, holds):
+    """同时按下多个键，按 holds 中各自的时长（秒）先后松开；中途停止任务时也会松开全部按键"""
+    pressed = []
+    try:
+        for key in holds:
+            task.send_key_down(key)
+            pressed.append(key)
+        elapsed = 0
+        for key, duration in sorted(holds.items(), key=lambda item: item[1]):
+            task.sleep(duration - elapsed)
+            elapsed = duration
+            task.send_key_up(key)
+            pressed.remove(key)
+    finally:
+        for key in pressed:
+            task.send_key_up(key)
@@ -0,0 +1,105 @@
+class ChestSteering:
+    """
+    比例控制的宝箱走位
+    按宝箱在画面上相对目标点（水平居中、纵向 target_y）的偏差计算横移（a/d）和前后（w/s）的按住时长，两个方向同时按下。
+    游戏中的宝箱标记大小固定，距离由标记在地平线（horizon）以下的高度估计：距离与 1 / (y - horizon) 成正比，
+    横向距离与水平偏差乘以距离成正比。两者都随按住时长线性变化，增益为按住一秒它们的变化量，
+    初始为 gain_x / gain_y，每一步之后按宝箱实际移动的距离重新估计。
+    位置均以画面宽高的比例计，时长以秒计。
+    """
+
+    def __init__(self, target_y=800 / 1080, horizon=0.4, tolerance_x=0.03, tolerance_y=0.02, gain_x=1.2,
+                 gain_y=2.5, response=0.8, min_hold=0.05, max_hold=0.6, probe_hold=0.3, adapt=0.5,
+                 gain_range=(0.25, 4.0)):
+        """
+        :param horizon: 画面中地平线的大致纵向位置，只影响距离估计的形状，比例由增益估计修正
+        :param tolerance_x: 水平偏差容差，画面宽度的比例
+        :param tolerance_y: 纵向偏差容差，画面高度的比例
+        :param response: 每一步消除偏差的比例，小于 1 以抵消松键后的惯性
+        :param min_hold: 最短按住时长，更短的按键角色来不及起步
+        :param max_hold: 单步最长按住时长，保证及时根据新画面修正
+        :param probe_hold: 该方向的增益还未观测到时的最长按住时长
+        :param adapt: 增益估计的指数平滑系数
+        :param gain_range: 增益估计相对初始值的上下限倍数
+        """
+        self.target_y = target_y
+        self.horizon = horizon
+        self.tolerance_x = tolerance_x
+        self.tolerance_y = tolerance_y
+        self.initial_gain = (gain_x, gain_y)
+        self.response = response
+        self.min_hold = min_hold
+        self.max_hold = max_hold
+        self.probe_hold = probe_hold
+        self.adapt = adapt
+        self.gain_range = gain_range
+        self.gain_x = gain_x
+        self.gain_y = gain_y
+        self.observed = [False, False]
+        self._last = None
+
+    def depth(self, y):
+        """由纵向位置估计的距离（任意单位）"""
+        return 1 / max(0.03, y - self.horizon)
+
+    def state(self, chest, width, height):
+        """
+        宝箱相对目标点的 (横向距离, 纵向距离, 是否水平居中, 是否纵向到位)
+        距离为正表示需要向右 / 向前，单位与增益一致
+        """
+        chest_x, chest_y = chest.center()
+        error_x = (chest_x - width / 2) / width
+        y = chest_y / height
+        depth = self.depth(y)
+        return (error_x * depth, depth - self.depth(self.target_y),
+                abs(error_x) <= self.tolerance_x, abs(y - self.target_y) <= self.tolerance_y)
+
+    def lost(self):
+        """宝箱丢失，下一次观测不再与上一步的按键对应"""
+        self._last = None
+
+    def steer(self, chest, width, height):
+        """
+        根据本帧的宝箱位置更新增益并给出下一步按键
+        :return: {按键: 按住秒数}，已到达目标点附近时只轻推前进
+        """
+        lateral, forward, centered, aligned = self.state(chest, width, height)
+        self._observe(lateral, forward)
+        hold_x = 0.0 if centered else self._hold(lateral, self.gain_x, self.observed[0])
+        hold_y = 0.0 if aligned else self._hold(forward, self.gain_y, self.observed[1])
+        keys = {}
+        if hold_x:
+            keys['d' if hold_x > 0 else 'a'] = abs(hold_x)
+        if hold_y:
+            keys['w' if hold_y > 0 else 's'] = abs(hold_y)
+        if not keys:
+            # 已在目标点附近但还未出现拾取提示，缓慢前进
+            keys['w'] = self.min_hold
+        self._last = (lateral, forward, hold_x, hold_y)
+        return keys
+
+    def _hold(self, distance, gain, observed):
+        limit = self.max_hold if observed else self.probe_hold
+        hold = min(limit, max(self.min_hold, self.response * abs(distance) / gain))
+        return hold if distance > 0 else -hold
+
+    def _observe(self, lateral, forward):
+        """用上一步的按键时长和这一步的实际移动估计增益，按键后距离应向 0 变化"""
+        if self._last is None:
+            return
+        last_lateral, last_forward, hold_x, hold_y = self._last
+        self.gain_x = self._update_gain(0, self.gain_x, last_lateral - lateral, hold_x)
+        self.gain_y = self._update_gain(1, self.gain_y, last_forward - forward, hold_y)
+
+    def _update_gain(self, axis, gain, moved, hold):
+        if abs(hold) < 2 * self.min_hold:
+            # 太短的按键主要是起步加速，移动量不能代表增益
+            return gain
+        observed = moved / hold
+        if observed <= 0:
+            return gain
+        initial = self.initial_gain[axis]
+        low, high = self.gain_range
+        observed = min(initial * high, max(initial * low, observed))
+        self.observed[axis] = True
+        return gain + (observed - gain) * self.adapt
@@ -0,0 +1,94 @@
+class ChestTracker:
+    """
+    宝箱搜索窗口跟踪器
+    以恒速模型预测宝箱中心，只在预测位置附近的窗口内匹配模板；窗口随丢失次数和间隔时间放大，
+    连续丢失 max_misses 次后返回 None，由调用方退回整帧搜索。
+    """
+
+    def __init__(self, margin=1.0, drift=0.2, max_misses=2, smoothing=0.5, box_cls=None):
+        """
+        :param margin: 窗口在宝箱框四周额外保留的大小，按宝箱宽高的倍数计
+        :param drift: 未知运动的放大速度，每秒按画面宽高的比例放大窗口
+        :param max_misses: 连续丢失多少次后退回整帧搜索
+        :param smoothing: 速度估计的指数平滑系数
+        :param box_cls: 搜索区域的 Box 类，默认为 ok 的 Box
+        """
+        self.margin = margin
+        self.drift = drift
+        self.max_misses = max_misses
+        self.smoothing = smoothing
+        self.box_cls = box_cls
+        self.last_search_area = None
+        self.reset()
+
+    def reset(self, box=None, now=None):
+        self.box = box
+        self.last_time = now
+        self.velocity = (0.0, 0.0)
+        self.misses = 0
+
+    def predict(self, now):
+        """返回预测的宝箱中心，没有跟踪目标时返回 None"""
+        if self.box is None:
+            return None
+        center_x, center_y = self.box.center()
+        dt = max(0.0, now - self.last_time) if self.last_time is not None else 0.0
+        return center_x + self.velocity[0] * dt, center_y + self.velocity[1] * dt
+
+    def search_window(self, width, height, now):
+        """返回本帧的搜索区域，需要整帧搜索时返回 None，结果同时记录在 last_search_area"""
+        predicted = self.predict(now)
+        if predicted is None or self.misses >= self.max_misses:
+            self.last_search_area = None
+            return None
+        dt = max(0.0, now - self.last_time) if self.last_time is not None else 0.0
+        grow = 1 + self.misses
+        half_w = (self.box.width * (0.5 + self.margin) + abs(self.velocity[0]) * dt + self.drift * width * dt) * grow
+        half_h = (self.box.height * (0.5 + self.margin) + abs(self.velocity[1]) * dt + self.drift * height * dt) * grow
+        x1 = max(0, int(predicted[0] - half_w))
+        y1 = max(0, int(predicted[1] - half_h))
+        x2 = min(width, int(predicted[0] + half_w))
+        y2 = min(height, int(predicted[1] + half_h))
+        if x2 - x1 >= width and y2 - y1 >= height:
+            self.last_search_area = None
+            return None
+        if self.box_cls is None:
+            from ok import Box
+            self.box_cls = Box
+        self.last_search_area = self.box_cls(x1, y1, x2 - x1, y2 - y1, name='chest_search')
+        return self.last_search_area
+
+    def closest(self, boxes, now):
+        """在多个结果中取离预测位置最近的"""
+        if not boxes:
+            return None
+        predicted = self.predict(now)
+        if predicted is None:
+            return boxes[0]
+        return min(boxes, key=lambda b: abs(b.center()[0] - predicted[0]) + abs(b.center()[1] - predicted[1]))
+
+    def update(self, box, now):
+        """用本帧的匹配结果更新位置和速度；整帧搜索重新找到的目标不继承旧速度"""
+        if self.box is not None and self.last_time is not None and self.misses < self.max_misses:
+            dt = now - self.last_time
+            if dt > 1e-3:
+                old_x, old_y = self.box.center()
+                new_x, new_y = box.center()
+                a = self.smoothing
+                self.velocity = (a * (new_x - old_x) / dt + (1 - a) * self.velocity[0],
+                                 a * (new_y - old_y) / dt + (1 - a) * self.velocity[1])
+        else:
+            self.velocity = (0.0, 0.0)
+        self.box = box
+        self.last_time = now
+        self.misses = 0
+
+    def miss(self):
+        self.misses += 1
+
+    def describe(self, width, height):
+        """搜索区域的文字描述及其占整帧的比例，用于界面展示"""
+        area = self.last_search_area
+        if area is None:
+            return f'整帧 {width}x{height}'
+        return f'({area.x}, {area.y}) {area.width}x{area.height} {area.width * area.height / (width * height):.1%}'
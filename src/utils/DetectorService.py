@@ -0,0 +1,177 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+
+# frame_time 为取得帧快照的时间，done_time 为检测完成的时间
+Detection = namedtuple('Detection', ['name', 'result', 'frame_time', 'done_time', 'frame_index'])
+
+
+class DetectorService:
+    """
+    后台检测服务
+    工作线程循环取当前帧的只读快照，对每一帧新画面依次运行已注册的检测器；
+    非空结果（注册时指定 publish_empty 的检测器为全部结果）带时间戳写入每个检测器的最新值槽，同时放入有界队列（满时丢弃最旧的结果）。
+    移动、转向代码通过 latest() / wait() / drain() 读取结果，无需等待模板匹配。
+    """
+
+    # 取帧失败时的最长重试间隔（秒）
+    MAX_BACKOFF = 1.0
+
+    def __init__(self, frame_source, interval=0.033, queue_size=64, on_error=None):
+        """
+        :param frame_source: 返回当前帧的函数，在工作线程中调用
+        :param interval: 没有新帧时的等待间隔（秒）
+        :param on_error: 检测器抛出异常时的回调 (检测器名, 异常)，取帧失败时检测器名为 'frame_source'
+        """
+        self.frame_source = frame_source
+        self.interval = interval
+        self.on_error = on_error
+        self.results = queue.Queue(maxsize=queue_size)
+        self._detectors = {}
+        self._publish_empty = set()
+        self._latest = {}
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.frames = 0
+
+    def register(self, name, detector, publish_empty=False):
+        """
+        注册检测器 detector(frame) -> 结果，结果为空时不发布；同名检测器会被替换并清空旧结果
+        :param publish_empty: 空结果也发布，用于需要知道目标在哪一帧消失的检测
+        """
+        with self._condition:
+            self._detectors[name] = detector
+            self._latest.pop(name, None)
+            if publish_empty:
+                self._publish_empty.add(name)
+            else:
+                self._publish_empty.discard(name)
+
+    def unregister(self, name):
+        with self._condition:
+            self._detectors.pop(name, None)
+            self._latest.pop(name, None)
+            self._publish_empty.discard(name)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return self
+        # 每个工作线程使用自己的停止事件，上一个线程卡在耗时的检测中未能退出时，重新启动不会让它继续运行
+        stop_event = threading.Event()
+        self._stop_event = stop_event
+        self._thread = threading.Thread(target=self._run, args=(stop_event,), name='detector-service', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1):
+        """通知工作线程停止并最多等待 timeout 秒；未及时退出的线程在当前检测结束后退出，不再发布结果"""
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def latest(self, name, max_age=None):
+        """最新一次发布的结果，超过 max_age 秒的结果视为过期，没有时返回 None"""
+        with self._condition:
+            detection = self._latest.get(name)
+        if detection is None or (max_age is not None and time.time() - detection.frame_time > max_age):
+            return None
+        return detection
+
+    def wait(self, name, timeout, since=None):
+        """等待检测器发布一个帧时间晚于 since 的结果，超时或服务停止时返回 None"""
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                detection = self._latest.get(name)
+                if detection is not None and (since is None or detection.frame_time > since):
+                    return detection
+                remaining = deadline - time.time()
+                if remaining <= 0 or self._stop_event.is_set():
+                    return None
+                self._condition.wait(remaining)
+
+    def drain(self):
+        """按发布顺序取出队列中的全部结果，用于不能漏掉中间结果的检测"""
+        detections = []
+        while True:
+            try:
+                detections.append(self.results.get_nowait())
+            except queue.Empty:
+                return detections
+
+    @staticmethod
+    def snapshot(frame):
+        """不复制像素的只读视图，检测器无法修改共享的帧"""
+        view = frame.view()
+        view.flags.writeable = False
+        return view
+
+    def _run(self, stop_event):
+        last_frame = None
+        backoff = self.interval
+        while not stop_event.is_set():
+            try:
+                source = self.frame_source()
+            except Exception as e:
+                # 取帧失败时按逐渐增加的间隔重试，不让服务静默退出
+                if self.on_error:
+                    self.on_error('frame_source', e)
+                stop_event.wait(backoff)
+                backoff = min(self.MAX_BACKOFF, backoff * 2)
+                continue
+            backoff = self.interval
+            if source is None or source is last_frame:
+                stop_event.wait(self.interval)
+                continue
+            last_frame = source
+            frame = self.snapshot(source)
+            self.frames += 1
+            frame_time = time.time()
+            with self._condition:
+                detectors = list(self._detectors.items())
+                publish_empty = set(self._publish_empty)
+            for name, detector in detectors:
+                if stop_event.is_set():
+                    break
+                try:
+                    result = detector(frame)
+                except Exception as e:
+                    if self.on_error:
+                        self.on_error(name, e)
+                    continue
+                if not result and name not in publish_empty:
+                    continue
+                detection = Detection(name, result, frame_time, time.time(), self.frames)
+                with self._condition:
+                    if stop_event.is_set():
+                        break
+                    if name in self._detectors:
+                        self._latest[name] = detection
+                    self._condition.notify_all()
+                self._publish(detection)
+
+    def _publish(self, detection):
+        while True:
+            try:
+                self.results.put_nowait(detection)
+                return
+            except queue.Full:
+                try:
+                    self.results.get_nowait()
+                except queue.Empty:
+                    pass
@@ -0,0 +1,86 @@
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+FishingBarState = namedtuple('FishingBarState', ['hook_percent', 'target_min', 'target_max', 'white_x'])
+
+
+class FishingBarAnalyzer:
+    """
+    钓鱼条融合分析
+    一次调用得到鱼钩颜色占比、目标区间左右边界和白色游标 x 坐标。
+    颜色判定用 cv2.inRange 写入复用的掩码缓冲区，区间和游标位置由行/列投影求得，不再展开像素列表。
+    """
+
+    def __init__(self, hook_color, target_color, white_color, tolerance):
+        self.bounds = {
+            'hook': self._bounds(hook_color, tolerance),
+            'target': self._bounds(target_color, tolerance),
+            'white': self._bounds(white_color, tolerance),
+        }
+        self._buffers = {}
+
+    @staticmethod
+    def _bounds(color, tolerance):
+        color = np.array(color, dtype=np.int16)
+        lower = np.clip(color - tolerance, 0, 255).astype(np.uint8)
+        upper = np.clip(color + tolerance, 0, 255).astype(np.uint8)
+        return lower, upper
+
+    @staticmethod
+    def _crop(frame, box):
+        if frame is None or box is None or box.width <= 0 or box.height <= 0:
+            return None, 0, 0
+        height, width = frame.shape[:2]
+        x1, y1 = max(0, box.x), max(0, box.y)
+        x2, y2 = min(width, box.x + box.width), min(height, box.y + box.height)
+        if x1 >= x2 or y1 >= y2:
+            return None, 0, 0
+        return frame[y1:y2, x1:x2], x1, y1
+
+    def _buffer(self, key, shape):
+        buf = self._buffers.get(key)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+            self._buffers[key] = buf
+        return buf
+
+    def _mask(self, roi, name):
+        lower, upper = self.bounds[name]
+        return cv2.inRange(roi, lower, upper, self._buffer(('mask', name), roi.shape[:2]))
+
+    def coverage(self, frame, box, name):
+        """区域内指定颜色的像素占比（百分比）"""
+        roi, _, _ = self._crop(frame, box)
+        if roi is None:
+            return 0.0
+        mask = self._mask(roi, name)
+        return cv2.countNonZero(mask) * 100.0 / mask.size
+
+    def target_span(self, frame, box):
+        """返回 (目标区间最左 x, 最右 x, 白色游标 x)，未检测到的项为 None"""
+        roi, x1, _ = self._crop(frame, box)
+        if roi is None:
+            return None, None, None
+        width = roi.shape[1]
+
+        columns = cv2.reduce(self._mask(roi, 'target'), 0, cv2.REDUCE_MAX,
+                             dst=self._buffer(('columns', 'target'), (1, width)))
+        target_cols = np.flatnonzero(columns)
+        if target_cols.size:
+            target_min, target_max = x1 + int(target_cols[0]), x1 + int(target_cols[-1])
+        else:
+            target_min = target_max = None
+
+        # 游标取逐行扫描遇到的第一个白色像素，与原先 np.argwhere(...)[0] 的结果一致
+        white = self._mask(roi, 'white')
+        rows = cv2.reduce(white, 1, cv2.REDUCE_MAX, dst=self._buffer(('rows', 'white'), (roi.shape[0], 1)))
+        first_row = int(np.argmax(rows))
+        white_x = x1 + int(np.argmax(white[first_row])) if rows[first_row, 0] else None
+        return target_min, target_max, white_x
+
+    def analyze(self, frame, hook_box, target_box):
+        hook_percent = self.coverage(frame, hook_box, 'hook')
+        target_min, target_max, white_x = self.target_span(frame, target_box)
+        return FishingBarState(hook_percent, target_min, target_max, white_x)
@@ -0,0 +1,82 @@
+import time
+
+# 钓鱼条区域（1920x1080 参考分辨率下的 x1, y1, x2, y2）和颜色，FishingTask 与钓鱼模拟器共用
+LAYOUT_BOXES = {
+    'fish_hook': (606, 40, 640, 124),
+    'fish_target': (668, 72, 1251, 93),
+}
+COLOR_HOOK = (255, 255, 140)
+COLOR_TARGET = (64, 176, 255)
+COLOR_WHITE = (255, 255, 255)
+COLOR_TOLERANCE = 15
+# 白色游标偏离目标区间中心超过该像素数才按方向键
+ALIGN_THRESHOLD = 5
+
+
+def control_fishing(task, analyzer, hook_box, control_box, align_threshold=ALIGN_THRESHOLD):
+    """
+    遛鱼控制逻辑，包含 2 秒黄色消失稳定检测
+    task 只需提供 frame、sleep、send_key_down、send_key_up、log_info 和 log_debug，
+    钓鱼模拟器用纯 Python 的替身驱动同一段逻辑。
+    :param analyzer: FishingBarAnalyzer
+    :return: 鱼体力耗尽可以收杆时返回 True
+    """
+    task.log_info("开始遛鱼")
+    current_key = None
+    fishing_start_time = time.time()
+    color_zero_start = None  # 记录黄色消失的起始时间
+
+    while True:
+        # 一次分析得到鱼钩黄色百分比、目标区间和白色游标位置
+        bar = analyzer.analyze(task.frame, hook_box, control_box)
+
+        # 检测鱼钩黄色百分比（仅当超过5秒后）
+        if time.time() - fishing_start_time >= 5:
+            if bar.hook_percent <= 0:
+                if color_zero_start is None:
+                    color_zero_start = time.time()
+                    task.log_debug("鱼钩黄色消失，开始2秒计时")
+                elif time.time() - color_zero_start >= 2.0:
+                    task.log_info("鱼钩黄色消失持续2秒，鱼体力耗尽，准备收杆")
+                    if current_key:
+                        task.send_key_up(current_key)
+                    return True
+            else:
+                # 黄色重新出现，重置计时
+                if color_zero_start is not None:
+                    task.log_debug("鱼钩黄色重新出现，重置计时")
+                    color_zero_start = None
+
+        white_x = bar.white_x
+
+        # 如果无法获取目标信息（可能是鱼钩消失期间），则不调整方向键，保持当前按键
+        if bar.target_min is None or white_x is None:
+            task.sleep(0.03)
+            continue
+
+        # 计算目标区域的中心
+        target_center = (bar.target_min + bar.target_max) / 2
+
+        # 方向键控制逻辑
+        if white_x < target_center - align_threshold:
+            if current_key != 'd':
+                if current_key:
+                    task.send_key_up(current_key)
+                task.send_key_down('d')
+                current_key = 'd'
+        elif white_x > target_center + align_threshold:
+            if current_key != 'a':
+                if current_key:
+                    task.send_key_up(current_key)
+                task.send_key_down('a')
+                current_key = 'a'
+        else:
+            # 已对齐，如果当前按键是必要的方向键，则释放
+            if current_key:
+                if (current_key == 'd' and white_x >= target_center) or \
+                   (current_key == 'a' and white_x <= target_center):
+                    task.send_key_up(current_key)
+                    current_key = None
+                    task.sleep(0.1)
+
+        task.sleep(0.03)
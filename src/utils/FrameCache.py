@@ -0,0 +1,71 @@
+import threading
+
+from ok import Box
+
+
+class FrameResultCache:
+    """
+    按帧缓存检测结果
+    同一帧上参数相同的 find_feature / find_one / ocr 只执行一次，新帧到来时整体失效。
+    帧以对象身份区分，缓存持有当前帧的引用，避免对象回收后 id 被复用。
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._results = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, frame, key, compute):
+        if frame is None or key is None:
+            return compute()
+        with self._lock:
+            if frame is not self._frame:
+                self._frame = frame
+                self._results.clear()
+                self.generation += 1
+            if key in self._results:
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+        result = compute()
+        with self._lock:
+            if frame is self._frame:
+                self._results[key] = result
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._frame = None
+            self._results.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'generation': self.generation,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+def make_key(name, args, kwargs):
+    """把调用参数转换为可哈希的缓存键，含函数等无法比较的参数时返回 None（不缓存）"""
+    try:
+        normalized_args = tuple(_normalize(value) for value in args)
+        normalized_kwargs = tuple(sorted((k, _normalize(v)) for k, v in kwargs.items()))
+    except TypeError:
+        return None
+    return name, normalized_args, normalized_kwargs
+
+
+def _normalize(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Box):
+        return 'Box', value.x, value.y, value.width, value.height
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    raise TypeError(f'uncacheable argument: {type(value)}')
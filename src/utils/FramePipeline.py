@@ -0,0 +1,55 @@
+import threading
+
+import cv2
+
+
+def gray_view(frame, dst):
+    code = cv2.COLOR_BGRA2GRAY if frame.ndim == 3 and frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(frame, code, dst=dst)
+
+
+def half_view(frame, dst):
+    height, width = frame.shape[:2]
+    return cv2.resize(frame, (width // 2, height // 2), dst=dst, interpolation=cv2.INTER_AREA)
+
+
+class FramePipeline:
+    """
+    截图预处理流水线
+    stages 依次原地处理每张截图，整个流水线作为 ok 的 screenshot_processor；
+    views 为按需计算的派生画面（名称 -> 函数(frame, dst)），每帧最多计算一次，
+    结果写入该视图复用的缓冲区（轮流使用 buffers 个），视图在之后的帧中会被覆盖，需要保留时请 copy()。
+    """
+
+    def __init__(self, stages=(), views=None, buffers=2):
+        self.stages = list(stages)
+        self.views = dict(views or {})
+        self.buffers = buffers
+        self._frame = None
+        self._cache = {}
+        self._pool = {name: [None] * buffers for name in self.views}
+        self._slot = {name: 0 for name in self.views}
+        self._lock = threading.Lock()
+
+    def __call__(self, frame):
+        for stage in self.stages:
+            frame = stage(frame)
+        return frame
+
+    def view(self, frame, name):
+        """frame 的派生画面，同一帧对象只计算一次"""
+        if frame is None:
+            return None
+        with self._lock:
+            if frame is not self._frame:
+                self._frame = frame
+                self._cache = {}
+            result = self._cache.get(name)
+            if result is None:
+                slots = self._pool[name]
+                slot = self._slot[name]
+                self._slot[name] = (slot + 1) % self.buffers
+                result = self.views[name](frame, slots[slot])
+                slots[slot] = result
+                self._cache[name] = result
+            return result
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+POSTMORTEM_DIR = os.path.join('logs', 'postmortem')
+
+
+class FrameRingBuffer:
+    """
+    最近画面环形缓冲
+    按 fps 抽取截图，缩小到 width 宽并编码为 JPEG，写入预先分配的固定大小槽位，只保留最近 seconds 秒；
+    每个槽位附带该帧上的检测结果。任务失败或卡住时 dump_async() 在后台线程写出全部画面和检测结果。
+    作为截图预处理阶段调用（__call__），不修改画面。
+    """
+
+    def __init__(self, seconds=10, fps=5, width=480, quality=70, slot_size=96 * 1024, on_error=None):
+        """
+        :param on_error: 缓存画面出错时的回调 (异常)，默认写入日志；截图不受影响
+        """
+        self.on_error = on_error
+        self.capacity = max(1, int(seconds * fps))
+        self.interval = 1 / fps
+        self.width = width
+        self.quality = quality
+        self.slot_size = slot_size
+        self._data = np.zeros((self.capacity, slot_size), dtype=np.uint8)
+        self._lengths = np.zeros(self.capacity, dtype=np.int32)
+        self._times = np.zeros(self.capacity, dtype=np.float64)
+        self._notes = [None] * self.capacity
+        self._next = 0
+        self._count = 0
+        self._last_time = float('-inf')
+        self._last_frame = None
+        self._last_slot = -1
+        self._lock = threading.Lock()
+        self.encode_ms = 0.0
+        self.dropped = 0
+
+    def __call__(self, frame):
+        try:
+            self.push(frame)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+            else:
+                from ok import Logger
+                Logger.get_logger(__name__).error(f"最近画面缓存失败: {e}")
+        return frame
+
+    def __len__(self):
+        return self._count
+
+    def push(self, frame, now=None):
+        """按间隔抽取一帧写入缓冲，返回是否写入"""
+        now = time.time() if now is None else now
+        if frame is None or now - self._last_time < self.interval:
+            return False
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        size = (self.width, max(1, round(height * self.width / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        encoded = None
+        for quality in (self.quality, self.quality // 2):
+            ok, buffer = cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if ok and buffer.size <= self.slot_size:
+                encoded = buffer.reshape(-1)
+                break
+        if encoded is None:
+            self.dropped += 1
+            return False
+        with self._lock:
+            slot = self._next
+            self._data[slot, :encoded.size] = encoded
+            self._lengths[slot] = encoded.size
+            self._times[slot] = now
+            self._notes[slot] = {}
+            self._next = (slot + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            self._last_time = now
+            self._last_frame = frame
+            self._last_slot = slot
+        # 编码耗时的指数平均，用于确认截图路径上的开销
+        self.encode_ms = self.encode_ms * 0.9 + (time.perf_counter() - start) * 100
+        return True
+
+    def annotate(self, frame, key, value):
+        """为已写入缓冲的帧附加检测结果，未被抽取的帧忽略"""
+        if frame is None or frame is not self._last_frame:
+            return
+        with self._lock:
+            if frame is self._last_frame:
+                self._notes[self._last_slot][str(key)] = value
+
+    def snapshot(self):
+        """按时间顺序复制出 [(时间, JPEG 字节, 检测结果)]"""
+        with self._lock:
+            start = (self._next - self._count) % self.capacity
+            slots = [(start + i) % self.capacity for i in range(self._count)]
+            return [(float(self._times[s]), self._data[s, :self._lengths[s]].tobytes(), dict(self._notes[s]))
+                    for s in slots]
+
+    def dump(self, folder, entries=None):
+        """把画面和检测结果写入 folder，返回写入的帧数"""
+        entries = self.snapshot() if entries is None else entries
+        os.makedirs(folder, exist_ok=True)
+        index = []
+        for i, (frame_time, data, notes) in enumerate(entries):
+            name = f"{i:03d}_{time.strftime('%H%M%S', time.localtime(frame_time))}_{int(frame_time * 1000) % 1000:03d}.jpg"
+            with open(os.path.join(folder, name), 'wb') as f:
+                f.write(data)
+            index.append({'file': name, 'time': frame_time,
+                          'detections': {key: _describe(value) for key, value in notes.items()}})
+        with open(os.path.join(folder, 'frames.json'), 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+        return len(entries)
+
+    def dump_async(self, name, folder=POSTMORTEM_DIR, on_done=None):
+        """
+        复制当前缓冲后在后台线程写出到 folder/<name>_<时间>/，不阻塞任务线程
+        :param on_done: 写完后的回调 (目录, 帧数或异常)
+        """
+        entries = self.snapshot()
+        target = os.path.join(folder, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}")
+
+        def write():
+            try:
+                result = self.dump(target, entries)
+            except OSError as e:
+                result = e
+            if on_done is not None:
+                on_done(target, result)
+
+        thread = threading.Thread(target=write, name='frame-ring-dump', daemon=True)
+        thread.start()
+        return thread
+
+
+def _describe(value):
+    """检测结果转为可写入 JSON 的形式，带坐标和置信度的对象（ok 的 Box）按属性写出"""
+    if all(hasattr(value, attr) for attr in ('name', 'x', 'y', 'width', 'height', 'confidence')):
+        return {'name': value.name, 'x': value.x, 'y': value.y, 'width': value.width, 'height': value.height,
+                'confidence': round(float(value.confidence), 3)}
+    if isinstance(value, (list, tuple)):
+        return [_describe(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
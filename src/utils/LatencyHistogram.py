@@ -0,0 +1,166 @@
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+PERF_DIR = os.path.join('logs', 'perf')
+# 桶上界（毫秒）：0.05ms 起每档翻倍至约 52 秒，最后一个桶收纳更慢的调用
+BUCKET_BOUNDS_MS = [0.05 * 2 ** i for i in range(21)]
+_BUCKET_BOUNDS_S = [bound / 1000 for bound in BUCKET_BOUNDS_MS]
+NO_PHASE = '-'
+
+
+class LatencyHistogram:
+    """固定对数桶的延迟直方图，记录一次调用只是一次二分查找和几次加法"""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKET_BOUNDS_S) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect_left(_BUCKET_BOUNDS_S, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """q 分位数所在桶的上界（毫秒），落在最后一个桶时返回最大值"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else self.max * 1000
+        return self.max * 1000
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'counts': self.counts,
+        }
+
+
+class LatencyRecorder:
+    """
+    一次任务运行的调用耗时记录
+    instrument() 用计时包装替换实例上的方法，uninstrument() 恢复，未启用时任务上没有任何额外调用。
+    直方图按 (方法名, 阶段) 区分，阶段由 phase() 设定，嵌套时取最内层。
+    后台检测线程中的调用也会记录，归入任务线程当前的阶段，直方图的更新加锁。
+    """
+
+    def __init__(self, task_name):
+        self.task_name = task_name
+        self.started = time.time()
+        self.histograms = {}
+        self._phases = []
+        self._phase_children = []
+        self._wrapped = []
+        self._lock = threading.Lock()
+
+    @property
+    def current_phase(self):
+        return self._phases[-1] if self._phases else NO_PHASE
+
+    @contextmanager
+    def phase(self, name):
+        """phase:名称 直方图记录阶段的自身耗时，嵌套的内层阶段耗时从外层扣除"""
+        self._phases.append(name)
+        self._phase_children.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._phases.pop()
+            children = self._phase_children.pop()
+            if self._phase_children:
+                self._phase_children[-1] += elapsed
+            self.record(f'phase:{name}', elapsed - children)
+
+    def record(self, op, seconds):
+        key = (op, self.current_phase)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def _wrap(self, op, func):
+        record = self.record
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(op, perf_counter() - start)
+
+        return timed
+
+    def instrument(self, obj, names):
+        """包装 obj 上的方法，不存在的方法跳过"""
+        for name in names:
+            func = getattr(obj, name, None)
+            if not callable(func):
+                continue
+            shadowed = name in vars(obj)
+            self._wrapped.append((name, shadowed, vars(obj).get(name)))
+            setattr(obj, name, self._wrap(name, func))
+
+    def uninstrument(self, obj):
+        for name, shadowed, original in reversed(self._wrapped):
+            if shadowed:
+                setattr(obj, name, original)
+            else:
+                vars(obj).pop(name, None)
+        self._wrapped = []
+
+    def to_dict(self):
+        with self._lock:
+            histograms = sorted((key, histogram.to_dict()) for key, histogram in self.histograms.items())
+        return {
+            'task': self.task_name,
+            'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            'elapsed_s': round(time.time() - self.started, 3),
+            'bucket_bounds_ms': BUCKET_BOUNDS_MS,
+            'histograms': [{'op': op, 'phase': phase, **histogram} for (op, phase), histogram in histograms],
+        }
+
+    def dump(self, folder=PERF_DIR):
+        """写出 JSON 并返回文件路径"""
+        os.makedirs(folder, exist_ok=True)
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started))
+        path = os.path.join(folder, f'{self.task_name}_{stamp}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        return path
+
+
+def task_phase(name):
+    """把任务方法的执行过程标记为一个阶段（task.phase），任务未记录阶段（phase_tracking 为假）时直接调用"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not self.phase_tracking:
+                return func(self, *args, **kwargs)
+            with self.phase(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
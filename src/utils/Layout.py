@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class Layout:
+    """
+    界面布局表
+    收集任务类中以 1920x1080 为参考的点（名称 -> (x, y)）和区域（名称 -> (x1, y1, x2, y2)），
+    按实际分辨率编译一次为整数坐标数组和 Box 实例；窗口尺寸变化时按新分辨率重新编译并缓存。
+    区域用 box_cls(x, y, width, height, name=) 构造，默认为 ok 的 Box。
+    """
+
+    def __init__(self, points=None, boxes=None, ref_resolution=(1920, 1080), box_cls=None):
+        self.points = dict(points or {})
+        self.boxes = dict(boxes or {})
+        self.ref_resolution = ref_resolution
+        self.box_cls = box_cls
+        self._compiled = {}
+
+    def compile(self, width, height):
+        key = (width, height)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            if self.box_cls is None:
+                from ok import Box
+                self.box_cls = Box
+            compiled = CompiledLayout(self.points, self.boxes, width, height, self.ref_resolution, self.box_cls)
+            self._compiled[key] = compiled
+        return compiled
+
+    def resolve(self, frame):
+        """按帧尺寸取得编译好的布局，帧为空时返回参考分辨率下的布局"""
+        if frame is None:
+            return self.compile(*self.ref_resolution)
+        height, width = frame.shape[:2]
+        return self.compile(width, height)
+
+
+class CompiledLayout:
+    """某一分辨率下编译好的点和区域"""
+
+    def __init__(self, points, boxes, width, height, ref_resolution, box_cls):
+        self.width = width
+        self.height = height
+        scale = np.array([width / ref_resolution[0], height / ref_resolution[1]])
+
+        self.point_names = list(points)
+        self.point_array = (np.array([points[n] for n in self.point_names], dtype=np.float64).reshape(-1, 2)
+                            * scale).astype(np.int32)
+        self._points = {name: (int(x), int(y)) for name, (x, y) in zip(self.point_names, self.point_array)}
+
+        self.box_names = list(boxes)
+        corners = np.array([boxes[n] for n in self.box_names], dtype=np.float64).reshape(-1, 2, 2) * scale
+        corners = corners.astype(np.int32)
+        # 两个角点可能是任意顺序，统一为左上、右下
+        self.box_array = np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+        self._boxes = {
+            name: box_cls(int(x1), int(y1), max(1, int(x2 - x1)), max(1, int(y2 - y1)), name=name)
+            for name, (x1, y1, x2, y2) in zip(self.box_names, self.box_array)
+        }
+
+    def point(self, name):
+        return self._points[name]
+
+    def box(self, name):
+        """返回共享的 Box 实例，调用方不应修改"""
+        return self._boxes[name]
@@ -0,0 +1,74 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 单次调用最多使用的线程数（含调用线程）
+MAX_WORKERS = 16
+# 自动模式下最多使用的线程数，避免挤占截图和游戏本身
+AUTO_MAX_WORKERS = 4
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def resolve_workers(workers):
+    """把配置的线程数转换为实际线程数，0 或 None 为自动（CPU 核数，最多 AUTO_MAX_WORKERS）"""
+    if not workers or workers < 0:
+        workers = min(AUTO_MAX_WORKERS, os.cpu_count() or 1)
+    return max(1, min(MAX_WORKERS, int(workers)))
+
+
+def _mark_worker():
+    _local.worker = True
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 线程按需创建，空闲时不占 CPU
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS - 1, thread_name_prefix='template-match',
+                                       initializer=_mark_worker)
+        return _pool
+
+
+def _run_all(funcs, stop=None, stopped=None):
+    results = []
+    for func in funcs:
+        if stopped is not None and stopped.is_set():
+            results.append(None)
+            continue
+        result = func()
+        if stop is not None and stop(result):
+            stopped.set()
+        results.append(result)
+    return results
+
+
+def run_parallel(funcs, workers=0, stop=None):
+    """
+    并行执行一组互不相关的无参函数，按原顺序返回结果
+    cv2.matchTemplate 执行时释放 GIL，多个模板可以在不同核上同时匹配。
+    任务按线程数分组，调用线程自己执行第一组，其余提交到共享线程池；
+    线程数为 1、只有一个任务或已在线程池中调用时直接串行执行。任一函数抛出的异常在汇总时重新抛出。
+    :param stop: 对单个结果返回 True 时不再开始其余函数，尚未开始的线程池任务被取消，未执行的函数结果为 None
+    """
+    funcs = list(funcs)
+    stopped = threading.Event() if stop is not None else None
+    workers = min(resolve_workers(workers), len(funcs))
+    if workers <= 1 or getattr(_local, 'worker', False):
+        return _run_all(funcs, stop, stopped)
+    chunks = [funcs[i::workers] for i in range(workers)]
+    pool = _get_pool()
+    futures = [pool.submit(_run_all, chunk, stop, stopped) for chunk in chunks[1:]]
+    chunk_results = [_run_all(chunks[0], stop, stopped)]
+    if stopped is not None and stopped.is_set():
+        for future in futures:
+            future.cancel()
+    for future, chunk in zip(futures, chunks[1:]):
+        chunk_results.append([None] * len(chunk) if future.cancelled() else future.result())
+    results = [None] * len(funcs)
+    for i, chunk_result in enumerate(chunk_results):
+        results[i::workers] = chunk_result
+    return results
@@ -0,0 +1,76 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class OcrCache:
+    """
+    按区域内容缓存 OCR 结果
+    每次识别前把区域缩成灰度缩略图，与同一区域、同一参数下缓存过的缩略图比较，
+    逐像素差值都不超过 tolerance 时视为画面未变化，直接返回上次的识别结果。
+    缓存按最近使用淘汰，最多保留 max_size 条。
+    """
+
+    def __init__(self, max_size=64, tolerance=8, thumb_width=64):
+        self.max_size = max_size
+        self.tolerance = tolerance
+        self.thumb_width = thumb_width
+        self._entries = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def thumbnail(self, frame, box):
+        """区域的灰度缩略图，宽度固定为 thumb_width，区域无效时返回 None"""
+        height, width = frame.shape[:2]
+        x1, y1 = max(0, int(box.x)), max(0, int(box.y))
+        x2, y2 = min(width, int(box.x + box.width)), min(height, int(box.y + box.height))
+        if x1 >= x2 or y1 >= y2:
+            return None
+        roi = frame[y1:y2, x1:x2]
+        if roi.ndim == 3:
+            roi = cv2.cvtColor(roi[:, :, :3], cv2.COLOR_BGR2GRAY)
+        thumb_width = min(self.thumb_width, x2 - x1)
+        thumb_height = max(1, round((y2 - y1) * thumb_width / (x2 - x1)))
+        return cv2.resize(roi, (thumb_width, thumb_height), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def get(self, frame, box, key, compute):
+        """
+        :param key: 区域和识别参数组成的可哈希键，不同参数的结果互不复用
+        :param compute: 缓存未命中时执行的识别函数
+        """
+        thumb = self.thumbnail(frame, box) if frame is not None and box is not None else None
+        if thumb is None or key is None:
+            return compute()
+        with self._lock:
+            for entry_id in reversed(self._entries):
+                entry_key, entry_thumb, result = self._entries[entry_id]
+                if entry_key == key and entry_thumb.shape == thumb.shape \
+                        and np.abs(entry_thumb - thumb).max() <= self.tolerance:
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return list(result) if isinstance(result, list) else result
+            self.misses += 1
+        result = compute()
+        with self._lock:
+            self._entries[next(self._ids)] = (key, thumb, result)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return list(result) if isinstance(result, list) else result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
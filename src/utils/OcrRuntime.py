@@ -0,0 +1,34 @@
+import time
+
+import cv2
+import numpy as np
+
+
+def warmup_frame(width, height, boxes):
+    """在各识别区域内画上文字的合成画面，使检测和识别模型都实际运行一次"""
+    frame = np.full((height, width, 3), 30, dtype=np.uint8)
+    for box in boxes:
+        scale = max(0.4, box.height / 40)
+        cv2.putText(frame, 'OCR 0123', (box.x + 2, box.y + box.height - max(2, box.height // 5)),
+                    cv2.FONT_HERSHEY_SIMPLEX, scale, (240, 240, 240), max(1, int(scale * 2)))
+    return frame
+
+
+def warmup(init_ocr, run_ocr, boxes, width, height, target_height=540):
+    """
+    初始化 OCR 引擎并按实际使用的区域和 target_height 各识别两次
+    :param init_ocr: 初始化 OCR 引擎的函数
+    :param run_ocr: 执行识别的函数，接受 frame / box / target_height 关键字参数
+    :return: {'init_ms': 初始化耗时, 'cold_ms': {区域: 首次耗时}, 'warm_ms': {区域: 第二次耗时}}
+    """
+    start = time.perf_counter()
+    init_ocr()
+    report = {'init_ms': (time.perf_counter() - start) * 1000, 'cold_ms': {}, 'warm_ms': {}}
+    frame = warmup_frame(width, height, boxes)
+    for box in boxes:
+        name = box.name or f'{box.width}x{box.height}'
+        for key in ('cold_ms', 'warm_ms'):
+            start = time.perf_counter()
+            run_ocr(frame=frame, box=box, target_height=target_height)
+            report[key][name] = (time.perf_counter() - start) * 1000
+    return report
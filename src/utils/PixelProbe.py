@@ -0,0 +1,70 @@
+import numpy as np
+
+METRIC_SUM = 'sum'  # 三个通道差值之和 <= 容差
+METRIC_MAX = 'max'  # 每个通道差值都 <= 容差
+
+
+class ProbeTable:
+    """
+    声明式像素探针表
+    每个探针为 名称 -> (1920x1080 参考坐标, 期望 BGR, 容差, 判定方式)。
+    表按实际分辨率编译一次为坐标索引数组，之后每帧只需一次 numpy 取值即可得到全部探针结果。
+    """
+
+    def __init__(self, probes, ref_resolution=(1920, 1080)):
+        self.probes = dict(probes)
+        self.ref_resolution = ref_resolution
+        self._compiled = {}
+
+    def compile(self, width, height):
+        key = (width, height)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = CompiledProbes(self.probes, width, height, self.ref_resolution)
+            self._compiled[key] = compiled
+        return compiled
+
+    def evaluate(self, frame):
+        """返回 {探针名: 是否匹配}，帧为空时返回空字典"""
+        if frame is None:
+            return {}
+        height, width = frame.shape[:2]
+        return self.compile(width, height).evaluate(frame)
+
+
+class CompiledProbes:
+    """某一分辨率下编译好的探针索引"""
+
+    def __init__(self, probes, width, height, ref_resolution):
+        self.names = list(probes)
+        scale_x = width / ref_resolution[0]
+        scale_y = height / ref_resolution[1]
+        xs, ys, colors, tolerances, use_sum = [], [], [], [], []
+        for name in self.names:
+            (ref_x, ref_y), color, tolerance, metric = probes[name]
+            if metric not in (METRIC_SUM, METRIC_MAX):
+                raise ValueError(f'未知的探针判定方式: {metric}')
+            xs.append(int(ref_x * scale_x))
+            ys.append(int(ref_y * scale_y))
+            colors.append(color)
+            tolerances.append(tolerance)
+            use_sum.append(metric == METRIC_SUM)
+        xs = np.array(xs, dtype=np.intp)
+        ys = np.array(ys, dtype=np.intp)
+        # 越界的探针取 (0, 0) 处像素，结果再被 valid 屏蔽为 False
+        self.valid = (xs < width) & (ys < height)
+        self.xs = np.where(self.valid, xs, 0)
+        self.ys = np.where(self.valid, ys, 0)
+        self.colors = np.array(colors, dtype=np.int16).reshape(-1, 3)
+        self.tolerances = np.array(tolerances, dtype=np.int16)
+        self.use_sum = np.array(use_sum, dtype=bool)
+
+    def points(self):
+        return {name: (int(x), int(y)) for name, x, y in zip(self.names, self.xs, self.ys)}
+
+    def evaluate(self, frame):
+        pixels = frame[self.ys, self.xs, :3].astype(np.int16)
+        diff = np.abs(pixels - self.colors)
+        score = np.where(self.use_sum, diff.sum(axis=1), diff.max(axis=1))
+        matched = (score <= self.tolerances) & self.valid
+        return dict(zip(self.names, matched.tolist()))
@@ -0,0 +1,207 @@
+# RunMetrics.py - 循环运行数据
+# 每次任务运行、每个循环（结果、失败原因）和循环内各阶段的耗时写入本地 SQLite，
+# 跨运行统计每小时循环数、各失败路径损失的时间和各阶段 p95 耗时。
+# 查看报告: python -m src.utils.RunMetrics [任务类名]
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DB_PATH = os.path.join('logs', 'run_metrics.sqlite3')
+
+SUCCESS = 'success'
+FAILED = 'failed'
+# 任务停止或异常时未标记结果的循环
+INCOMPLETE = 'incomplete'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL,
+    status TEXT
+);
+CREATE TABLE IF NOT EXISTS cycles (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    seq INTEGER NOT NULL,
+    started REAL NOT NULL,
+    ended REAL,
+    outcome TEXT,
+    failure TEXT
+);
+CREATE TABLE IF NOT EXISTS phases (
+    cycle_id INTEGER NOT NULL REFERENCES cycles(id),
+    name TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cycles_run ON cycles(run_id);
+CREATE INDEX IF NOT EXISTS phases_cycle ON phases(cycle_id);
+"""
+
+
+class RunMetrics:
+    """循环运行数据库，记录由 start_run() 返回的 RunRecorder 完成，其余方法为跨运行查询"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql, params=(), commit=False):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            if commit:
+                self._conn.commit()
+            return cursor
+
+    def start_run(self, task):
+        cursor = self._execute('INSERT INTO runs (task, started) VALUES (?, ?)', (task, time.time()), commit=True)
+        return RunRecorder(self, cursor.lastrowid, task)
+
+    @staticmethod
+    def _filter(task, run_id, alias='r'):
+        clauses, params = [], []
+        if task is not None:
+            clauses.append(f'{alias}.task = ?')
+            params.append(task)
+        if run_id is not None:
+            clauses.append(f'{alias}.id = ?')
+            params.append(run_id)
+        return (' AND '.join(clauses) or '1'), params
+
+    def cycles_per_hour(self, task=None, run_id=None, outcome=SUCCESS):
+        """按运行时长折算的每小时循环数，outcome 为 None 时计全部循环"""
+        where, params = self._filter(task, run_id)
+        hours = self._execute(
+            f"SELECT SUM(COALESCE(r.ended, (SELECT MAX(c.ended) FROM cycles c WHERE c.run_id = r.id), r.started)"
+            f" - r.started) FROM runs r WHERE {where}", params).fetchone()[0] or 0
+        hours /= 3600
+        sql = f"SELECT COUNT(*) FROM cycles c JOIN runs r ON c.run_id = r.id WHERE {where}"
+        if outcome is not None:
+            sql += ' AND c.outcome = ?'
+            params = params + [outcome]
+        count = self._execute(sql, params).fetchone()[0]
+        return count / hours if hours > 0 else 0.0
+
+    def failure_cost(self, task=None, run_id=None):
+        """各失败路径的次数和损失的时间（失败循环的总时长），按损失时间从多到少排序"""
+        where, params = self._filter(task, run_id)
+        rows = self._execute(
+            f"SELECT c.failure, COUNT(*), SUM(c.ended - c.started) FROM cycles c JOIN runs r ON c.run_id = r.id"
+            f" WHERE {where} AND c.outcome = ? GROUP BY c.failure ORDER BY 3 DESC", params + [FAILED]).fetchall()
+        return {failure or '-': {'count': count, 'seconds': seconds or 0.0} for failure, count, seconds in rows}
+
+    def phase_percentile(self, q=95, task=None, run_id=None):
+        """各阶段耗时的 q 分位数（秒，最近秩法），按分位数从大到小排序"""
+        where, params = self._filter(task, run_id)
+        rows = self._execute(
+            f"SELECT p.name, p.duration FROM phases p JOIN cycles c ON p.cycle_id = c.id"
+            f" JOIN runs r ON c.run_id = r.id WHERE {where} ORDER BY p.name, p.duration", params).fetchall()
+        durations = {}
+        for name, duration in rows:
+            durations.setdefault(name, []).append(duration)
+        result = {name: values[max(0, math.ceil(q / 100 * len(values)) - 1)] for name, values in durations.items()}
+        return dict(sorted(result.items(), key=lambda item: -item[1]))
+
+    def report(self, task=None, run_id=None):
+        lines = [f"每小时成功循环 {self.cycles_per_hour(task, run_id):.1f} 个"
+                 f"（含失败 {self.cycles_per_hour(task, run_id, outcome=None):.1f} 个）"]
+        failures = self.failure_cost(task, run_id)
+        if failures:
+            lines.append("失败路径损失时间:")
+            lines += [f"  {cost['seconds']:9.1f} 秒  {cost['count']:5d} 次  {failure}"
+                      for failure, cost in failures.items()]
+        phases = self.phase_percentile(95, task, run_id)
+        if phases:
+            lines.append("阶段耗时 p95:")
+            lines += [f"  {seconds:9.2f} 秒  {name}" for name, seconds in phases.items()]
+        return '\n'.join(lines)
+
+
+class RunRecorder:
+    """
+    一次任务运行的记录器
+    begin_cycle() 开始新循环并结束上一个循环，循环结束时间取到下一个循环开始，包含失败后的等待；
+    mark() 设定当前循环的结果，未标记的循环记为 incomplete。阶段数据在循环结束时一并提交。
+    阶段可能在后台检测线程中结束，循环状态的读写加锁。
+    """
+
+    def __init__(self, metrics, run_id, task):
+        self.metrics = metrics
+        self.run_id = run_id
+        self.task = task
+        self.cycles = 0
+        self._cycle_id = None
+        self._outcome = None
+        self._failure = None
+        self._phase_children = []
+        self._lock = threading.RLock()
+
+    def begin_cycle(self):
+        with self._lock:
+            self.close_cycle()
+            self.cycles += 1
+            cursor = self.metrics._execute('INSERT INTO cycles (run_id, seq, started) VALUES (?, ?, ?)',
+                                           (self.run_id, self.cycles, time.time()))
+            self._cycle_id = cursor.lastrowid
+            self._outcome, self._failure = None, None
+
+    def mark(self, outcome, failure=None):
+        with self._lock:
+            self._outcome, self._failure = outcome, failure
+
+    def close_cycle(self):
+        with self._lock:
+            if self._cycle_id is None:
+                return
+            self.metrics._execute('UPDATE cycles SET ended = ?, outcome = ?, failure = ? WHERE id = ?',
+                                  (time.time(), self._outcome or INCOMPLETE, self._failure, self._cycle_id),
+                                  commit=True)
+            self._cycle_id = None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        记录当前循环中一个阶段的耗时，不在循环中时不记录
+        阶段嵌套时（如 exit_dungeon 中调用 main_page）只记自身耗时，内层阶段的时间从外层扣除，各阶段之和不重复计算
+        """
+        cycle_id = self._cycle_id
+        start = time.time()
+        self._phase_children.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            children = self._phase_children.pop()
+            if self._phase_children:
+                self._phase_children[-1] += elapsed
+            if cycle_id is not None:
+                self.metrics._execute('INSERT INTO phases (cycle_id, name, started, duration) VALUES (?, ?, ?, ?)',
+                                      (cycle_id, name, start, elapsed - children))
+
+    def finish(self, status):
+        """结束本次运行，status 为 finished / stopped（用户停止）/ error"""
+        self.close_cycle()
+        self.metrics._execute('UPDATE runs SET ended = ?, status = ? WHERE id = ?',
+                              (time.time(), status, self.run_id), commit=True)
+
+
+if __name__ == '__main__':
+    import sys
+
+    metrics = RunMetrics()
+    print(metrics.report(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+
+class SceneSettle:
+    """
+    画面稳定检测
+    每帧缩小为灰度缩略图，与上一帧的平均逐像素差不超过 diff_threshold 且持续 stable_time 秒，
+    同时不是加载画面（几乎纯色的画面，或 is_loading 判断为加载中）时视为已稳定、可以操作。
+    expect_change 为 True 时必须先观察到一次画面变化或加载画面，避免在切换开始前就判定稳定。
+    """
+
+    def __init__(self, stable_time=0.5, diff_threshold=3.0, expect_change=False, thumb_width=64,
+                 uniform_std=4.0):
+        self.stable_time = stable_time
+        self.diff_threshold = diff_threshold
+        self.expect_change = expect_change
+        self.thumb_width = thumb_width
+        self.uniform_std = uniform_std
+        self.reset()
+
+    def reset(self):
+        self.changed = not self.expect_change
+        self.last_diff = None
+        self._last = None
+        self._stable_since = None
+
+    def thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        size = (self.thumb_width, max(1, round(height * self.thumb_width / width)))
+        thumb = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if thumb.ndim == 3:
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        return thumb.astype(np.int16)
+
+    def update(self, frame, now, is_loading=None):
+        """
+        输入一帧，返回画面是否已稳定
+        :param is_loading: 可选的加载画面判断函数，只在帧差已足够小时调用
+        """
+        thumb = self.thumbnail(frame)
+        last, self._last = self._last, thumb
+        if last is None:
+            self._stable_since = now
+            return False
+        self.last_diff = float(np.abs(thumb - last).mean())
+        if self.last_diff > self.diff_threshold:
+            # 稳定时间从新画面第一次出现时算起
+            self.changed = True
+            self._stable_since = now
+            return False
+        if thumb.std() < self.uniform_std or (is_loading is not None and is_loading()):
+            # 黑屏/白屏过渡或加载画面：画面虽然不动，但还不能操作
+            self.changed = True
+            self._stable_since = None
+            return False
+        if self._stable_since is None:
+            self._stable_since = now
+        return self.changed and now - self._stable_since >= self.stable_time
@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+MAIN_PAGE = 'main_page'
+IN_DUNGEON = 'in_dungeon'
+MAP = 'map'
+FISHING = 'fishing'
+POPUP = 'popup'
+LOADING = 'loading'
+UNKNOWN = 'unknown'
+
+STATES = [MAIN_PAGE, IN_DUNGEON, MAP, FISHING, POPUP, LOADING]
+
+# result.json 中各特征所在的界面，用于给 assets/images 打初始标签
+CATEGORY_STATES = {
+    'mainpage': MAIN_PAGE,
+    'chest1': IN_DUNGEON, 'chest2': IN_DUNGEON, 'chest3': IN_DUNGEON, 'chest4': IN_DUNGEON, 'chest5': IN_DUNGEON,
+    'opened chest': IN_DUNGEON, 'unopened chest': IN_DUNGEON,
+    'fishing rod': FISHING, 'fishing bait': FISHING,
+    'gotoboss': MAP, 'shenlin': MAP, 'Apophis': MAP,
+    'attend': POPUP, 'enter': POPUP, 'confirm': POPUP, 'cancel': POPUP, 'sure': POPUP, 'back': POPUP,
+    'openchest1': POPUP, 'openchest2': POPUP, 'gonghui': POPUP, 'huodong': POPUP, 'zhongfengtupo': POPUP,
+    'jinruzhandou': POPUP, 'enterchallenge': POPUP,
+}
+
+COCO_JSON = os.path.join('assets', 'result.json')
+# 真实截图样本目录，按 <状态>/<任意名>.png 存放
+SAMPLES_DIR = os.path.join('assets', 'screen_states')
+
+
+def fingerprint(frame):
+    """
+    把一帧压缩为定长特征：32x18 颜色缩略图 + 16x9 边缘强度图
+    先隔行隔列取样再缩放，1080p 下耗时远小于 1 毫秒
+    """
+    height, width = frame.shape[:2]
+    step = max(1, min(height // 36, width // 64) // 2)
+    small = cv2.resize(frame[::step, ::step, :3], (64, 36), interpolation=cv2.INTER_AREA)
+    color = cv2.resize(small, (32, 18), interpolation=cv2.INTER_AREA).astype(np.float32) / 255
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    grad_x = cv2.Sobel(gray, cv2.CV_32F, 1, 0)
+    grad_y = cv2.Sobel(gray, cv2.CV_32F, 0, 1)
+    edges = cv2.resize(cv2.magnitude(grad_x, grad_y), (16, 9), interpolation=cv2.INTER_AREA) / 1020
+    return np.concatenate([color.ravel(), np.minimum(edges, 1).ravel()])
+
+
+class ScreenStateClassifier:
+    """
+    基于最近邻的界面状态分类器
+    索引由带标签的帧构建，查询时计算特征与全部样本的均方距离，距离超过 max_distance 时返回 unknown
+    """
+
+    def __init__(self, max_distance=0.02):
+        self.max_distance = max_distance
+        self._features = np.empty((0, 0), dtype=np.float32)
+        self._labels = []
+
+    def __len__(self):
+        return len(self._labels)
+
+    def add(self, state, frame):
+        feature = fingerprint(frame)
+        if len(self._labels) == 0:
+            self._features = feature[np.newaxis, :]
+        else:
+            self._features = np.vstack([self._features, feature])
+        self._labels.append(state)
+
+    def classify(self, frame):
+        """返回 (状态, 距离)"""
+        if frame is None or not self._labels:
+            return UNKNOWN, float('inf')
+        distances = np.mean((self._features - fingerprint(frame)) ** 2, axis=1)
+        index = int(np.argmin(distances))
+        distance = float(distances[index])
+        if distance > self.max_distance:
+            return UNKNOWN, distance
+        return self._labels[index], distance
+
+    def load_coco(self, coco_json=COCO_JSON):
+        """用 result.json 标注的截图作为初始样本"""
+        if not os.path.exists(coco_json):
+            return
+        with open(coco_json, encoding='utf-8') as f:
+            data = json.load(f)
+        category_map = {category['id']: category['name'] for category in data['categories']}
+        image_states = {}
+        for annotation in data['annotations']:
+            state = CATEGORY_STATES.get(category_map[annotation['category_id']])
+            if state:
+                image_states.setdefault(annotation['image_id'], state)
+        folder = os.path.dirname(coco_json)
+        for image in data['images']:
+            state = image_states.get(image['id'])
+            frame = cv2.imread(os.path.join(folder, image['file_name'])) if state else None
+            if frame is not None:
+                self.add(state, frame)
+
+    def load_samples(self, samples_dir=SAMPLES_DIR):
+        """读取 assets/screen_states/<状态>/ 下的真实截图"""
+        if not os.path.isdir(samples_dir):
+            return
+        for state in os.listdir(samples_dir):
+            state_dir = os.path.join(samples_dir, state)
+            if state not in STATES or not os.path.isdir(state_dir):
+                continue
+            for name in sorted(os.listdir(state_dir)):
+                frame = cv2.imread(os.path.join(state_dir, name))
+                if frame is not None:
+                    self.add(state, frame)
+
+
+_default_classifier = None
+_default_classifier_lock = threading.Lock()
+
+
+def default_classifier():
+    """全部任务共用的分类器，首次使用时构建索引，多个线程同时调用时只构建一次"""
+    global _default_classifier
+    with _default_classifier_lock:
+        if _default_classifier is None:
+            classifier = ScreenStateClassifier()
+            classifier.load_coco()
+            classifier.load_samples()
+            # 纯黑画面视为加载中
+            classifier.add(LOADING, np.zeros((1080, 1920, 3), dtype=np.uint8))
+            _default_classifier = classifier
+    return _default_classifier
@@ -0,0 +1,142 @@
+import importlib.abc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_FILE = os.path.join('logs', 'startup_profile.txt')
+
+_active = None
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """排在 sys.meta_path 最前，向其余 finder 查找模块，并给找到的加载器换上计时的 exec_module"""
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in list(sys.meta_path):
+            if finder is self:
+                continue
+            find_spec = getattr(finder, 'find_spec', None)
+            if find_spec is None:
+                return None
+            spec = find_spec(name, path, target)
+            if spec is not None:
+                self.profile._wrap_loader(spec.loader)
+                return spec
+        return None
+
+
+class StartupProfile:
+    """
+    启动耗时分析
+    在 sys.meta_path 最前插入一个 finder，记录主线程中每个模块执行（exec_module）的总耗时和自身耗时
+    （扣除其间导入的子模块）。包已导入后的 from pkg import mod、importlib.import_module 等
+    任何途径的首次导入都会经过 finder。内置和冻结模块的加载器是类本身，不计时。
+    stage() 记录各初始化阶段的耗时。finish() 停止记录导入并写出报告；
+    ok.start() 中才构造的任务等阶段在 finish() 之后仍会记录，并重新写出报告。
+    """
+
+    def __init__(self, path=PROFILE_FILE):
+        self.path = path
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self.imports = []
+        self.stages = []
+        self._stack = []
+        self._finder = None
+        self._thread_id = threading.get_ident()
+
+    def install(self):
+        if self._finder is None:
+            self._finder = _ImportTimer(self)
+            sys.meta_path.insert(0, self._finder)
+        return self
+
+    def uninstall(self):
+        if self._finder is not None:
+            if self._finder in sys.meta_path:
+                sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    def _wrap_loader(self, loader):
+        if loader is None or isinstance(loader, type):
+            return
+        original = getattr(loader, 'exec_module', None)
+        if original is None or getattr(original, '_startup_profile', None) is self:
+            return
+
+        def exec_module(module):
+            if self._finder is None or threading.get_ident() != self._thread_id:
+                return original(module)
+            start = time.perf_counter()
+            self._stack.append(0.0)
+            try:
+                return original(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = self._stack.pop()
+                if self._stack:
+                    self._stack[-1] += elapsed
+                self.imports.append((module.__name__, elapsed, elapsed - children))
+
+        exec_module._startup_profile = self
+        try:
+            loader.exec_module = exec_module
+        except (AttributeError, TypeError):
+            pass
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+            if self.end_time is not None:
+                self._write()
+
+    def report(self, top=20):
+        total = (self.end_time or time.perf_counter()) - self.start_time
+        lines = [f"启动耗时 {total:.3f} 秒（至 finish）", "", "初始化阶段:"]
+        lines += [f"  {elapsed:8.3f} 秒  {name}" for name, elapsed in self.stages]
+        lines += ["", f"导入耗时前 {top} 项 (自身耗时 / 含子模块总耗时):"]
+        for name, elapsed, own in sorted(self.imports, key=lambda i: i[2], reverse=True)[:top]:
+            lines.append(f"  {own:8.3f} / {elapsed:8.3f} 秒  {name}")
+        return '\n'.join(lines)
+
+    def finish(self):
+        """停止记录导入，写出报告并返回报告文本"""
+        self.uninstall()
+        self.end_time = time.perf_counter()
+        return self._write()
+
+    def _write(self):
+        text = self.report()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        except OSError:
+            pass
+        return text
+
+
+def begin():
+    """开始记录启动过程，应在导入 ok 之前调用"""
+    global _active
+    _active = StartupProfile().install()
+    return _active
+
+
+@contextmanager
+def stage(name):
+    """计时一个启动阶段，未调用 begin() 时不做任何事"""
+    if _active is None:
+        yield
+        return
+    with _active.stage(name):
+        yield
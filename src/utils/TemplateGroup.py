@@ -0,0 +1,159 @@
+import threading
+
+import cv2
+import numpy as np
+
+from src.utils import MatchPool
+
+
+class TemplateGroup:
+    """
+    一组模板的批量匹配器
+    在同一帧（同一裁剪区域）上依次匹配组内所有模板，返回按置信度排序的全部命中；
+    出现高置信度命中时提前结束，并按历史命中次数调整匹配顺序，常见的模板优先匹配。
+    提供模板包（或返回模板包的函数，首次匹配时调用）时优先使用其中按当前分辨率预缩放的模板，
+    包中没有的再向任务取 ok 加载的特征。
+    指定多个线程时组内模板在线程池中同时匹配，此时不再提前结束。
+    命中结果用 box_cls(x, y, width, height, confidence=, name=) 构造，默认为 ok 的 Box。
+    """
+
+    def __init__(self, names, threshold=0.8, confident_threshold=0.9, max_per_template=5, pack=None,
+                 box_cls=None):
+        self.names = list(names)
+        self.pack = pack
+        self.box_cls = box_cls
+        self.threshold = threshold
+        self.confident_threshold = confident_threshold
+        self.max_per_template = max_per_template
+        self._hit_counts = {name: 0 for name in self.names}
+        self._lock = threading.Lock()
+        self._pack_lock = threading.Lock()
+
+    @property
+    def order(self):
+        """当前匹配顺序：命中次数多的在前，次数相同保持定义顺序"""
+        with self._lock:
+            counts = dict(self._hit_counts)
+        return sorted(self.names, key=lambda name: -counts[name])
+
+    @property
+    def hit_counts(self):
+        with self._lock:
+            return dict(self._hit_counts)
+
+    def detect(self, task, frame=None, box=None, threshold=None, names=None, early_exit=True, workers=1):
+        """
+        在一帧上匹配组内模板
+        :param task: 提供 frame / get_feature_by_name 的任务实例
+        :param box: 搜索区域，默认整帧
+        :param names: 仅匹配其中的部分模板，默认全组
+        :param workers: 匹配线程数，见 MatchPool.resolve_workers，默认串行
+        :return: 按置信度从高到低排序的 Box 列表
+        """
+        if frame is None:
+            frame = task.frame
+        if frame is None:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        roi, offset_x, offset_y = self._prepare(frame, box)
+        if roi is None:
+            return []
+
+        order = self.order
+        if names is not None:
+            order = [name for name in order if name in names]
+
+        pack = self._resolve_pack()
+        packed = pack.resolution(frame.shape[1], frame.shape[0]) if pack is not None else None
+        features = []
+        for name in order:
+            feature = packed.get(name) if packed else None
+            if feature is None:
+                feature = task.get_feature_by_name(name)
+            if feature is not None:
+                features.append((name, feature))
+
+        hits = []
+        if len(features) > 1 and MatchPool.resolve_workers(workers) > 1:
+            # 任一模板高置信度命中后取消尚未开始的匹配，与串行时的提前结束一致
+            stop = self._confident if early_exit else None
+            results = MatchPool.run_parallel(
+                [self._match_job(roi, feature, name, threshold, offset_x, offset_y) for name, feature in features],
+                workers, stop=stop)
+            for boxes in results:
+                if boxes:
+                    hits.extend(boxes)
+        else:
+            for name, feature in features:
+                boxes = self._match(roi, feature, name, threshold, offset_x, offset_y)
+                if not boxes:
+                    continue
+                hits.extend(boxes)
+                if early_exit and self._confident(boxes):
+                    break
+
+        hits.sort(key=lambda b: b.confidence, reverse=True)
+        if hits:
+            with self._lock:
+                self._hit_counts[hits[0].name] += 1
+        return hits
+
+    def _resolve_pack(self):
+        """首次使用时加载模板包，多个匹配线程同时调用时只加载一次"""
+        with self._pack_lock:
+            if callable(self.pack):
+                self.pack = self.pack()
+            return self.pack
+
+    def _resolve_box_cls(self):
+        if self.box_cls is None:
+            from ok import Box
+            self.box_cls = Box
+        return self.box_cls
+
+    def detect_one(self, task, frame=None, box=None, threshold=None, names=None, workers=1):
+        hits = self.detect(task, frame=frame, box=box, threshold=threshold, names=names, workers=workers)
+        return hits[0] if hits else None
+
+    @staticmethod
+    def _prepare(frame, box):
+        height, width = frame.shape[:2]
+        if box is None:
+            return frame, 0, 0
+        x1, y1 = max(0, int(box.x)), max(0, int(box.y))
+        x2, y2 = min(width, int(box.x + box.width)), min(height, int(box.y + box.height))
+        if x1 >= x2 or y1 >= y2:
+            return None, 0, 0
+        return frame[y1:y2, x1:x2], x1, y1
+
+    def _confident(self, boxes):
+        return bool(boxes) and boxes[0].confidence >= self.confident_threshold
+
+    def _match_job(self, roi, feature, name, threshold, offset_x, offset_y):
+        return lambda: self._match(roi, feature, name, threshold, offset_x, offset_y)
+
+    def _match(self, roi, feature, name, threshold, offset_x, offset_y):
+        template = feature.mat
+        t_height, t_width = template.shape[:2]
+        if roi.shape[0] < t_height or roi.shape[1] < t_width:
+            return []
+        mask = getattr(feature, 'mask', None)
+        if mask is not None:
+            result = cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED, mask=mask)
+        else:
+            result = cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED)
+        # 纯色区域会产生 nan/inf，统一视为不匹配
+        np.nan_to_num(result, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+
+        box_cls = self._resolve_box_cls()
+        boxes = []
+        for _ in range(self.max_per_template):
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            if max_val < threshold:
+                break
+            x, y = max_loc
+            boxes.append(box_cls(offset_x + x, offset_y + y, t_width, t_height, confidence=float(max_val), name=name))
+            # 抑制当前峰值附近区域，继续寻找同一模板的其它位置
+            result[max(0, y - t_height // 2):y + t_height // 2 + 1,
+                   max(0, x - t_width // 2):x + t_width // 2 + 1] = 0
+        return boxes
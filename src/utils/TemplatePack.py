@@ -0,0 +1,196 @@
+# TemplatePack.py - 预缩放模板包
+# 构建: python -m src.utils.TemplatePack
+# 按 result.json 从 assets/images 裁剪全部特征，按 supported_resolution.resize_to 的每个尺寸预先缩放，
+# 连同灰度图和掩码一起写入一个二进制文件和一个 JSON 索引；运行时以 np.memmap 只读映射，TemplateGroup 匹配时不再解码 PNG。
+# ok 的 FeatureSet 仍在启动时自行解码 PNG，find_feature/find_one 使用的特征不来自模板包，模板包不缩短启动时间。
+
+import hashlib
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+COCO_JSON = os.path.join('assets', 'result.json')
+PACK_DIR = os.path.join('assets', 'template_pack')
+PACK_BIN = 'templates.bin'
+PACK_INDEX = 'templates.json'
+PACK_VERSION = 1
+ALIGNMENT = 64
+
+
+def source_digest(coco_json=COCO_JSON):
+    """标注文件及其引用图片的大小和修改时间的摘要，用于判断模板包是否过期，不读取图片内容"""
+    digest = hashlib.sha1()
+    folder = os.path.dirname(coco_json)
+    with open(coco_json, encoding='utf-8') as f:
+        images = json.load(f)['images']
+    names = [os.path.basename(coco_json)] + [image['file_name'] for image in sorted(images, key=lambda i: i['id'])]
+    for name in names:
+        try:
+            stat = os.stat(os.path.join(folder, name))
+            digest.update(f'{name}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+        except OSError:
+            digest.update(f'{name}:missing;'.encode())
+    digest.update(str(PACK_VERSION).encode())
+    return digest.hexdigest()
+
+
+def crop_features(coco_json=COCO_JSON):
+    """按标注裁剪特征，返回 {类别名: (图像, 掩码或 None, 原图宽, 原图高)}，同名类别取第一个标注"""
+    with open(coco_json, encoding='utf-8') as f:
+        data = json.load(f)
+    folder = os.path.dirname(coco_json)
+    categories = {c['id']: c['name'] for c in data['categories']}
+    images = {i['id']: i for i in data['images']}
+    loaded = {}
+    features = {}
+    for annotation in data['annotations']:
+        name = categories[annotation['category_id']]
+        if name in features:
+            continue
+        image_info = images[annotation['image_id']]
+        if image_info['id'] not in loaded:
+            loaded[image_info['id']] = cv2.imread(os.path.join(folder, image_info['file_name']), cv2.IMREAD_UNCHANGED)
+        image = loaded[image_info['id']]
+        if image is None:
+            continue
+        x, y, w, h = (round(v) for v in annotation['bbox'])
+        crop = image[y:y + h, x:x + w]
+        mask = None
+        if crop.ndim == 3 and crop.shape[2] == 4:
+            alpha = crop[:, :, 3]
+            if alpha.min() < 255:
+                mask = np.ascontiguousarray(alpha)
+            crop = crop[:, :, :3]
+        features[name] = (np.ascontiguousarray(crop), mask, image.shape[1], image.shape[0])
+    return features
+
+
+def build_pack(resolutions, coco_json=COCO_JSON, output_dir=PACK_DIR):
+    """生成模板包，返回索引文件路径"""
+    features = crop_features(coco_json)
+    os.makedirs(output_dir, exist_ok=True)
+    index = {
+        'version': PACK_VERSION,
+        'source': source_digest(coco_json),
+        'resolutions': {},
+    }
+    offset = 0
+    bin_path = os.path.join(output_dir, PACK_BIN)
+    tmp_path = bin_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        def write(array):
+            nonlocal offset
+            padding = -offset % ALIGNMENT
+            f.write(b'\0' * padding)
+            offset += padding
+            entry = [offset, list(array.shape)]
+            f.write(np.ascontiguousarray(array).tobytes())
+            offset += array.nbytes
+            return entry
+
+        for width, height in resolutions:
+            entries = {}
+            for name, (image, mask, src_width, src_height) in features.items():
+                size = (max(1, round(image.shape[1] * width / src_width)),
+                        max(1, round(image.shape[0] * height / src_height)))
+                interpolation = cv2.INTER_AREA if size[0] < image.shape[1] else cv2.INTER_CUBIC
+                scaled = cv2.resize(image, size, interpolation=interpolation)
+                entries[name] = {
+                    'bgr': write(scaled),
+                    'gray': write(cv2.cvtColor(scaled, cv2.COLOR_BGR2GRAY)),
+                    'mask': write(cv2.resize(mask, size, interpolation=cv2.INTER_NEAREST)) if mask is not None else None,
+                }
+            index['resolutions'][f'{width}x{height}'] = entries
+    os.replace(tmp_path, bin_path)
+    index_path = os.path.join(output_dir, PACK_INDEX)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    return index_path
+
+
+class PackedTemplate:
+    """模板包中的一个模板，属性与 ok 的 Feature 对齐（mat / mask），另有灰度图 gray"""
+
+    __slots__ = ('name', 'mat', 'gray', 'mask')
+
+    def __init__(self, name, mat, gray, mask):
+        self.name = name
+        self.mat = mat
+        self.gray = gray
+        self.mask = mask
+
+
+class TemplatePack:
+    """只读映射的模板包，切换分辨率只是一次索引查找"""
+
+    def __init__(self, output_dir=PACK_DIR):
+        with open(os.path.join(output_dir, PACK_INDEX), encoding='utf-8') as f:
+            self.index = json.load(f)
+        self._data = np.memmap(os.path.join(output_dir, PACK_BIN), dtype=np.uint8, mode='r')
+        self._resolutions = {}
+
+    @property
+    def source(self):
+        return self.index.get('source')
+
+    def _view(self, entry):
+        if entry is None:
+            return None
+        offset, shape = entry
+        return np.ndarray(shape, dtype=np.uint8, buffer=self._data, offset=offset)
+
+    def resolution(self, width, height):
+        """返回 {类别名: PackedTemplate}，模板包中没有该分辨率时返回 None"""
+        key = (width, height)
+        if key not in self._resolutions:
+            entries = self.index['resolutions'].get(f'{width}x{height}')
+            self._resolutions[key] = None if entries is None else {
+                name: PackedTemplate(name, self._view(e['bgr']), self._view(e['gray']), self._view(e['mask']))
+                for name, e in entries.items()
+            }
+        return self._resolutions[key]
+
+
+_default_pack = None
+_default_pack_lock = threading.Lock()
+
+
+def default_pack(resolutions, coco_json=COCO_JSON, output_dir=PACK_DIR):
+    """
+    全部任务共用的模板包
+    模板包不存在、版本不符或标注已更新时重新构建一次；构建失败返回 None，调用方退回 ok 加载的特征。
+    """
+    global _default_pack
+    with _default_pack_lock:
+        if _default_pack is None:
+            _default_pack = _load_default_pack(resolutions, coco_json, output_dir)
+    return _default_pack or None
+
+
+def _load_default_pack(resolutions, coco_json, output_dir):
+    from ok import Logger
+    logger = Logger.get_logger(__name__)
+    try:
+        pack = None
+        if os.path.exists(os.path.join(output_dir, PACK_INDEX)):
+            pack = TemplatePack(output_dir)
+            if pack.index.get('version') != PACK_VERSION or pack.source != source_digest(coco_json):
+                pack = None
+        if pack is None:
+            logger.info("模板包不存在或已过期，重新构建")
+            build_pack(resolutions, coco_json, output_dir)
+            pack = TemplatePack(output_dir)
+        return pack
+    except Exception as e:
+        logger.error(f"模板包加载失败，使用 ok 加载的特征: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    from src.config import config
+
+    path = build_pack([tuple(r) for r in config['supported_resolution']['resize_to']])
+    print(f"✅ 模板包已写入 {path}")
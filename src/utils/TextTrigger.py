@@ -0,0 +1,115 @@
+import re
+import unicodedata
+from collections import deque
+
+# 关键词中的字在 OCR 结果中被识别成的其它字形，只在匹配关键词的位置上当作关键词中的字，不替换整段文本
+# 只收录实际 OCR 结果中出现过的误识别，新增条目需附带识别结果的例子并在 tests/TestUtils.py 中补充用例
+OCR_CONFUSABLE_GLYPHS = {
+    # 默认检测文字 3X饰品、3x载具 中的 x，消息中写作乘号时识别结果为 ×
+    'x': '×',
+}
+_GLYPH_ALIASES = {glyph: char for char, glyphs in OCR_CONFUSABLE_GLYPHS.items() for glyph in glyphs}
+
+# 符号的常见误识别（全角字符由 NFKC 处理）
+OCR_CONFUSIONS = str.maketrans({
+    '〇': '0',
+    '—': '-',
+    '–': '-',
+    '，': ',',
+    '。': '.',
+})
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(text):
+    """NFKC 归一化、转小写、替换误识别的符号并去掉全部空白"""
+    text = unicodedata.normalize('NFKC', text).lower().translate(OCR_CONFUSIONS)
+    return _WHITESPACE.sub('', text)
+
+
+def split_words(raw):
+    """把配置中以逗号分隔的词表拆分为列表，中英文逗号均可"""
+    if not raw:
+        return []
+    return [w.strip() for w in re.split(r'[,，]', raw) if w.strip()]
+
+
+class TextTrigger:
+    """
+    多关键词文字触发器
+    包含词和排除词编译进同一个 Aho-Corasick 自动机，一次扫描得到全部命中；
+    文本含任一排除词时不触发，否则返回配置顺序中最靠前的命中关键词。
+    文本中的字没有对应的转移时，按 OCR_CONFUSABLE_GLYPHS 换成关键词中的字再试一次。
+    """
+
+    def __init__(self, include, exclude=()):
+        self.include = [w for w in include if normalize(w)]
+        self.exclude = [w for w in exclude if normalize(w)]
+        self._build()
+
+    @classmethod
+    def from_config(cls, include_raw, exclude_raw=''):
+        return cls(split_words(include_raw), split_words(exclude_raw))
+
+    def _build(self):
+        # 每个节点: 子节点表、失败指针、输出 (是否排除词, 序号) 列表
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        patterns = [(False, i, w) for i, w in enumerate(self.include)]
+        patterns += [(True, i, w) for i, w in enumerate(self.exclude)]
+        for is_exclude, index, word in patterns:
+            node = 0
+            for char in normalize(word):
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[node][char] = next_node
+                node = next_node
+            self._output[node].append((is_exclude, index))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def scan(self, text):
+        """返回 (命中的包含词, 命中的排除词)，均按配置顺序排列"""
+        includes, excludes = set(), set()
+        node = 0
+        for char in normalize(text):
+            alias = _GLYPH_ALIASES.get(char)
+            while node and char not in self._goto[node] and alias not in self._goto[node]:
+                node = self._fail[node]
+            next_node = self._goto[node].get(char)
+            if next_node is None and alias is not None:
+                next_node = self._goto[node].get(alias)
+            node = next_node or 0
+            for is_exclude, index in self._output[node]:
+                (excludes if is_exclude else includes).add(index)
+        return [self.include[i] for i in sorted(includes)], [self.exclude[i] for i in sorted(excludes)]
+
+    def match(self, text):
+        """返回触发的关键词，未触发或含排除词时返回 None"""
+        includes, excludes = self.scan(text)
+        if excludes or not includes:
+            return None
+        return includes[0]
+
+    def match_boxes(self, boxes):
+        """在 OCR 结果中找到第一个触发的文本框，返回 (文本框, 关键词)，没有时返回 (None, None)"""
+        for box in boxes or []:
+            keyword = self.match(box.name)
+            if keyword:
+                return box, keyword
+        return None, None
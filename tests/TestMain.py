@@ -201,6 +201,198 @@ class TestSimpleImageOperations(unittest.TestCase):
         print(f"✅ 数组内容:\n{arr}")
 
 
+class TestFrameResultCache(unittest.TestCase):
+    """按帧检测缓存测试"""
+
+    def test_hit_and_invalidate(self):
+        """同一帧命中缓存，新帧自动失效"""
+        from src.utils.FrameCache import FrameResultCache, make_key
+
+        cache = FrameResultCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return ['result']
+
+        frame1 = np.zeros((10, 10, 3), dtype=np.uint8)
+        frame2 = np.zeros((10, 10, 3), dtype=np.uint8)
+        key = make_key('find_one', ('back',), {'threshold': 0.75})
+
+        cache.get(frame1, key, compute)
+        cache.get(frame1, key, compute)
+        self.assertEqual(len(calls), 1)
+
+        cache.get(frame2, key, compute)
+        self.assertEqual(len(calls), 2)
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        print(f"✅ 缓存统计: {stats}")
+
+    def test_uncacheable_arguments(self):
+        """含函数参数时不缓存"""
+        from src.utils.FrameCache import make_key
+
+        self.assertIsNone(make_key('find_feature', ('chest1',), {'frame_processor': lambda f: f}))
+
+
+class TestFishingBarAnalyzer(unittest.TestCase):
+    """钓鱼条融合分析测试"""
+
+    def test_analyze(self):
+        """一次分析得到鱼钩占比、目标区间和白色游标"""
+        from ok import Box
+        from src.utils.FishingBarAnalyzer import FishingBarAnalyzer
+
+        analyzer = FishingBarAnalyzer((255, 255, 140), (64, 176, 255), (255, 255, 255), 15)
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        frame[40:60, 606:640] = (250, 250, 150)
+        frame[72:93, 800:900] = (64, 176, 255)
+        frame[80:93, 850] = (255, 255, 255)
+
+        bar = analyzer.analyze(frame, Box(606, 40, 34, 84), Box(668, 72, 583, 21))
+        self.assertAlmostEqual(bar.hook_percent, 20 * 34 * 100 / (84 * 34))
+        self.assertEqual((bar.target_min, bar.target_max, bar.white_x), (800, 899, 850))
+
+        empty = analyzer.analyze(np.zeros_like(frame), Box(606, 40, 34, 84), Box(668, 72, 583, 21))
+        self.assertEqual(empty.hook_percent, 0)
+        self.assertIsNone(empty.white_x)
+        print(f"✅ 钓鱼条分析: {bar}")
+
+
+class TestOcrCache(unittest.TestCase):
+    """OCR 内容缓存测试"""
+
+    def test_unchanged_region_skips_ocr(self):
+        """区域画面未变化时复用结果，文字变化后重新识别"""
+        from ok import Box
+        from src.utils.OcrCache import OcrCache
+
+        cache = OcrCache(max_size=4, tolerance=8)
+        box = Box(100, 100, 170, 55)
+        frame = np.full((1080, 1920, 3), 40, dtype=np.uint8)
+        cv2.putText(frame, 'ABC', (110, 140), cv2.FONT_HERSHEY_SIMPLEX, 1, (220, 220, 220), 2)
+        calls = []
+
+        def run_ocr():
+            calls.append(1)
+            return ['ABC']
+
+        self.assertEqual(cache.get(frame, box, 'ocr', run_ocr), ['ABC'])
+        noisy = frame.copy()
+        noisy[100:155, 100:270] += 2
+        self.assertEqual(cache.get(noisy, box, 'ocr', run_ocr), ['ABC'])
+        self.assertEqual(len(calls), 1)
+
+        changed = np.full_like(frame, 40)
+        cv2.putText(changed, 'ABD', (110, 140), cv2.FONT_HERSHEY_SIMPLEX, 1, (220, 220, 220), 2)
+        cache.get(changed, box, 'ocr', run_ocr)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.stats()['hits'], 1)
+        print(f"✅ OCR 缓存统计: {cache.stats()}")
+
+
+class TestDetectorService(unittest.TestCase):
+    """后台检测服务测试"""
+
+    def test_publishes_latest_detection(self):
+        """每帧新画面运行一次检测器，结果带时间戳发布，快照只读"""
+        from src.utils.DetectorService import DetectorService
+
+        frames = [np.zeros((4, 4, 3), dtype=np.uint8)]
+        writable = []
+
+        def detector(frame):
+            writable.append(frame.flags.writeable)
+            return 'chest' if frame[0, 0, 0] == 255 else None
+
+        service = DetectorService(lambda: frames[-1], interval=0.005)
+        service.register('chest', detector)
+        with service:
+            self.assertIsNone(service.wait('chest', timeout=0.1))
+            hit = np.zeros((4, 4, 3), dtype=np.uint8)
+            hit[0, 0] = 255
+            frames.append(hit)
+            detection = service.wait('chest', timeout=2)
+        self.assertEqual(detection.result, 'chest')
+        self.assertLessEqual(detection.frame_time, detection.done_time)
+        self.assertEqual(service.results.get_nowait(), detection)
+        self.assertEqual(service.frames, 2)
+        self.assertFalse(any(writable))
+        print(f"✅ 后台检测结果: {detection}")
+
+    def test_publish_empty(self):
+        """publish_empty 的检测器空结果也按顺序发布"""
+        from src.utils.DetectorService import DetectorService
+
+        service = DetectorService(lambda: np.zeros((4, 4, 3), dtype=np.uint8), interval=0.005)
+        service.register('prompt', lambda frame: None, publish_empty=True)
+        with service:
+            detection = service.wait('prompt', timeout=2)
+        self.assertIsNone(detection.result)
+        self.assertTrue(all(d.name == 'prompt' and d.result is None for d in service.drain()))
+        self.assertEqual(service.drain(), [])
+        print(f"✅ 空结果: {detection}")
+
+    def test_restart_and_frame_errors(self):
+        """卡住的旧线程在重启后退出且不再发布结果，取帧异常后重试"""
+        import threading
+        import time
+        from src.utils.DetectorService import DetectorService
+
+        release = threading.Event()
+        errors = []
+        calls = []
+
+        def frame_source():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError('no frame')
+            return np.full((4, 4, 3), len(calls) % 256, dtype=np.uint8)
+
+        def slow(frame):
+            release.wait(2)
+            return 'old'
+
+        service = DetectorService(frame_source, interval=0.005, on_error=lambda name, e: errors.append(name))
+        service.register('chest', slow)
+        service.start()
+        old_thread = service._thread
+        time.sleep(0.1)
+        service.stop(timeout=0.01)
+        self.assertTrue(old_thread.is_alive())
+
+        service.register('chest', lambda frame: 'new')
+        with service:
+            release.set()
+            old_thread.join(2)
+            self.assertFalse(old_thread.is_alive())
+            detection = service.wait('chest', timeout=2)
+        self.assertEqual(detection.result, 'new')
+        self.assertEqual(errors, ['frame_source'])
+        print(f"✅ 重启后结果: {detection}")
+
+
+class TestBenchmarkTables(unittest.TestCase):
+    """性能基准中的声明与任务一致"""
+
+    def test_tables_match_tasks(self):
+        """基准不导入任务，分辨率、宝箱模板、像素探针、钓鱼条区域和提示关键词需与任务中的定义一致"""
+        from benchmark import Benchmark
+        from src.tasks.FishingTask import FishingTask
+        from src.tasks.MoKuaiJinBiTask import MoKuaiJinBiTask
+
+        self.assertEqual(Benchmark.RESOLUTIONS, [tuple(r) for r in config['supported_resolution']['resize_to']])
+        self.assertEqual(Benchmark.CHEST_NAMES, MoKuaiJinBiTask.CHEST_NAMES)
+        self.assertEqual(Benchmark.PIXEL_PROBES, MoKuaiJinBiTask.PIXEL_PROBES)
+        self.assertEqual(Benchmark.FISHING_BOXES,
+                         {name: FishingTask.LAYOUT_BOXES[name] for name in Benchmark.FISHING_BOXES})
+        self.assertEqual(Benchmark.CHEST_PROMPT_KEYWORDS, MoKuaiJinBiTask.CHEST_PROMPT_TRIGGER.include)
+        print("✅ 性能基准声明与任务一致")
+
+
 def main():
     """主函数"""
     print("=" * 60)
@@ -0,0 +1,762 @@
+# TestUtils.py - 纯工具模块测试
+# 这些模块只依赖 cv2/numpy/标准库，不导入 ok，可以在任意平台上运行
+
+import unittest
+import os
+import json
+import cv2
+import numpy as np
+
+
+class SimpleBox:
+    """代替 ok 的 Box 构造检测结果，属性与其一致"""
+
+    def __init__(self, x, y, width, height, confidence=1.0, name=None):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.confidence = confidence
+        self.name = name
+
+    def center(self):
+        return round(self.x + self.width / 2), round(self.y + self.height / 2)
+
+
+class TestTemplateGroup(unittest.TestCase):
+    """宝箱模板批量匹配测试"""
+
+    def test_early_exit_and_hit_order(self):
+        """命中多的模板提前匹配，高置信度命中后不再匹配其余模板"""
+        from src.utils.TemplateGroup import TemplateGroup
+
+        rng = np.random.default_rng(0)
+        templates = {name: rng.integers(0, 256, (24, 24, 3), dtype=np.uint8) for name in ['chest1', 'chest2']}
+        matched = []
+
+        class Feature:
+            def __init__(self, name):
+                self.name = name
+
+            @property
+            def mat(self):
+                matched.append(self.name)
+                return templates[self.name]
+
+        class Task:
+            frame = None
+
+            def get_feature_by_name(self, name):
+                return Feature(name)
+
+        frame = np.zeros((200, 300, 3), dtype=np.uint8)
+        frame[50:74, 120:144] = templates['chest2']
+        group = TemplateGroup(['chest1', 'chest2'], box_cls=SimpleBox)
+
+        hit = group.detect_one(Task(), frame=frame)
+        self.assertEqual((hit.name, hit.x, hit.y), ('chest2', 120, 50))
+        self.assertEqual(matched, ['chest1', 'chest2'])
+        self.assertEqual(group.order, ['chest2', 'chest1'])
+
+        matched.clear()
+        self.assertEqual(group.detect_one(Task(), frame=frame).name, 'chest2')
+        self.assertEqual(matched, ['chest2'])
+        print(f"✅ 匹配顺序: {group.order} {group.hit_counts}")
+
+
+class TestPixelProbe(unittest.TestCase):
+    """像素探针表测试"""
+
+    def test_scaled_probe_evaluation(self):
+        """探针按分辨率缩放坐标，一次取值得到全部结果"""
+        from src.utils.PixelProbe import ProbeTable, METRIC_MAX, METRIC_SUM
+
+        table = ProbeTable({
+            'exit_button_white': ((267, 65), (255, 255, 255), 10, METRIC_MAX),
+            'main_page': ((22, 63), (237, 166, 62), 29, METRIC_SUM),
+        })
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        frame[43, 178] = (250, 246, 255)
+        frame[42, 14] = (237, 166, 92)
+
+        result = table.evaluate(frame)
+        self.assertTrue(result['exit_button_white'])
+        self.assertFalse(result['main_page'])  # 差值和 30，不满足原先 < 30 的判定
+
+        frame[42, 14] = (237, 166, 91)
+        self.assertTrue(table.evaluate(frame)['main_page'])
+        print(f"✅ 720p 探针坐标: {table.compile(1280, 720).points()}")
+
+    def test_out_of_bounds_probe(self):
+        """越界探针返回 False"""
+        from src.utils.PixelProbe import ProbeTable, METRIC_MAX
+
+        table = ProbeTable({'outside': ((5000, 10), (0, 0, 0), 0, METRIC_MAX)})
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        self.assertFalse(table.evaluate(frame)['outside'])
+        self.assertEqual(table.evaluate(None), {})
+
+
+class TestTextTrigger(unittest.TestCase):
+    """多关键词文字触发器测试"""
+
+    def test_include_exclude(self):
+        """一次扫描返回配置顺序最靠前的关键词，含排除词时不触发"""
+        from src.utils.TextTrigger import TextTrigger
+
+        trigger = TextTrigger.from_config('时装,饰品,3X饰品,he,she', '吃,300')
+        self.assertEqual(trigger.match('收 3×饰品'), '饰品')
+        self.assertEqual(trigger.scan('ushers')[0], ['he', 'she'])
+        self.assertIsNone(trigger.match('300时装'))
+        self.assertEqual(trigger.match('３Ｘ 饰品'), '饰品')
+        self.assertIsNone(trigger.match('载具'))
+        self.assertEqual(TextTrigger(['太极匣', '高级密码箱']).match('打开 高级密码箱'), '高级密码箱')
+        print("✅ 文字触发器匹配正确")
+
+    def test_confusable_glyphs_at_keyword_positions(self):
+        """误识别的字形只在关键词的位置上替换，每个条目都有对应的识别结果"""
+        from src.utils.TextTrigger import OCR_CONFUSABLE_GLYPHS, TextTrigger, normalize
+
+        # OCR_CONFUSABLE_GLYPHS 中每个条目对应的识别结果: 字形 -> (关键词, 识别结果)
+        observed = {
+            '×': ('3X饰品', '收 3×饰品'),
+        }
+        self.assertEqual(set(observed), {g for glyphs in OCR_CONFUSABLE_GLYPHS.values() for g in glyphs})
+        for glyph, (keyword, text) in observed.items():
+            self.assertEqual(TextTrigger([keyword]).match(text), keyword)
+
+        # 整段文本不做替换，只有关键词的字才接受对应字形
+        self.assertEqual(normalize('3×饰品'), '3×饰品')
+        self.assertIsNone(TextTrigger(['3×饰品']).match('3x饰品'))
+        self.assertEqual(TextTrigger(['3×饰品']).match('3×饰品'), '3×饰品')
+        # 原字有对应的转移时按原字匹配
+        self.assertEqual(TextTrigger(['x', 'a×b']).scan('a×b')[0], ['a×b'])
+        self.assertEqual(TextTrigger(['x', 'a×b']).scan('c×')[0], ['x'])
+        self.assertIsNone(TextTrigger(['饰品'], ['3x']).match('3×饰品'))
+
+
+class TestLayout(unittest.TestCase):
+    """界面布局表测试"""
+
+    def test_compile_per_resolution(self):
+        """按分辨率编译一次，窗口尺寸变化时重新编译"""
+        from src.utils.Layout import Layout
+
+        layout = Layout({'exit_button': (267, 65)}, {'chest_prompt': (1110, 520, 1280, 575)}, box_cls=SimpleBox)
+        frame_720p = np.zeros((720, 1280, 3), dtype=np.uint8)
+        compiled = layout.resolve(frame_720p)
+        self.assertIs(layout.resolve(frame_720p), compiled)
+        self.assertEqual(compiled.point('exit_button'), (178, 43))
+        box = compiled.box('chest_prompt')
+        self.assertEqual((box.x, box.y, box.width, box.height), (740, 346, 113, 37))
+
+        compiled_1440p = layout.resolve(np.zeros((1440, 2560, 3), dtype=np.uint8))
+        self.assertEqual(compiled_1440p.point('exit_button'), (356, 86))
+        self.assertEqual(layout.resolve(None).point('exit_button'), (267, 65))
+        print(f"✅ 720p 布局: {compiled.point_array.tolist()} {compiled.box_array.tolist()}")
+
+
+class TestMatchPool(unittest.TestCase):
+    """并行模板匹配测试"""
+
+    def test_parallel_matches_serial(self):
+        """多线程匹配结果与串行一致，顺序与提交顺序一致"""
+        import cv2
+        from src.utils import MatchPool
+
+        rng = np.random.default_rng(3)
+        frame = rng.integers(0, 255, (360, 640, 3), dtype=np.uint8)
+        templates = [frame[y:y + 24, x:x + 24].copy() for x, y in [(10, 20), (300, 100), (500, 300), (50, 200)]]
+        jobs = [lambda t=t: cv2.minMaxLoc(cv2.matchTemplate(frame, t, cv2.TM_CCOEFF_NORMED))[3] for t in templates]
+
+        serial = MatchPool.run_parallel(jobs, workers=1)
+        parallel = MatchPool.run_parallel(jobs, workers=3)
+        self.assertEqual(serial, [(10, 20), (300, 100), (500, 300), (50, 200)])
+        self.assertEqual(parallel, serial)
+        self.assertEqual(MatchPool.resolve_workers(100), MatchPool.MAX_WORKERS)
+        self.assertGreaterEqual(MatchPool.resolve_workers(0), 1)
+        print(f"✅ 并行匹配结果: {parallel}")
+
+    def test_stop_cancels_remaining(self):
+        """结果满足 stop 后不再开始其余函数，未执行的结果为 None"""
+        import time
+        from src.utils import MatchPool
+
+        called = []
+
+        def job(i):
+            def run():
+                called.append(i)
+                if i == 1:
+                    time.sleep(0.05)
+                return 'hit' if i == 0 else i
+            return run
+
+        results = MatchPool.run_parallel([job(i) for i in range(6)], workers=2, stop=lambda r: r == 'hit')
+        self.assertEqual(results[0], 'hit')
+        self.assertEqual(results[2:], [None] * 4)
+        self.assertNotIn(3, called)
+        self.assertEqual(MatchPool.run_parallel([job(i) for i in range(3)], workers=1, stop=lambda r: r == 'hit'),
+                         ['hit', None, None])
+        print(f"✅ 提前结束后执行过的函数: {sorted(called)}")
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """调用耗时直方图测试"""
+
+    def test_instrument_and_phase(self):
+        """包装的方法按阶段计数，恢复后实例上不留包装"""
+        from src.utils.LatencyHistogram import LatencyHistogram, LatencyRecorder
+
+        histogram = LatencyHistogram()
+        for ms in [1] * 90 + [100] * 10:
+            histogram.record(ms / 1000)
+        self.assertEqual(histogram.percentile(50), 1.6)
+        self.assertEqual(histogram.percentile(99), 102.4)
+
+        class Task:
+            def find_one(self, name):
+                return name
+
+        task = Task()
+        recorder = LatencyRecorder('Task')
+        recorder.instrument(task, ['find_one', 'missing'])
+        self.assertEqual(task.find_one('a'), 'a')
+        with recorder.phase('approach'):
+            task.find_one('b')
+            task.find_one('c')
+        recorder.uninstrument(task)
+        self.assertNotIn('find_one', vars(task))
+        counts = {(h['op'], h['phase']): h['count'] for h in recorder.to_dict()['histograms']}
+        self.assertEqual(counts, {('find_one', '-'): 1, ('find_one', 'approach'): 2, ('phase:approach', '-'): 1})
+        print(f"✅ 调用耗时直方图: {counts}")
+
+    def test_nested_phase_counts_own_time(self):
+        """嵌套阶段的 phase 直方图只记自身耗时，阶段内的调用归入最内层阶段"""
+        import time
+        from src.utils.LatencyHistogram import LatencyRecorder
+
+        recorder = LatencyRecorder('Task')
+        with recorder.phase('exit_dungeon'):
+            with recorder.phase('main_page'):
+                time.sleep(0.1)
+        totals = {(h['op'], h['phase']): h['total_ms'] for h in recorder.to_dict()['histograms']}
+        self.assertEqual(set(totals), {('phase:main_page', 'exit_dungeon'), ('phase:exit_dungeon', '-')})
+        self.assertGreaterEqual(totals[('phase:main_page', 'exit_dungeon')], 100)
+        self.assertLess(totals[('phase:exit_dungeon', '-')], 50)
+
+    def test_concurrent_record(self):
+        """多个线程同时记录不丢计数"""
+        import threading
+        from src.utils.LatencyHistogram import LatencyRecorder
+
+        recorder = LatencyRecorder('Task')
+        threads = [threading.Thread(target=lambda: [recorder.record(f'op{i % 3}', 0.001) for i in range(2000)])
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(h['count'] for h in recorder.to_dict()['histograms']), 8000)
+
+
+class TestRunMetrics(unittest.TestCase):
+    """循环运行数据测试"""
+
+    def test_cycles_failures_and_phases(self):
+        """循环结果、失败路径和阶段耗时跨运行汇总"""
+        import tempfile
+        import time
+        from src.utils.RunMetrics import RunMetrics, SUCCESS, FAILED
+
+        with tempfile.TemporaryDirectory() as folder:
+            metrics = RunMetrics(os.path.join(folder, 'metrics.sqlite3'))
+            for _ in range(2):
+                run = metrics.start_run('LianHeZuoZhanTask')
+                run.begin_cycle()
+                with run.phase('enter_dungeon'):
+                    time.sleep(0.01)
+                run.mark(SUCCESS)
+                run.begin_cycle()
+                with run.phase('main_page'):
+                    pass
+                run.mark(FAILED, 'main_page')
+                run.begin_cycle()
+                run.finish('finished')
+            other = metrics.start_run('FishingTask')
+            other.begin_cycle()
+            other.mark(FAILED, 'wait_fish_hook')
+            other.finish('finished')
+
+            failures = metrics.failure_cost('LianHeZuoZhanTask')
+            phases = metrics.phase_percentile(95, 'LianHeZuoZhanTask')
+            self.assertEqual(list(failures), ['main_page'])
+            self.assertEqual(failures['main_page']['count'], 2)
+            self.assertEqual(set(phases), {'enter_dungeon', 'main_page'})
+            self.assertGreaterEqual(phases['enter_dungeon'], 0.01)
+            self.assertGreater(metrics.cycles_per_hour('LianHeZuoZhanTask'), 0)
+            self.assertEqual(metrics.cycles_per_hour('FishingTask'), 0)
+            report = metrics.report('LianHeZuoZhanTask')
+            metrics.close()
+        print(f"✅ 循环运行数据:\n{report}")
+
+    def test_nested_phase_counts_own_time(self):
+        """嵌套阶段只记自身耗时，外层扣除内层的时间"""
+        import tempfile
+        import time
+        from src.utils.RunMetrics import RunMetrics
+
+        with tempfile.TemporaryDirectory() as folder:
+            metrics = RunMetrics(os.path.join(folder, 'metrics.sqlite3'))
+            run = metrics.start_run('TaoFaZuoZhanTask')
+            run.begin_cycle()
+            with run.phase('exit_dungeon'):
+                with run.phase('main_page'):
+                    time.sleep(0.1)
+            run.finish('stopped')
+            phases = metrics.phase_percentile(95, 'TaoFaZuoZhanTask')
+            metrics.close()
+        self.assertGreaterEqual(phases['main_page'], 0.1)
+        self.assertLess(phases['exit_dungeon'], 0.05)
+        print(f"✅ 嵌套阶段耗时: {phases}")
+
+
+class TestSceneSettle(unittest.TestCase):
+    """画面稳定检测测试"""
+
+    def test_settles_after_change(self):
+        """先变化、经过黑屏后画面不动满 stable_time 才判定稳定"""
+        from src.utils.SceneSettle import SceneSettle
+
+        rng = np.random.default_rng(5)
+        before = rng.integers(0, 255, (90, 160, 3), dtype=np.uint8)
+        after = rng.integers(0, 255, (90, 160, 3), dtype=np.uint8)
+        black = np.zeros_like(before)
+
+        idle = SceneSettle(stable_time=0.5)
+        self.assertFalse(idle.update(before, 0.0))
+        self.assertTrue(idle.update(before, 0.6))
+
+        settle = SceneSettle(stable_time=0.5, expect_change=True)
+        timeline = [(before, 0.0), (before, 0.6), (black, 0.7), (black, 1.5), (after, 1.6), (after, 1.9), (after, 2.2)]
+        results = [settle.update(frame, now) for frame, now in timeline]
+        self.assertEqual(results, [False, False, False, False, False, False, True])
+
+        loading = SceneSettle(stable_time=0.5)
+        loading.update(after, 0.0)
+        self.assertFalse(loading.update(after, 1.0, is_loading=lambda: True))
+        print(f"✅ 画面稳定判定: {results}")
+
+
+class TestFramePipeline(unittest.TestCase):
+    """截图预处理流水线测试"""
+
+    def test_in_place_mask_and_cached_views(self):
+        """水印原地涂黑，派生画面每帧只计算一次并复用缓冲区"""
+        from src.utils.FramePipeline import FramePipeline, gray_view, half_view
+
+        calls = []
+
+        def make_bottom_right_black(frame):
+            frame[-27:, -249:] = 0
+            return frame
+
+        def counted_gray(frame, dst):
+            calls.append(1)
+            return gray_view(frame, dst)
+
+        pipeline = FramePipeline([make_bottom_right_black], {'gray': counted_gray, 'half': half_view}, buffers=2)
+        frames = [pipeline(np.full((1080, 1920, 3), 200, dtype=np.uint8)) for _ in range(3)]
+        self.assertEqual(frames[0][1079, 1919].tolist(), [0, 0, 0])
+        self.assertEqual(frames[0][1079 - 27, 1919].tolist(), [200, 200, 200])
+
+        first = pipeline.view(frames[0], 'gray')
+        self.assertIs(pipeline.view(frames[0], 'gray'), first)
+        pipeline.view(frames[1], 'gray')
+        self.assertIs(pipeline.view(frames[2], 'gray'), first)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(pipeline.view(frames[2], 'half').shape, (540, 960, 3))
+        print("✅ 截图预处理流水线: 原地涂黑，灰度缓冲区轮换复用")
+
+
+class TestFrameRingBuffer(unittest.TestCase):
+    """最近画面环形缓冲测试"""
+
+    def test_keeps_recent_frames_with_detections(self):
+        """按间隔抽帧，只保留最近的槽位，检测结果随帧写出"""
+        import tempfile
+        from src.utils.FrameRingBuffer import FrameRingBuffer
+
+        ring = FrameRingBuffer(seconds=1, fps=4, width=96)
+        frames = [np.full((270, 480, 3), i * 20, dtype=np.uint8) for i in range(8)]
+        stored = [ring.push(frame, now=i * 0.125) for i, frame in enumerate(frames)]
+        self.assertEqual(stored, [True, False] * 4)
+        ring.annotate(frames[6], 'find_one', SimpleBox(1, 2, 3, 4, confidence=0.9, name='chest1'))
+        ring.annotate(frames[7], 'find_one', None)
+
+        entries = ring.snapshot()
+        self.assertEqual(len(entries), 4)
+        self.assertEqual([t for t, _, _ in entries], [0.0, 0.25, 0.5, 0.75])
+        image = cv2.imdecode(np.frombuffer(entries[-1][1], np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(image.shape, (54, 96, 3))
+
+        with tempfile.TemporaryDirectory() as folder:
+            ring.dump_async('test', folder=folder).join()
+            dumped = os.listdir(folder)[0]
+            with open(os.path.join(folder, dumped, 'frames.json'), encoding='utf-8') as f:
+                index = json.load(f)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index[-1]['detections']['find_one']['name'], 'chest1')
+
+        errors = []
+        broken = FrameRingBuffer(seconds=1, fps=4, width=96, on_error=errors.append)
+        self.assertEqual(broken('not a frame'), 'not a frame')
+        self.assertEqual(len(errors), 1)
+        print(f"✅ 最近画面缓冲: {len(index)} 帧，编码 {ring.encode_ms:.2f}ms")
+
+
+class TestScreenState(unittest.TestCase):
+    """界面状态分类测试"""
+
+    def test_classify(self):
+        """返回最近样本的状态，距离过大时返回 unknown"""
+        from src.utils import ScreenState
+
+        main_page = np.full((1080, 1920, 3), (200, 120, 40), dtype=np.uint8)
+        cv2.rectangle(main_page, (100, 100), (600, 400), (255, 255, 255), -1)
+        dungeon = np.full((1080, 1920, 3), (40, 90, 30), dtype=np.uint8)
+        cv2.circle(dungeon, (960, 700), 150, (0, 200, 255), -1)
+
+        classifier = ScreenState.ScreenStateClassifier()
+        self.assertEqual(classifier.classify(main_page)[0], ScreenState.UNKNOWN)
+        classifier.add(ScreenState.MAIN_PAGE, main_page)
+        classifier.add(ScreenState.IN_DUNGEON, dungeon)
+
+        # 不同分辨率、轻微变化的同一界面
+        shifted = cv2.resize(main_page, (1280, 720))
+        shifted[600:620, 100:300] = 255
+        self.assertEqual(classifier.classify(shifted)[0], ScreenState.MAIN_PAGE)
+        state, distance = classifier.classify(dungeon)
+        self.assertEqual(state, ScreenState.IN_DUNGEON)
+        self.assertAlmostEqual(distance, 0)
+
+        state, distance = classifier.classify(np.full((720, 1280, 3), 255, dtype=np.uint8))
+        self.assertEqual(state, ScreenState.UNKNOWN)
+        self.assertGreater(distance, classifier.max_distance)
+        self.assertEqual(classifier.classify(None)[0], ScreenState.UNKNOWN)
+        print(f"✅ 未知画面距离: {distance:.3f}")
+
+    def test_default_classifier_built_once(self):
+        """多个线程同时首次使用共用分类器时只构建一次索引"""
+        import threading
+        import time
+        from unittest import mock
+        from src.utils import ScreenState
+
+        builds = []
+
+        def slow_load(classifier):
+            builds.append(classifier)
+            time.sleep(0.05)
+
+        saved = ScreenState._default_classifier
+        ScreenState._default_classifier = None
+        results = []
+        try:
+            with mock.patch.object(ScreenState.ScreenStateClassifier, 'load_coco', slow_load):
+                threads = [threading.Thread(target=lambda: results.append(ScreenState.default_classifier()))
+                           for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            ScreenState._default_classifier = saved
+        self.assertEqual(len(builds), 1)
+        self.assertTrue(all(result is builds[0] for result in results))
+
+
+class TestTemplatePack(unittest.TestCase):
+    """预缩放模板包测试"""
+
+    def test_build_and_map(self):
+        """按分辨率预缩放写入，内存映射读回与原图一致，透明区域生成掩码"""
+        import tempfile
+        from src.utils.TemplatePack import TemplatePack, build_pack
+
+        rng = np.random.default_rng(1)
+        sheet = np.full((1080, 1920, 4), 255, dtype=np.uint8)
+        sheet[100:140, 200:260, :3] = rng.integers(0, 256, (40, 60, 3), dtype=np.uint8)
+        sheet[300:330, 400:430, :3] = 80
+        sheet[300:310, 400:430, 3] = 0
+        coco = {
+            'images': [{'id': 1, 'file_name': 'sheet.png', 'width': 1920, 'height': 1080}],
+            'categories': [{'id': 1, 'name': 'chest1'}, {'id': 2, 'name': 'back'}],
+            'annotations': [{'id': 1, 'image_id': 1, 'category_id': 1, 'bbox': [200, 100, 60, 40]},
+                            {'id': 2, 'image_id': 1, 'category_id': 2, 'bbox': [400, 300, 30, 30]}],
+        }
+        with tempfile.TemporaryDirectory() as folder:
+            cv2.imwrite(os.path.join(folder, 'sheet.png'), sheet)
+            coco_json = os.path.join(folder, 'result.json')
+            with open(coco_json, 'w', encoding='utf-8') as f:
+                json.dump(coco, f)
+            output = os.path.join(folder, 'pack')
+            build_pack([(1920, 1080), (1280, 720)], coco_json, output)
+
+            pack = TemplatePack(output)
+            native = pack.resolution(1920, 1080)
+            self.assertTrue(np.array_equal(native['chest1'].mat, sheet[100:140, 200:260, :3]))
+            self.assertIsNone(native['chest1'].mask)
+            self.assertEqual(native['back'].mask.shape, (30, 30))
+            self.assertFalse(native['back'].mask[:10].any())
+            self.assertFalse(native['chest1'].mat.flags.writeable)
+
+            scaled = pack.resolution(1280, 720)
+            self.assertEqual(scaled['chest1'].mat.shape, (27, 40, 3))
+            self.assertEqual(scaled['chest1'].gray.shape, (27, 40))
+            self.assertIsNone(pack.resolution(2560, 1440))
+            del pack, native, scaled
+            print("✅ 模板包读写正确")
+
+    def test_source_digest_uses_stat(self):
+        """摘要只随标注和图片的大小、修改时间变化，不读取图片内容"""
+        import tempfile
+        from unittest import mock
+        from src.utils.TemplatePack import source_digest
+
+        coco = {'images': [{'id': 1, 'file_name': 'sheet.png'}], 'categories': [], 'annotations': []}
+        with tempfile.TemporaryDirectory() as folder:
+            sheet = os.path.join(folder, 'sheet.png')
+            cv2.imwrite(sheet, np.zeros((10, 10, 3), dtype=np.uint8))
+            coco_json = os.path.join(folder, 'result.json')
+            with open(coco_json, 'w', encoding='utf-8') as f:
+                json.dump(coco, f)
+
+            real_open = open
+            opened = []
+
+            def tracking_open(path, *args, **kwargs):
+                opened.append(os.path.basename(path))
+                return real_open(path, *args, **kwargs)
+
+            with mock.patch('builtins.open', tracking_open):
+                digest = source_digest(coco_json)
+            self.assertEqual(opened, ['result.json'])
+            self.assertEqual(source_digest(coco_json), digest)
+
+            stat = os.stat(sheet)
+            os.utime(sheet, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            self.assertNotEqual(source_digest(coco_json), digest)
+            os.remove(sheet)
+            self.assertNotEqual(source_digest(coco_json), digest)
+
+
+class TestOcrRuntime(unittest.TestCase):
+    """OCR 预热测试"""
+
+    def test_warmup_runs_each_box_twice(self):
+        """先初始化引擎，再按每个区域和 target_height 各识别两次"""
+        from src.utils import OcrRuntime
+
+        calls = []
+        boxes = [SimpleBox(100, 600, 300, 40, name='chest_prompt'), SimpleBox(10, 10, 80, 20)]
+        report = OcrRuntime.warmup(lambda: calls.append('init'),
+                                   lambda frame, box, target_height: calls.append((box.name, frame.shape, target_height)),
+                                   boxes, 1280, 720)
+        self.assertEqual(calls[0], 'init')
+        self.assertEqual(calls[1:], [('chest_prompt', (720, 1280, 3), 540)] * 2 + [(None, (720, 1280, 3), 540)] * 2)
+        self.assertEqual(set(report['cold_ms']), {'chest_prompt', '80x20'})
+        self.assertEqual(set(report['warm_ms']), {'chest_prompt', '80x20'})
+        print(f"✅ OCR 预热: {report['cold_ms']}")
+
+
+class TestStartupProfile(unittest.TestCase):
+    """启动导入耗时记录测试"""
+
+    def test_from_import_of_loaded_package(self):
+        """包已导入后 from pkg import mod 首次加载的子模块也被记录，卸载后不再记录"""
+        import sys
+        import tempfile
+        from src.utils.StartupProfile import StartupProfile
+
+        with tempfile.TemporaryDirectory() as folder:
+            package = os.path.join(folder, 'profiled_pkg')
+            os.makedirs(package)
+            for name in ('__init__', 'inner', 'late'):
+                with open(os.path.join(package, f'{name}.py'), 'w', encoding='utf-8') as f:
+                    f.write('VALUE = 1\n')
+            sys.path.insert(0, folder)
+            try:
+                import profiled_pkg
+                profile = StartupProfile(path=os.path.join(folder, 'profile.txt')).install()
+                try:
+                    from profiled_pkg import inner
+                finally:
+                    profile.uninstall()
+                from profiled_pkg import late
+                names = [name for name, elapsed, own in profile.imports]
+                self.assertIn('profiled_pkg.inner', names)
+                self.assertNotIn('profiled_pkg', names)
+                self.assertNotIn('profiled_pkg.late', names)
+                self.assertNotIn(profile._finder, sys.meta_path)
+                self.assertEqual(inner.VALUE + late.VALUE, 2)
+            finally:
+                sys.path.remove(folder)
+                for name in ('profiled_pkg', 'profiled_pkg.inner', 'profiled_pkg.late'):
+                    sys.modules.pop(name, None)
+        print("✅ 启动导入耗时记录测试通过")
+
+
+class TestFishingSim(unittest.TestCase):
+    """钓鱼模拟器测试"""
+
+    def test_rendered_bar_matches_analyzer(self):
+        """模拟画面经真实的钓鱼条分析得到的区间和游标与模拟状态一致，按键驱动游标"""
+        from benchmark.FishingSim import FishingWorld, ScriptedFish, SimFishingTask
+        from src.utils import FishingControl
+        from src.utils.FishingBarAnalyzer import FishingBarAnalyzer
+
+        analyzer = FishingBarAnalyzer(*SimFishingTask.COLORS, FishingControl.COLOR_TOLERANCE)
+        hook_box, target_box = SimpleBox(606, 40, 34, 84), SimpleBox(668, 72, 583, 21)
+        world = FishingWorld(ScriptedFish([(0, 0.5), (10, 0.5)], width=0.2))
+        world.press('d')
+        world.step(0.25)
+
+        frame = world.render(hook_box, target_box, 1920, 1080, SimFishingTask.COLORS)
+        bar = analyzer.analyze(frame, hook_box, target_box)
+        self.assertEqual((bar.target_min, bar.target_max), (668 + 233, 668 + 349))
+        self.assertEqual(bar.white_x, 668 + round(0.7 * 582))
+        self.assertGreater(bar.hook_percent, 0)
+        self.assertEqual(world.outcome, None)
+        world.release('d')
+        world.step(5)
+        self.assertEqual(world.outcome, 'escaped')
+        print(f"✅ 钓鱼模拟画面: {bar}")
+
+    def test_control_fishing_catches_fish(self):
+        """任务替身驱动 FishingControl.control_fishing，在虚拟时钟下钓起鱼并收杆"""
+        from benchmark.FishingSim import FishModel, run_once
+
+        result = run_once(FishModel.preset('calm', seed=0), (1280, 720), 1 / 30, 60)
+        self.assertEqual(result['outcome'], 'caught')
+        self.assertTrue(result['returned'])
+        self.assertGreater(result['duration'], result['catch_time'])
+        self.assertGreater(result['key_events'], 0)
+        print(f"✅ 钓鱼模拟: {result}")
+
+
+class TestChestTracker(unittest.TestCase):
+    """宝箱搜索窗口跟踪测试"""
+
+    def test_window_follows_motion(self):
+        """窗口跟随恒速运动，连续丢失后退回整帧搜索"""
+        from src.utils.ChestTracker import ChestTracker
+
+        tracker = ChestTracker(max_misses=2, box_cls=SimpleBox)
+        self.assertIsNone(tracker.search_window(1920, 1080, 0))
+
+        tracker.reset(SimpleBox(900, 500, 60, 60), 0)
+        tracker.update(SimpleBox(920, 500, 60, 60), 0.1)
+        window = tracker.search_window(1920, 1080, 0.2)
+        self.assertLess(window.width * window.height, 1920 * 1080 / 10)
+        predicted_x, _ = tracker.predict(0.2)
+        self.assertGreater(predicted_x, 950)
+        self.assertTrue(window.x < predicted_x < window.x + window.width)
+
+        tracker.miss()
+        self.assertGreater(tracker.search_window(1920, 1080, 0.2).width, window.width)
+        tracker.miss()
+        self.assertIsNone(tracker.search_window(1920, 1080, 0.2))
+        print(f"✅ 跟踪窗口: {window}")
+
+
+class TestChestSteering(unittest.TestCase):
+    """比例控制走位测试"""
+
+    def test_holds_follow_distance_and_adapt(self):
+        """远处同时横移和前进，按估计距离换算时长；宝箱移动得比预期快时增益变大；到位后只轻推前进"""
+        from src.utils.ChestSteering import ChestSteering
+
+        steering = ChestSteering(target_y=0.75, horizon=0.4, gain_x=1.0, gain_y=2.0, response=1.0)
+        # 中心 (1350, 594)：水平偏差 0.203，距离 1 / (0.55 - 0.4)
+        lateral, forward, centered, aligned = steering.state(SimpleBox(1340, 584, 20, 20), 1920, 1080)
+        self.assertAlmostEqual(lateral, 0.203125 / 0.15)
+        self.assertAlmostEqual(forward, 1 / 0.15 - 1 / 0.35)
+        self.assertFalse(centered or aligned)
+        keys = steering.steer(SimpleBox(1340, 584, 20, 20), 1920, 1080)
+        self.assertEqual(keys, {'d': steering.probe_hold, 'w': steering.probe_hold})
+
+        # 按住 0.3 秒后横向已居中、纵向走完一大半，两个方向的增益都上调，之后的按键不再受试探时长限制
+        steering.steer(SimpleBox(955, 712, 20, 20), 1920, 1080)
+        self.assertGreater(steering.gain_x, 1.0)
+        self.assertGreater(steering.gain_y, 2.0)
+        self.assertEqual(steering.observed, [True, True])
+
+        steering.lost()
+        self.assertEqual(steering.steer(SimpleBox(950, 800, 20, 20), 1920, 1080), {'w': steering.min_hold})
+        self.assertEqual(set(steering.steer(SimpleBox(700, 900, 20, 20), 1920, 1080)), {'a', 's'})
+        print(f"✅ 比例控制走位: 增益 ({steering.gain_x:.2f}, {steering.gain_y:.2f})")
+
+
+class TestChestSim(unittest.TestCase):
+    """走向宝箱模拟器测试"""
+
+    def test_projection_follows_keys(self):
+        """宝箱标记按角色位置投影并画到画面上，w 前进时标记下移，走到范围内后画出 opened chest"""
+        import cv2
+        import numpy as np
+        from benchmark.ChestSim import ChestWorld
+        from src.utils.TemplatePack import PackedTemplate
+
+        rng = np.random.default_rng(1)
+        templates = {name: PackedTemplate(name, rng.integers(0, 255, (16, 20, 3), dtype=np.uint8), None, None)
+                     for name in ('chest1', 'opened chest')}
+        world = ChestWorld((1.0, 8.0), 'chest1', accel_time=0)
+        far_x, far_y = world.project(1920, 1080)
+        self.assertGreater(far_x, 960)
+
+        frame = world.render(1920, 1080, templates, (1700, 360))
+        result = cv2.matchTemplate(frame, templates['chest1'].mat, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (x, y) = cv2.minMaxLoc(result)
+        self.assertGreater(score, 0.99)
+        self.assertLessEqual(abs(x + 10 - far_x), 1)
+        self.assertLessEqual(abs(y + 8 - far_y), 1)
+
+        world.press('w')
+        world.step(1.0)
+        world.release('w')
+        self.assertAlmostEqual(world.pos[1], 4.0, places=3)
+        self.assertGreater(world.project(1920, 1080)[1], far_y)
+        world.press('d')
+        world.step(0.25)
+        world.release('d')
+        world.press('w')
+        world.step(0.75)
+        self.assertTrue(world.in_reach())
+        frame = world.render(1920, 1080, templates, (1700, 360))
+        self.assertTrue(np.array_equal(frame[360:376, 1700:1720], templates['opened chest'].mat))
+        print(f"✅ 走向宝箱模拟: 标记 ({far_x:.0f}, {far_y:.0f})，按键 {world.key_events} 次后到达")
+
+    def test_approach_reaches_chest(self):
+        """任务替身在虚拟时钟下驱动 ChestApproach 的两种走位，从出生位置走到宝箱旁"""
+        import tempfile
+        from benchmark.ChestSim import load_templates, run_once
+
+        with tempfile.TemporaryDirectory() as pack_dir:
+            pack, templates = load_templates((1280, 720), pack_dir)
+            results = [run_once(method, 0, pack, templates, (1280, 720), 1 / 30, 30)
+                       for method in ('approach_chest', 'approach_bosschest')]
+            pack = templates = None
+        for result in results:
+            self.assertEqual(result['outcome'], 'reached')
+            self.assertGreater(result['steps'], 0)
+        print(f"✅ 走向宝箱模拟: {[(r['outcome'], r['duration']) for r in results]}")
+
+
+def main():
+    """主函数"""
+    unittest.main(verbosity=2)
+
+
+if __name__ == '__main__':
+    main()